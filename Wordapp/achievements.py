@@ -0,0 +1,160 @@
+from typing import Callable, NamedTuple
+
+from django.db import transaction
+
+from .lexicon import shared_cache
+from .models import Achievement, UserProfile
+
+# How long a player's earned set stays cached (seconds)
+EARNED_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class AchievementRule(NamedTuple):
+    """
+    One achievement and when it is earned
+    `profile_fields` and `game_fields` name the UserProfile fields and game
+    result keys the test reads; test(profile, game) gets them as dicts.
+    Rules that read no game fields can be re-checked for every player
+    """
+    name: str
+    description: str
+    achievement_type: str
+    test: Callable
+    profile_fields: tuple = ()
+    game_fields: tuple = ()
+
+    def earned(self, profile, game=None):
+        if self.game_fields and game is None:
+            return False
+        return bool(self.test(profile, game))
+
+
+RULES = [
+    AchievementRule(
+        'First Steps', 'Completed your first WordOrbit game!', 'first_game',
+        lambda profile, game: profile['total_games'] >= 1,
+        profile_fields=('total_games',)),
+    AchievementRule(
+        'Word Master', 'Found all words in a game!', 'word_master',
+        lambda profile, game: game['words_found'] == game['total_words'],
+        game_fields=('words_found', 'total_words')),
+    AchievementRule(
+        'High Scorer', 'Scored 500+ points in a single game!', 'high_scorer',
+        lambda profile, game: game['score'] >= 500,
+        game_fields=('score',)),
+    AchievementRule(
+        'Speed Demon', 'Completed a game in under 2 minutes!', 'speed_demon',
+        lambda profile, game: game['time_taken'] < 120 and game['words_found'] == game['total_words'],
+        game_fields=('time_taken', 'words_found', 'total_words')),
+    AchievementRule(
+        'Dedicated Player', 'Played 10 games!', 'dedicated_player',
+        lambda profile, game: profile['total_games'] >= 10,
+        profile_fields=('total_games',)),
+    AchievementRule(
+        'Century Club', 'Discovered 100 words!', 'streak_master',
+        lambda profile, game: profile['words_discovered'] >= 100,
+        profile_fields=('words_discovered',)),
+]
+
+
+def register(rule):
+    """Add a rule; run `manage.py reevaluate_achievements` to backfill it"""
+    RULES.append(rule)
+    return rule
+
+
+def profile_fields(rules):
+    return sorted({field for rule in rules for field in rule.profile_fields})
+
+
+def _earned_key(user_id):
+    return f"wordorbit:achievements:{user_id}"
+
+
+def earned_achievements(user_id):
+    """Names of a player's achievements, from the cache when possible"""
+    cache = shared_cache()
+    earned = cache.get(_earned_key(user_id))
+    if earned is None:
+        earned = frozenset(Achievement.objects.filter(
+            user_id=user_id).values_list('name', flat=True))
+        cache.set(_earned_key(user_id), earned, EARNED_CACHE_TIMEOUT)
+    return earned
+
+
+def forget_earned(user_ids):
+    """Drop cached earned sets, e.g. after achievements were edited"""
+    shared_cache().delete_many([_earned_key(user_id) for user_id in user_ids])
+
+
+def award_achievements(user_id, profile, game):
+    """
+    Award every rule a finished game (results dict) earns the player
+    Rules already earned are skipped without a query, and new awards go
+    in with one insert. Returns the names of the new achievements
+    """
+    earned = earned_achievements(user_id)
+    rules = [rule for rule in RULES if rule.name not in earned]
+    if not rules:
+        return []
+
+    values = {field: getattr(profile, field) for field in profile_fields(rules)}
+    new = [rule for rule in rules if rule.earned(values, game)]
+    if not new:
+        return []
+
+    Achievement.objects.bulk_create([
+        Achievement(user_id=user_id, name=rule.name, description=rule.description,
+                    achievement_type=rule.achievement_type)
+        for rule in new
+    ], ignore_conflicts=True)
+
+    names = earned | {rule.name for rule in new}
+    transaction.on_commit(lambda: shared_cache().set(
+        _earned_key(user_id), names, EARNED_CACHE_TIMEOUT))
+    return [rule.name for rule in new]
+
+
+def reevaluate_achievements(rules=None, chunk_size=2000):
+    """
+    Check profile-only rules against every player, e.g. after adding one
+    Profiles are streamed in chunks; each chunk costs one query for the
+    awards they already hold and one insert for the new ones
+    Returns the number of achievements awarded
+    """
+    rules = [rule for rule in (rules or RULES) if not rule.game_fields]
+    if not rules:
+        return 0
+
+    fields = profile_fields(rules)
+    profiles = UserProfile.objects.order_by('pk').values('user_id', *fields)
+    awarded = 0
+    chunk = []
+    for profile in profiles.iterator(chunk_size=chunk_size):
+        chunk.append(profile)
+        if len(chunk) >= chunk_size:
+            awarded += _award_chunk(chunk, rules)
+            chunk = []
+    if chunk:
+        awarded += _award_chunk(chunk, rules)
+    return awarded
+
+
+def _award_chunk(profiles, rules):
+    user_ids = [profile['user_id'] for profile in profiles]
+    held = set(Achievement.objects.filter(
+        user_id__in=user_ids, name__in=[rule.name for rule in rules]
+    ).values_list('user_id', 'name'))
+
+    new = [
+        Achievement(user_id=profile['user_id'], name=rule.name,
+                    description=rule.description,
+                    achievement_type=rule.achievement_type)
+        for profile in profiles
+        for rule in rules
+        if (profile['user_id'], rule.name) not in held and rule.earned(profile)
+    ]
+    if new:
+        Achievement.objects.bulk_create(new, ignore_conflicts=True)
+        forget_earned({achievement.user_id for achievement in new})
+    return len(new)
@@ -1,12 +1,13 @@
 # ==================== Wordapp/admin.py ====================
 
 from django.contrib import admin
-from .models import Word, GameSession, UserProfile, Achievement, Feedback, WordHistory
+from django.utils import timezone
+from .models import Word, GameSession, UserProfile, Achievement, Feedback, WordHistory, Job
 
 @admin.register(Word)
 class WordAdmin(admin.ModelAdmin):
-    list_display = ['word', 'difficulty', 'created_at']
-    list_filter = ['difficulty', 'created_at']
+    list_display = ['word', 'difficulty', 'length', 'created_at']
+    list_filter = ['difficulty', 'length', 'created_at']
     search_fields = ['word', 'definition']
     ordering = ['word']
     list_per_page = 50
@@ -164,4 +165,35 @@ class WordHistoryAdmin(admin.ModelAdmin):
         ('Timestamp', {
             'fields': ('found_at',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key', 'status', 'attempts', 'run_after', 'created_at']
+    list_filter = ['status', 'name', 'created_at']
+    search_fields = ['name', 'key', 'last_error']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'updated_at', 'locked_at']
+    list_per_page = 50
+    date_hierarchy = 'created_at'
+    
+    fieldsets = (
+        ('Job', {
+            'fields': ('name', 'key', 'payload')
+        }),
+        ('Progress', {
+            'fields': ('status', 'attempts', 'max_attempts', 'run_after', 'locked_at', 'last_error')
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.PENDING, attempts=0, run_after=timezone.now(), last_error='')
+        self.message_user(request, f"{updated} job(s) queued to run again.")
+    retry_jobs.short_description = "Run selected jobs again"
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WordappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Wordapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - connects the signal handlers
+        from . import services  # noqa: F401 - registers the job handlers
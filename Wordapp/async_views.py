@@ -0,0 +1,164 @@
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+from . import views
+from .game_store import get_game_store
+from .lexicon import get_lexicon
+from .seen import mark_seen_words
+from .services import complete_game
+from .views import (BONUS_WORD_POINTS, MAX_BATCH_FINDS, check_finds, load_game,
+                    parse_finds, score_game)
+
+# Async entry points for ASGI deployments. Only the session and the user are
+# loaded with Django's async API; the game logic is the blocking code of
+# views.py (ORM writes in transactions, the game store, template rendering)
+# run in a worker thread through sync_to_async. These are thread-offloaded
+# sync views, so they spare the event loop, not the blocking work, and
+# must return the same responses as their views.py counterparts
+
+
+async def prepare_request(request):
+    """
+    Resolve the user and load the session up front, so templates and
+    context processors never touch the database from the event loop
+    """
+    request.user = await request.auser()
+    await request.session.aget('current_game_id')
+
+
+async def load_current_game(request):
+    """Async counterpart of views.load_current_game"""
+    game_id = await request.session.aget('current_game_id')
+    return await sync_to_async(load_game)(game_id)
+
+
+async def home(request):
+    """Home page view with game statistics"""
+    await prepare_request(request)
+    # Fragments are rendered with lazy ORM counts, so the whole view runs
+    # in a thread
+    return await sync_to_async(views.home)(request)
+
+
+async def leaderboard(request):
+    """Leaderboard view"""
+    await prepare_request(request)
+    return await sync_to_async(views.leaderboard)(request)
+
+
+@login_required
+async def check_word(request):
+    """AJAX view to check if found word is correct"""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+
+    found_word = request.POST.get('word', '').upper()
+    state = await load_current_game(request)
+
+    result = {'status': 'error'}
+    if state is not None:
+        result = (await sync_to_async(check_finds)(state, [{
+            'word': found_word,
+            'path': request.POST.get('path'),
+        }]))[0]
+
+    if result['status'] == 'success':
+        words = await sync_to_async(get_lexicon().in_bulk)(state['found_words'])
+        return JsonResponse({
+            'status': 'success',
+            'message': f'Excellent! You found "{found_word}"!',
+            'definition': result['definition'],
+            'found_words': [words[word_id].word.upper() for word_id in state['found_words']
+                            if word_id in words],
+            'total_found': len(state['found_words'])
+        })
+    if result['status'] == 'bonus':
+        return JsonResponse({
+            'status': 'bonus',
+            'message': f'Bonus word! "{found_word}" is worth {BONUS_WORD_POINTS} points',
+            'points': BONUS_WORD_POINTS,
+            'bonus_words': state['bonus_words'],
+        })
+    if result['status'] == 'duplicate':
+        return JsonResponse({
+            'status': 'duplicate',
+            'message': 'You already found this word!'
+        })
+
+    return JsonResponse({
+        'status': 'error',
+        'message': 'Word not found in the list. Keep searching!'
+    })
+
+
+@login_required
+async def check_words(request):
+    """Async counterpart of views.check_words"""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+
+    if request.content_type == 'application/json':
+        finds = parse_finds(request.body.decode('utf-8', 'replace'))
+    else:
+        finds = parse_finds(request.POST.get('finds'))
+
+    state = await load_current_game(request)
+    if state is None:
+        return JsonResponse({'status': 'error', 'message': 'No active game found.'}, status=400)
+
+    results = await sync_to_async(check_finds)(state, finds[:MAX_BATCH_FINDS])
+    for result in results:
+        result.pop('word_id', None)
+        if result['status'] == 'bonus':
+            result['points'] = BONUS_WORD_POINTS
+    return JsonResponse({
+        'status': 'ok',
+        'results': results,
+        'total_found': len(state['found_words']),
+        'bonus_words': state['bonus_words'],
+    })
+
+
+@login_required
+async def end_game(request):
+    """End game and calculate score"""
+    if request.method != 'POST':
+        return redirect('game_play')
+
+    user = await request.auser()
+    state = await load_current_game(request)
+
+    if state is None:
+        messages.warning(request, 'No active game found.')
+        return redirect('game_play')
+
+    # Finds the page confirmed locally since the last check
+    await sync_to_async(check_finds)(
+        state, parse_finds(request.POST.get('finds'))[:MAX_BATCH_FINDS])
+
+    results = score_game(state)
+    words_found = results['words_found']
+    score = results['score']
+
+    # Don't allow ending with 0 words
+    if words_found == 0:
+        messages.warning(
+            request, 'You must find at least one word before ending the game!')
+        return redirect('game_play')
+
+    await sync_to_async(complete_game)(user, state, results)
+
+    await sync_to_async(mark_seen_words)(user, state['word_ids'])
+
+    await request.session.aset('last_game_results', results)
+
+    # Clear current game
+    await sync_to_async(get_game_store().delete)(state['game_id'])
+    await request.session.apop('current_game_id', None)
+
+    messages.success(
+        request, f'Game completed! Your score: {score} points!')
+    return redirect('game_results')
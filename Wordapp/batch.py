@@ -0,0 +1,119 @@
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .grid import Grid
+from .placement import DIRECTIONS, Placement, legal_starts
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only the batch generator needs it
+    np = None
+
+# Boards tested together in one array operation, keeps the
+# (boards, candidates, letters) temporaries to a few MB
+BATCH_CHUNK = 1024
+
+
+@lru_cache(maxsize=None)
+def _path_indexes(size, length):
+    """
+    Flat cell indexes of every legal placement of a word of `length`
+    Returns (paths, directions, starts) where paths has shape
+    (candidates, length), directions holds each candidate's index into
+    DIRECTIONS and starts lists the matching (row, col, row_step, col_step)
+    """
+    paths = []
+    directions = []
+    starts = []
+    for direction, (row_step, col_step) in enumerate(DIRECTIONS):
+        for row, col in legal_starts(size, length, (row_step, col_step)):
+            paths.append([(row + i * row_step) * size + col + i * col_step
+                          for i in range(length)])
+            directions.append(direction)
+            starts.append((row, col, row_step, col_step))
+    return (np.array(paths, dtype=np.intp).reshape(-1, length),
+            np.array(directions, dtype=np.intp), starts)
+
+
+def generate_word_grids(word_lists, size, seed=None):
+    """
+    Generate one grid per word list in a single batch
+    All boards live in a (K, size, size) uint8 array (0 = empty cell).
+    Words are placed longest first; for each rank, every board's word is
+    tested against every legal placement at once with array masks and the
+    spot with the most shared letters wins (random tie-break).
+    Placement is greedy, so a word with no free spot is dropped rather
+    than backtracked - use generate_word_grid when every word must fit.
+    Returns a list of (Grid, placement manifest) pairs in input order
+    """
+    if np is None:
+        raise ImproperlyConfigured(
+            "NumPy is required for batch grid generation. Install it with 'pip install numpy'.")
+
+    rng = np.random.default_rng(seed)
+    count = len(word_lists)
+    boards = np.zeros((count, size * size), dtype=np.uint8)
+    # Cells filled by words laid in each direction, per board
+    lines = np.zeros((count, len(DIRECTIONS), size * size), dtype=bool)
+    placed_words = [[] for _ in range(count)]
+
+    # Filter out words that are too long for the grid, longest first
+    ordered = [
+        sorted((word for word in words if len(word) <= size), key=len, reverse=True)
+        for words in word_lists
+    ]
+    depth = max((len(words) for words in ordered), default=0)
+
+    for rank in range(depth):
+        # Boards whose word at this rank has the same length share paths
+        by_length = {}
+        for board_id, words in enumerate(ordered):
+            if rank < len(words):
+                by_length.setdefault(len(words[rank]), []).append(board_id)
+
+        for length, board_ids in by_length.items():
+            paths, directions, starts = _path_indexes(size, length)
+            if not len(paths):
+                continue
+
+            for chunk_start in range(0, len(board_ids), BATCH_CHUNK):
+                ids = np.array(board_ids[chunk_start:chunk_start + BATCH_CHUNK])
+                letters = np.array([
+                    np.frombuffer(ordered[board_id][rank].encode('ascii'), dtype=np.uint8)
+                    for board_id in ids
+                ])
+
+                # (boards, candidates, letters) view of the cells each path covers
+                cells = boards[ids][:, paths]
+                matches = cells == letters[:, None, :]
+                fits = ((cells == 0) | matches).all(axis=2)
+                # Not on top of letters already placed, nor along a word
+                # going the same way (CAT on top of CATALOG)
+                collinear = lines[ids][:, directions[:, None], paths].sum(axis=2)
+                fits &= ~matches.all(axis=2) & (collinear < 2)
+
+                # Intersections plus a jitter below 1 so ties break randomly
+                scores = matches.sum(axis=2) + rng.random(fits.shape)
+                scores[~fits] = -1
+                choice = scores.argmax(axis=1)
+                placed = fits[np.arange(len(ids)), choice]
+
+                chosen = paths[choice[placed]]
+                boards[ids[placed][:, None], chosen] = letters[placed]
+                lines[ids[placed][:, None], directions[choice[placed]][:, None], chosen] = True
+
+                for board_id, candidate in zip(ids[placed], choice[placed]):
+                    placed_words[board_id].append(
+                        Placement(ordered[board_id][rank], *starts[candidate]))
+
+    # Fill every empty cell of every board in one draw
+    empty = boards == 0
+    boards[empty] = rng.integers(
+        ord('A'), ord('Z') + 1, size=int(empty.sum()), dtype=np.uint8)
+
+    boards = boards.reshape(count, size, size)
+    return [
+        (Grid(size, board.tobytes()), placed_words[board_id])
+        for board_id, board in enumerate(boards)
+    ]
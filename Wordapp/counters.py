@@ -0,0 +1,78 @@
+import random
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .fragments import GAMES, USERS, WORDS
+from .models import GameSession, GlobalCounter, Word
+
+DEFAULT_COUNTER_SHARDS = 8
+
+
+def counter_shards():
+    return getattr(settings, 'WORDORBIT_COUNTER_SHARDS', DEFAULT_COUNTER_SHARDS)
+
+
+def counted_querysets():
+    """What each counter counts, for reconcile_counters"""
+    return {
+        USERS: User.objects.all(),
+        GAMES: GameSession.objects.all(),
+        WORDS: Word.objects.all(),
+    }
+
+
+def increment(name, amount=1):
+    """Add `amount` (may be negative) to a counter, on a random shard"""
+    shard = random.randrange(counter_shards())
+    counter = GlobalCounter.objects.filter(name=name, shard=shard)
+    if counter.update(value=F('value') + amount):
+        return
+    try:
+        # Savepoint, so losing a creation race keeps the transaction usable
+        with transaction.atomic():
+            GlobalCounter.objects.create(name=name, shard=shard, value=amount)
+    except IntegrityError:
+        counter.update(value=F('value') + amount)
+
+
+def counter_values(*names):
+    """Current value of each named counter, summed over its shards in one query"""
+    totals = dict(GlobalCounter.objects.filter(name__in=names).values(
+        'name').annotate(total=Sum('value')).values_list('name', 'total'))
+    return {name: totals.get(name, 0) for name in names}
+
+
+def count_rows(queryset, chunk_size=10000):
+    """Exact row count, read in primary key ranges of `chunk_size` rows"""
+    primary_keys = queryset.order_by('pk').values_list('pk', flat=True)
+    total = 0
+    last = None
+    while True:
+        chunk = primary_keys if last is None else primary_keys.filter(pk__gt=last)
+        keys = list(chunk[:chunk_size])
+        if not keys:
+            return total
+        total += len(keys)
+        last = keys[-1]
+
+
+def reconcile_counters(names=None, chunk_size=10000):
+    """
+    Recount counters from their tables and store the exact values, e.g.
+    after rows were changed without signals (bulk deletes, raw SQL)
+    Increments made while a table is being counted can be lost; run it
+    again if that matters. Returns {name: (old value, new value)}
+    """
+    querysets = counted_querysets()
+    changes = {}
+    for name in names or querysets:
+        exact = count_rows(querysets[name], chunk_size)
+        with transaction.atomic():
+            old = counter_values(name)[name]
+            GlobalCounter.objects.filter(name=name).delete()
+            GlobalCounter.objects.create(name=name, shard=0, value=exact)
+        changes[name] = (old, exact)
+    return changes
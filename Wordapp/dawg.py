@@ -0,0 +1,178 @@
+import threading
+from array import array
+
+from django.conf import settings
+
+from .lexicon import LEXICON_VERSION_KEY, shared_cache
+
+
+class _BuildNode:
+    __slots__ = ('id', 'final', 'edges')
+
+    def __init__(self, node_id):
+        self.id = node_id
+        self.final = False
+        self.edges = {}
+
+    def key(self):
+        return (self.final, tuple((char, child.id) for char, child in sorted(self.edges.items())))
+
+
+class Dawg:
+    """
+    Minimized directed acyclic word graph (a trie with shared suffixes)
+    Built once from a sorted word list, then frozen into flat arrays: each
+    node owns a run of edges whose labels are sorted, so lookups walk one
+    short run per letter and 100k words fit in a few MB
+    """
+    __slots__ = ('_first', '_count', '_final', '_labels', '_targets', 'word_count')
+
+    def __init__(self, words):
+        root, word_count = self._build(words)
+        self.word_count = word_count
+        self._freeze(root)
+
+    @staticmethod
+    def _build(words):
+        """Incremental minimization of sorted input (Daciuk et al.)"""
+        next_id = [1]
+        root = _BuildNode(0)
+        register = {}
+        unchecked = []  # (parent, char, child) along the last word added
+
+        def new_node():
+            node = _BuildNode(next_id[0])
+            next_id[0] += 1
+            return node
+
+        def minimize(down_to):
+            while len(unchecked) > down_to:
+                parent, char, child = unchecked.pop()
+                key = child.key()
+                existing = register.get(key)
+                if existing is not None:
+                    parent.edges[char] = existing
+                else:
+                    register[key] = child
+
+        previous = ''
+        word_count = 0
+        for word in sorted(set(words)):
+            if not word:
+                continue
+            common = 0
+            for a, b in zip(word, previous):
+                if a != b:
+                    break
+                common += 1
+            minimize(common)
+
+            node = unchecked[-1][2] if unchecked else root
+            for char in word[common:]:
+                child = new_node()
+                node.edges[char] = child
+                unchecked.append((node, char, child))
+                node = child
+            node.final = True
+            previous = word
+            word_count += 1
+        minimize(0)
+        return root, word_count
+
+    def _freeze(self, root):
+        numbers = {root.id: 0}
+        order = [root]
+        for node in order:
+            for _, child in sorted(node.edges.items()):
+                if child.id not in numbers:
+                    numbers[child.id] = len(order)
+                    order.append(child)
+
+        first = array('I')
+        count = array('H')
+        final = bytearray()
+        labels = []
+        targets = array('I')
+        for node in order:
+            first.append(len(targets))
+            count.append(len(node.edges))
+            final.append(node.final)
+            for char, child in sorted(node.edges.items()):
+                labels.append(char)
+                targets.append(numbers[child.id])
+
+        self._first = first
+        self._count = count
+        self._final = bytes(final)
+        self._labels = ''.join(labels)
+        self._targets = targets
+
+    def _walk(self, text):
+        """Node reached by following text from the root, or -1"""
+        node = 0
+        labels = self._labels
+        for char in text:
+            start = self._first[node]
+            edge = labels.find(char, start, start + self._count[node])
+            if edge < 0:
+                return -1
+            node = self._targets[edge]
+        return node
+
+    def __contains__(self, word):
+        node = self._walk(word)
+        return node >= 0 and bool(self._final[node])
+
+    def __len__(self):
+        return self.word_count
+
+    def has_prefix(self, prefix):
+        """True if some word starts with prefix"""
+        node = self._walk(prefix)
+        # Every node but an empty root lies on the path of some word
+        return node > 0 or (node == 0 and len(self) > 0)
+
+
+def read_word_list(path):
+    """Words from a plain text file, one per line, upper-cased"""
+    with open(path, encoding='utf-8') as handle:
+        return [line.strip().upper() for line in handle if line.strip()]
+
+
+class BonusDictionary:
+    """
+    Process-wide DAWG of the Word table plus WORDORBIT_BONUS_WORDLIST,
+    rebuilt whenever the lexicon version counter moves
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._dawg = None
+
+    def get(self):
+        version = shared_cache().get(LEXICON_VERSION_KEY, 0)
+        if self._dawg is None or version != self._version:
+            with self._lock:
+                if self._dawg is None or version != self._version:
+                    self._dawg = self._build()
+                    self._version = version
+        return self._dawg
+
+    @staticmethod
+    def _build():
+        from .models import Word
+
+        words = [word.upper() for word in Word.objects.values_list('word', flat=True)]
+        path = getattr(settings, 'WORDORBIT_BONUS_WORDLIST', None)
+        if path:
+            words.extend(read_word_list(path))
+        return Dawg(words)
+
+
+_bonus_dictionary = BonusDictionary()
+
+
+def get_bonus_dawg():
+    """DAWG of every word that can score as a bonus word"""
+    return _bonus_dictionary.get()
@@ -0,0 +1,40 @@
+import time
+
+from django.db import transaction
+
+from .lexicon import shared_cache
+
+# Data a cached page fragment can depend on. Each has a version counter in
+# the shared cache, bumped whenever that data changes; fragments put the
+# versions they read in their cache key, so a bump makes them miss
+USERS = 'users'
+GAMES = 'games'
+WORDS = 'words'
+
+
+def _version_key(name):
+    return f"wordorbit:data_version:{name}"
+
+
+def data_version(*names):
+    """
+    Current versions of `names` as one string for a {% cache %} vary_on
+    argument. One cache read however many names are asked for
+    """
+    keys = [_version_key(name) for name in names]
+    versions = shared_cache().get_many(keys)
+    return '.'.join(str(versions.get(key, 0)) for key in keys)
+
+
+def bump_data_version(*names):
+    """Mark data as changed once the current transaction commits"""
+    transaction.on_commit(lambda: _bump(names))
+
+
+def _bump(names):
+    # A new token rather than incr(): FileBasedCache does incr as a get and a
+    # set at the default timeout, which would let the version expire and
+    # come back as an old value. Tokens never repeat and never expire
+    token = time.time_ns()
+    shared_cache().set_many(
+        {_version_key(name): token for name in names}, timeout=None)
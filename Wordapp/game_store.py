@@ -0,0 +1,306 @@
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .tokens import GAME_TOKEN_MAX_AGE
+
+# Kinds of values recorded against a game
+FOUND_WORD = 'found'   # id of a target word
+BONUS_WORD = 'bonus'   # text of a bonus word
+
+DEFAULT_GAME_STATE_STORE = {
+    'BACKEND': 'Wordapp.game_store.SQLiteGameStateStore',
+    'OPTIONS': {},
+}
+
+
+class GameStateStore:
+    """
+    Where games in progress live, keyed by a random game id kept in the
+    session. A game is its signed token plus the words found so far, and
+    each find is recorded on its own instead of rewriting the whole game
+    Subclasses implement create(), load(), _append() and delete()
+    """
+
+    def new_game_id(self):
+        return secrets.token_urlsafe(16)
+
+    def create(self, token):
+        """Start a game and return its id"""
+        raise NotImplementedError
+
+    def load(self, game_id):
+        """
+        {'token', 'found_words', 'bonus_words'} for a game, or None if it
+        is unknown or has expired
+        """
+        raise NotImplementedError
+
+    def _append(self, game_id, kind, value):
+        """Record one value, returning False if it was already recorded"""
+        raise NotImplementedError
+
+    def delete(self, game_id):
+        raise NotImplementedError
+
+    def _append_many(self, game_id, kind, values):
+        """Record several values, returning the ones that were new"""
+        return [value for value in values if self._append(game_id, kind, value)]
+
+    def add_found_word(self, game_id, word_id):
+        return self._append(game_id, FOUND_WORD, word_id)
+
+    def add_found_words(self, game_id, word_ids):
+        return self._append_many(game_id, FOUND_WORD, word_ids)
+
+    def add_bonus_word(self, game_id, word):
+        return self._append(game_id, BONUS_WORD, word)
+
+    def add_bonus_words(self, game_id, words):
+        return self._append_many(game_id, BONUS_WORD, words)
+
+
+class LocMemGameStateStore(GameStateStore):
+    """
+    Games held in this process, least recently used dropped first
+    Only for a single worker (or development): another process cannot see them
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._games = OrderedDict()
+
+    def create(self, token):
+        game_id = self.new_game_id()
+        with self._lock:
+            self._games[game_id] = {
+                'token': token,
+                'found_words': [],
+                'bonus_words': [],
+                'created': time.time(),
+            }
+            while len(self._games) > self.max_entries:
+                self._games.popitem(last=False)
+        return game_id
+
+    def load(self, game_id):
+        with self._lock:
+            game = self._games.get(game_id)
+            if game is None:
+                return None
+            if time.time() - game['created'] > GAME_TOKEN_MAX_AGE:
+                del self._games[game_id]
+                return None
+            self._games.move_to_end(game_id)
+            return {
+                'token': game['token'],
+                'found_words': list(game['found_words']),
+                'bonus_words': list(game['bonus_words']),
+            }
+
+    def _append(self, game_id, kind, value):
+        key = 'found_words' if kind == FOUND_WORD else 'bonus_words'
+        with self._lock:
+            game = self._games.get(game_id)
+            if game is None or value in game[key]:
+                return False
+            game[key].append(value)
+            return True
+
+    def delete(self, game_id):
+        with self._lock:
+            self._games.pop(game_id, None)
+
+
+class SQLiteGameStateStore(GameStateStore):
+    """
+    Games in a local SQLite file shared by every worker on the host
+    A find is one INSERT OR IGNORE of a small row, and the file is kept
+    apart from the main database so gameplay never locks it
+    """
+
+    # Expired games are swept on every this many new games
+    PRUNE_EVERY = 500
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.BASE_DIR / 'game_state.sqlite3')
+        self._local = threading.local()
+        self._created = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS game ('
+                'id TEXT PRIMARY KEY, token TEXT NOT NULL, created REAL NOT NULL)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS find ('
+                'game_id TEXT NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL, '
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'UNIQUE (game_id, kind, value))')
+            self._local.connection = connection
+        return connection
+
+    def create(self, token):
+        game_id = self.new_game_id()
+        connection = self._connection()
+        connection.execute(
+            'INSERT INTO game (id, token, created) VALUES (?, ?, ?)',
+            (game_id, token, time.time()))
+        self._created += 1
+        if self._created % self.PRUNE_EVERY == 0:
+            self.prune()
+        return game_id
+
+    def load(self, game_id):
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT token, created FROM game WHERE id = ?', (game_id,)).fetchone()
+        if row is None or time.time() - row[1] > GAME_TOKEN_MAX_AGE:
+            return None
+        game = {'token': row[0], 'found_words': [], 'bonus_words': []}
+        for kind, value in connection.execute(
+                'SELECT kind, value FROM find WHERE game_id = ? ORDER BY seq', (game_id,)):
+            if kind == FOUND_WORD:
+                game['found_words'].append(int(value))
+            else:
+                game['bonus_words'].append(value)
+        return game
+
+    def _append(self, game_id, kind, value):
+        cursor = self._connection().execute(
+            'INSERT OR IGNORE INTO find (game_id, kind, value) '
+            'SELECT id, ?, ? FROM game WHERE id = ?',
+            (kind, str(value), game_id))
+        return cursor.rowcount == 1
+
+    def _append_many(self, game_id, kind, values):
+        # One transaction for the whole batch
+        connection = self._connection()
+        added = []
+        with connection:
+            connection.execute('BEGIN')
+            for value in values:
+                cursor = connection.execute(
+                    'INSERT OR IGNORE INTO find (game_id, kind, value) '
+                    'SELECT id, ?, ? FROM game WHERE id = ?',
+                    (kind, str(value), game_id))
+                if cursor.rowcount == 1:
+                    added.append(value)
+        return added
+
+    def delete(self, game_id):
+        connection = self._connection()
+        connection.execute('DELETE FROM find WHERE game_id = ?', (game_id,))
+        connection.execute('DELETE FROM game WHERE id = ?', (game_id,))
+
+    def prune(self):
+        """Drop games older than a game token can live"""
+        connection = self._connection()
+        cutoff = time.time() - GAME_TOKEN_MAX_AGE
+        connection.execute(
+            'DELETE FROM find WHERE game_id IN (SELECT id FROM game WHERE created < ?)',
+            (cutoff,))
+        connection.execute('DELETE FROM game WHERE created < ?', (cutoff,))
+
+
+class CacheGameStateStore(GameStateStore):
+    """
+    Games in a Django cache (e.g. Redis or Memcached shared by every host)
+    Each find is its own key, claimed with cache.add() so two requests
+    recording the same word cannot both win, and numbered by cache.incr()
+    on a per-game counter so concurrent finds never overwrite each other.
+    Both are atomic on Redis, Memcached and the local-memory cache; the
+    database and file caches emulate them with a read then a write
+    """
+
+    def __init__(self, cache='default'):
+        self.cache = caches[cache]
+
+    def _key(self, game_id, *parts):
+        return ':'.join(['wordorbit:game', game_id, *map(str, parts)])
+
+    def _slots(self, game_id, kind, count):
+        return [self._key(game_id, kind, seq) for seq in range(1, count + 1)]
+
+    def create(self, token):
+        game_id = self.new_game_id()
+        self.cache.set_many({
+            self._key(game_id, 'token'): token,
+            self._key(game_id, FOUND_WORD, 'count'): 0,
+            self._key(game_id, BONUS_WORD, 'count'): 0,
+        }, GAME_TOKEN_MAX_AGE)
+        return game_id
+
+    def load(self, game_id):
+        token_key = self._key(game_id, 'token')
+        count_keys = {kind: self._key(game_id, kind, 'count') for kind in (FOUND_WORD, BONUS_WORD)}
+        parts = self.cache.get_many([token_key, *count_keys.values()])
+        if token_key not in parts:
+            return None
+        slots = {kind: self._slots(game_id, kind, parts.get(key, 0))
+                 for kind, key in count_keys.items()}
+        values = self.cache.get_many(slots[FOUND_WORD] + slots[BONUS_WORD])
+        # A slot can be missing for a moment while another request fills it
+        return {
+            'token': parts[token_key],
+            'found_words': [values[key] for key in slots[FOUND_WORD] if key in values],
+            'bonus_words': [values[key] for key in slots[BONUS_WORD] if key in values],
+        }
+
+    def _append(self, game_id, kind, value):
+        return bool(self._append_many(game_id, kind, [value]))
+
+    def _append_many(self, game_id, kind, values):
+        if self.cache.get(self._key(game_id, 'token')) is None:
+            return []
+        added = [value for value in dict.fromkeys(values)
+                 if self.cache.add(self._key(game_id, kind, 'value', value), True,
+                                   GAME_TOKEN_MAX_AGE)]
+        if added:
+            try:
+                last = self.cache.incr(self._key(game_id, kind, 'count'), len(added))
+            except ValueError:  # the game expired in between
+                return []
+            first = last - len(added) + 1
+            self.cache.set_many({self._key(game_id, kind, seq): value
+                                 for seq, value in enumerate(added, first)},
+                                GAME_TOKEN_MAX_AGE)
+        return added
+
+    def delete(self, game_id):
+        keys = [self._key(game_id, 'token')]
+        for kind in (FOUND_WORD, BONUS_WORD):
+            count_key = self._key(game_id, kind, 'count')
+            slots = self._slots(game_id, kind, self.cache.get(count_key, 0))
+            keys += [count_key, *slots]
+            keys += [self._key(game_id, kind, 'value', value)
+                     for value in self.cache.get_many(slots).values()]
+        self.cache.delete_many(keys)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_game_store():
+    """Process-wide game state store configured by WORDORBIT_GAME_STATE_STORE"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = {**DEFAULT_GAME_STATE_STORE,
+                          **getattr(settings, 'WORDORBIT_GAME_STATE_STORE', {})}
+                backend = import_string(config['BACKEND'])
+                _store = backend(**config.get('OPTIONS', {}))
+    return _store
@@ -0,0 +1,161 @@
+import random
+from math import isqrt
+
+ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Marker stored for cells that do not hold a letter yet
+EMPTY_CHAR = '.'
+EMPTY = ord(EMPTY_CHAR)
+
+
+class Grid:
+    """
+    Square letter grid backed by one bytearray of size * size cells,
+    stored row by row
+    Supports grid[row, col] for single cells and grid[row] / iteration for
+    whole rows as strings, so it reads like the old list of lists
+    """
+    __slots__ = ('size', 'cells')
+
+    def __init__(self, size, cells=None):
+        self.size = size
+        if cells is None:
+            self.cells = bytearray([EMPTY]) * (size * size)
+        else:
+            if len(cells) != size * size:
+                raise ValueError(
+                    f"Expected {size * size} cells for a {size}x{size} grid, got {len(cells)}")
+            self.cells = bytearray(cells)
+
+    # Serialization
+
+    def to_string(self):
+        """All cells as one string, row by row, with '.' for empty cells"""
+        return self.cells.decode('ascii')
+
+    @classmethod
+    def from_string(cls, value):
+        """Rebuild a grid from the output of to_string()"""
+        size = isqrt(len(value))
+        return cls(size, value.encode('ascii'))
+
+    def to_list(self):
+        """Grid as a list of lists of one-character strings"""
+        return [list(row) for row in self]
+
+    # Cell access
+
+    def _index(self, row, col):
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            raise IndexError(f"Cell ({row}, {col}) is outside the grid")
+        return row * self.size + col
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            value = self.cells[self._index(*key)]
+            return '' if value == EMPTY else chr(value)
+        return self.row(key)
+
+    def __setitem__(self, key, char):
+        self.cells[self._index(*key)] = ord(char) if char else EMPTY
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for row in range(self.size):
+            yield self.row(row)
+
+    def __eq__(self, other):
+        if not isinstance(other, Grid):
+            return NotImplemented
+        return self.size == other.size and self.cells == other.cells
+
+    def __repr__(self):
+        return f"Grid({self.size}, {self.to_string()!r})"
+
+    def copy(self):
+        return Grid(self.size, self.cells)
+
+    # Slice views
+
+    def row(self, row):
+        """Letters of one row, left to right"""
+        if not 0 <= row < self.size:
+            raise IndexError(f"Row {row} is outside the grid")
+        start = row * self.size
+        return self.cells[start:start + self.size].decode('ascii')
+
+    def column(self, col):
+        """Letters of one column, top to bottom"""
+        if not 0 <= col < self.size:
+            raise IndexError(f"Column {col} is outside the grid")
+        return self.cells[col::self.size].decode('ascii')
+
+    def line(self, row, col, row_step, col_step, length=None):
+        """
+        Letters read from (row, col) in the given direction until the edge
+        of the grid, or for `length` cells if given
+        """
+        size = self.size
+        start = self._index(row, col)
+        # How many cells fit before the walk leaves the grid
+        limits = [size]
+        if row_step > 0:
+            limits.append(size - row)
+        elif row_step < 0:
+            limits.append(row + 1)
+        if col_step > 0:
+            limits.append(size - col)
+        elif col_step < 0:
+            limits.append(col + 1)
+        count = min(limits)
+        if length is not None:
+            count = min(count, length)
+        step = row_step * size + col_step
+        stop = start + step * count
+        if stop < 0:
+            stop = None
+        return self.cells[start:stop:step].decode('ascii')
+
+    def diagonal(self, offset):
+        """
+        Down-right diagonal; offset 0 is the main diagonal, positive offsets
+        start further right on the top row, negative ones lower down the
+        left column
+        """
+        if offset >= 0:
+            return self.line(0, offset, 1, 1)
+        return self.line(-offset, 0, 1, 1)
+
+    def anti_diagonal(self, offset):
+        """
+        Down-left diagonal; offset 0 starts at the top-right corner,
+        positive offsets start further left on the top row, negative ones
+        lower down the right column
+        """
+        if offset >= 0:
+            return self.line(0, self.size - 1 - offset, 1, -1)
+        return self.line(-offset, self.size - 1, 1, -1)
+
+    def rows(self):
+        return [self.row(row) for row in range(self.size)]
+
+    def columns(self):
+        return [self.column(col) for col in range(self.size)]
+
+    def diagonals(self):
+        return [self.diagonal(offset) for offset in range(1 - self.size, self.size)]
+
+    def anti_diagonals(self):
+        return [self.anti_diagonal(offset) for offset in range(1 - self.size, self.size)]
+
+    # Filling
+
+    def fill_empty(self, alphabet=ALPHABET, rng=None):
+        """Replace every empty cell with a random letter"""
+        rng = rng or random
+        cells = self.cells
+        for index in range(len(cells)):
+            if cells[index] == EMPTY:
+                cells[index] = ord(rng.choice(alphabet))
@@ -0,0 +1,141 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Retries wait RETRY_BASE_DELAY * 2**(attempt - 1) seconds, with jitter,
+# up to RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 10
+RETRY_MAX_DELAY = 60 * 60
+DEFAULT_MAX_ATTEMPTS = 5
+
+# A running job whose worker has been quiet this long is handed out again
+STALE_AFTER = 10 * 60
+
+HANDLERS = {}
+
+
+def job(name):
+    """Register the decorated function as the handler for jobs called `name`"""
+    def decorator(func):
+        HANDLERS[name] = func
+        return func
+    return decorator
+
+
+def queue_enabled():
+    """True when jobs are left to `manage.py run_jobs` rather than run inline"""
+    return getattr(settings, 'WORDORBIT_JOB_QUEUE', False)
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Queue a job for the worker and return it
+    A job is only queued once per idempotency `key`; queueing it again
+    returns the existing job. The payload is passed to the handler as
+    keyword arguments, so it must be JSON serializable
+    With the queue turned off the handler runs right away, inside the
+    caller's transaction, and None is returned
+    """
+    handler = HANDLERS.get(name)
+    if handler is None:
+        raise LookupError(f"No handler registered for job {name!r}")
+    payload = payload or {}
+
+    if not queue_enabled():
+        handler(**payload)
+        return None
+
+    fields = {
+        'name': name,
+        'payload': payload,
+        'max_attempts': max_attempts,
+        'run_after': timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        # Savepoint, so a duplicate key keeps the caller's transaction usable
+        with transaction.atomic():
+            return Job.objects.create(key=key, **fields)
+    except IntegrityError:
+        return Job.objects.get(key=key)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a job that has failed `attempts` times"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_jobs(limit):
+    """
+    Mark up to `limit` due jobs as running and return their ids
+    Each job is claimed with a conditional update, so two workers never
+    run the same one
+    """
+    now = timezone.now()
+    due = Job.objects.filter(
+        status=Job.PENDING, run_after__lte=now
+    ).order_by('run_after').values_list('pk', flat=True)[:limit]
+
+    claimed = []
+    for pk in list(due):
+        if Job.objects.filter(pk=pk, status=Job.PENDING).update(
+                status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1):
+            claimed.append(pk)
+    return claimed
+
+
+def run_job(pk):
+    """
+    Run a claimed job. The handler's writes and the job being marked done
+    commit together, so a job that finished is never run a second time
+    A failure is retried with backoff until max_attempts is reached
+    Returns True if the job succeeded
+    """
+    queued = Job.objects.get(pk=pk)
+    try:
+        handler = HANDLERS.get(queued.name)
+        if handler is None:
+            raise LookupError(f"No handler registered for job {queued.name!r}")
+        with transaction.atomic():
+            handler(**queued.payload)
+            Job.objects.filter(pk=pk).update(
+                status=Job.DONE, locked_at=None, last_error='')
+        return True
+    except Exception:
+        logger.exception("Job %s failed (attempt %d of %d)",
+                         queued, queued.attempts, queued.max_attempts)
+        changes = {'locked_at': None, 'last_error': traceback.format_exc()}
+        if queued.attempts >= queued.max_attempts:
+            changes['status'] = Job.FAILED
+        else:
+            changes['status'] = Job.PENDING
+            changes['run_after'] = timezone.now() + timedelta(
+                seconds=retry_delay(queued.attempts))
+        Job.objects.filter(pk=pk).update(**changes)
+        return False
+
+
+def requeue_stale_jobs():
+    """
+    Hand out jobs again whose worker died mid-run, or fail them when they
+    have used up their attempts. Returns the number of jobs changed
+    """
+    cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_at=None,
+        last_error='Worker stopped while running the job')
+    requeued = stale.update(status=Job.PENDING, locked_at=None)
+    return failed + requeued
@@ -0,0 +1,244 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .lexicon import shared_cache
+from .models import GameSession, LeaderboardEntry
+from .utils import GRID_SIZES
+
+# Scores kept per board
+DEFAULT_LEADERBOARD_SIZE = 100
+
+WINDOWS = ('all', 'weekly', 'daily')
+ALL_TIME = datetime.date(1970, 1, 1)
+
+# Cached lowest score of a board with room left: every score gets in
+OPEN = -1
+THRESHOLD_TIMEOUT = 24 * 60 * 60
+
+# Deep score pages, read from GameSession rather than the boards
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# A player's rank is dropped on their next game; other players' games
+# move it too, so it also expires
+RANK_CACHE_TIMEOUT = 10 * 60
+
+
+def leaderboard_size():
+    return getattr(settings, 'WORDORBIT_LEADERBOARD_SIZE', DEFAULT_LEADERBOARD_SIZE)
+
+
+def period_start(window, when=None):
+    """First day (local time) of the `window` containing `when`, default now"""
+    if window == 'all':
+        return ALL_TIME
+    day = timezone.localdate(when)
+    if window == 'weekly':
+        return day - datetime.timedelta(days=day.weekday())
+    return day
+
+
+def game_boards(difficulty, when=None):
+    """(board, window, period) of every board a game played `when` counts for"""
+    return [(board, window, period_start(window, when))
+            for board in ('all', difficulty)
+            for window in WINDOWS]
+
+
+def _board_entries(key):
+    board, window, period = key
+    return LeaderboardEntry.objects.filter(
+        board=board, window=window, period=period).order_by('-score', 'id')
+
+
+def top_scores(board='all', window='all', limit=20):
+    """A board's best scores for the current window, best first"""
+    return _board_entries((board, window, period_start(window)))[:limit]
+
+
+def _threshold_key(key):
+    board, window, period = key
+    return f"wordorbit:leaderboard:{board}:{window}:{period.isoformat()}"
+
+
+def _thresholds(boards, size):
+    """Score to beat on each board, OPEN while it has room left"""
+    cache = shared_cache()
+    keys = {_threshold_key(key): key for key in boards}
+    cached = cache.get_many(keys)
+    thresholds = {}
+    missing = {}
+    for cache_key, key in keys.items():
+        if cache_key in cached:
+            thresholds[key] = cached[cache_key]
+            continue
+        _, window, period = key
+        if window != 'all':
+            # First look at a new day or week: drop the boards it replaces
+            LeaderboardEntry.objects.filter(window=window, period__lt=period).delete()
+        lowest = _board_entries(key).values_list('score', flat=True)[size - 1:size]
+        thresholds[key] = missing[cache_key] = lowest[0] if lowest else OPEN
+    if missing:
+        cache.set_many(missing, THRESHOLD_TIMEOUT)
+    return thresholds
+
+
+def record_score(game_session, username):
+    """
+    Put a finished game on every board whose top it makes
+    Costs one cache read when it makes none; each board it enters costs a
+    query to trim the board back to size. Returns the boards entered
+    """
+    size = leaderboard_size()
+    boards = game_boards(game_session.difficulty, game_session.created_at)
+    entered = [key for key, threshold in _thresholds(boards, size).items()
+               if game_session.score > threshold]
+    if not entered:
+        return []
+
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(
+            board=board, window=window, period=period,
+            score=game_session.score, difficulty=game_session.difficulty,
+            user_id=game_session.user_id, username=username,
+            game_session=game_session, played_at=game_session.created_at)
+        for board, window, period in entered
+    ])
+
+    thresholds = {}
+    for key in entered:
+        # The board's last place and anything pushed out below it
+        tail = list(_board_entries(key).values_list('pk', 'score')[size - 1:])
+        if len(tail) > 1:
+            LeaderboardEntry.objects.filter(pk__in=[pk for pk, _ in tail[1:]]).delete()
+        thresholds[_threshold_key(key)] = tail[0][1] if tail else OPEN
+    transaction.on_commit(lambda: shared_cache().set_many(thresholds, THRESHOLD_TIMEOUT))
+    return entered
+
+
+def forget_thresholds(difficulty, when):
+    """Drop cached thresholds, e.g. after a game on the boards was deleted"""
+    shared_cache().delete_many(
+        [_threshold_key(key) for key in game_boards(difficulty, when)])
+
+
+def rebuild_leaderboards(size=None):
+    """
+    Recompute every current board from the GameSession table, e.g. after
+    games were deleted in bulk or the board size changed
+    Returns the number of entries written
+    """
+    size = size or leaderboard_size()
+    boards = [(board, window, period_start(window))
+              for board in ('all', *GRID_SIZES)
+              for window in WINDOWS]
+
+    entries = []
+    for board, window, period in boards:
+        games = GameSession.objects.order_by('-score', 'id')
+        if board != 'all':
+            games = games.filter(difficulty=board)
+        if window != 'all':
+            games = games.filter(created_at__gte=timezone.make_aware(
+                datetime.datetime.combine(period, datetime.time.min)))
+        entries.extend(
+            LeaderboardEntry(
+                board=board, window=window, period=period,
+                score=game['score'], difficulty=game['difficulty'],
+                user_id=game['user_id'], username=game['user__username'],
+                game_session_id=game['id'], played_at=game['created_at'])
+            for game in games.values(
+                'id', 'score', 'difficulty', 'user_id', 'user__username',
+                'created_at')[:size]
+        )
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=500)
+    shared_cache().delete_many([_threshold_key(key) for key in boards])
+    return len(entries)
+
+
+def _ranked_games(difficulty):
+    """Every game, best score first, ties to the earlier game"""
+    games = GameSession.objects.order_by('-score', 'id')
+    if difficulty != 'all':
+        games = games.filter(difficulty=difficulty)
+    return games
+
+
+def format_cursor(score, game_id, rank):
+    return f"{score}.{game_id}.{rank}"
+
+
+def parse_cursor(value):
+    """(score, game id, rank) of the last row on the previous page, or None"""
+    try:
+        score, game_id, rank = (int(part) for part in (value or '').split('.'))
+    except ValueError:
+        return None
+    return score, game_id, rank
+
+
+def scores_page(difficulty='all', after=None, limit=PAGE_SIZE):
+    """
+    One page of every game's score, best first, and the cursor of the next
+    page (None on the last). Pages start after the (score, id) in `after`
+    rather than at an OFFSET, so a deep page costs the same index range
+    scan as the first one
+    """
+    games = _ranked_games(difficulty)
+    rank = 0
+    if after is not None:
+        score, game_id, rank = after
+        # Bounded on score so the index is searched from the cursor on; an
+        # OR of the two conditions is planned as a scan from the top
+        games = games.filter(score__lte=score).exclude(score=score, id__lte=game_id)
+
+    rows = list(games.values(
+        'id', 'score', 'difficulty', 'created_at', 'user_id', 'user__username'
+    )[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    for rank, row in enumerate(rows, start=rank + 1):
+        row['rank'] = rank
+    if not more:
+        return rows, None
+    return rows, format_cursor(rows[-1]['score'], rows[-1]['id'], rows[-1]['rank'])
+
+
+def _rank_key(user_id, difficulty):
+    return f"wordorbit:rank:{user_id}:{difficulty}"
+
+
+def my_rank(user_id, difficulty='all'):
+    """
+    Where a player's best game stands among every game, as a dict with
+    'rank' and 'score', or None before their first game. Cached per player
+    """
+    cache = shared_cache()
+    key = _rank_key(user_id, difficulty)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+
+    games = _ranked_games(difficulty)
+    best = games.filter(user_id=user_id).values('id', 'score').first()
+    ranking = {}
+    if best is not None:
+        # Two counts, each an index range, rather than one OR the database
+        # may answer by scanning the whole index
+        ahead = (games.filter(score__gt=best['score']).count()
+                 + games.filter(score=best['score'], id__lt=best['id']).count())
+        ranking = {'rank': ahead + 1, 'score': best['score']}
+    cache.set(key, ranking, RANK_CACHE_TIMEOUT)
+    return ranking or None
+
+
+def forget_rank(user_id):
+    """Drop a player's cached ranks, e.g. after they finish a game"""
+    shared_cache().delete_many(
+        [_rank_key(user_id, difficulty) for difficulty in ('all', *GRID_SIZES)])
@@ -0,0 +1,219 @@
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max, Min
+
+from .models import Word
+
+# Shared cache key set to a new token whenever a Word changes; every process
+# compares it with the version its copy was loaded at
+LEXICON_VERSION_KEY = 'wordorbit:lexicon_version'
+
+# Reload at least this often (seconds), in case the version counter lives in
+# a cache that is not shared between workers
+LEXICON_MAX_AGE = 300
+
+
+def shared_cache():
+    """Cache used for values every worker must agree on (version counters)"""
+    return caches[getattr(settings, 'WORDORBIT_SHARED_CACHE', 'default')]
+
+
+class LexiconCache:
+    """
+    In-process copy of the Word table, bucketed by difficulty and word
+    length, so picking words for a game needs no database query
+    """
+
+    def __init__(self, max_age=LEXICON_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0
+        self._buckets = {}
+        self._by_id = {}
+
+    def _load(self, version):
+        buckets = {}
+        by_id = {}
+        for word in Word.objects.only('id', 'word', 'definition', 'difficulty'):
+            buckets.setdefault(word.difficulty, {}).setdefault(
+                len(word.word), []).append(word)
+            by_id[word.id] = word
+        self._buckets = buckets
+        self._by_id = by_id
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def _fresh(self):
+        """Reload if another process changed the words or the copy is old"""
+        version = shared_cache().get(LEXICON_VERSION_KEY, 0)
+        expired = time.monotonic() - self._loaded_at > self.max_age
+        if version != self._version or expired:
+            with self._lock:
+                if version != self._version or time.monotonic() - self._loaded_at > self.max_age:
+                    self._load(version)
+        return self._buckets, self._by_id
+
+    def invalidate(self):
+        """Drop this copy and tell every other process to drop theirs"""
+        # A new token rather than incr(), which FileBasedCache does as a get
+        # and a set at the default timeout, letting the version expire
+        shared_cache().set(LEXICON_VERSION_KEY, time.time_ns(), timeout=None)
+        with self._lock:
+            self._version = None
+
+    def candidates(self, difficulty, max_length=None):
+        """Words of one difficulty no longer than max_length, shortest first"""
+        buckets, _ = self._fresh()
+        by_length = buckets.get(difficulty, {})
+        return [
+            word
+            for length in sorted(by_length)
+            if not max_length or length <= max_length
+            for word in by_length[length]
+        ]
+
+    def count(self, difficulty, max_length=None, limit=None):
+        """Number of words of a difficulty no longer than max_length"""
+        buckets, _ = self._fresh()
+        total = sum(len(words) for length, words in buckets.get(difficulty, {}).items()
+                    if not max_length or length <= max_length)
+        return total if limit is None else min(total, limit)
+
+    def sample(self, difficulty, count, max_length=None, rng=None):
+        """
+        Pick `count` random words of a difficulty, falling back to every
+        difficulty when there are not enough, straight from the buckets
+        """
+        rng = rng or random
+        words_list = self.candidates(difficulty, max_length)
+
+        if len(words_list) < count:
+            # Try all difficulties if not enough words
+            words_list = [
+                word
+                for level in sorted(self._fresh()[0])
+                for word in self.candidates(level, max_length)
+            ]
+
+        if len(words_list) < count:
+            return words_list
+
+        return rng.sample(words_list, count)
+
+    def get(self, word_id):
+        """Cached Word by id, or None"""
+        return self._fresh()[1].get(word_id)
+
+    def in_bulk(self, ids):
+        """Like Word.objects.in_bulk(ids), served from the cache"""
+        by_id = self._fresh()[1]
+        return {word_id: by_id[word_id] for word_id in ids if word_id in by_id}
+
+
+class DatabaseLexicon:
+    """
+    Samples words in SQL using the (difficulty, length) index instead of
+    holding the word table in memory, for dictionaries too big to cache
+    in every worker
+    """
+
+    def candidates(self, difficulty=None, max_length=None):
+        queryset = Word.objects.only('id', 'word', 'definition', 'difficulty')
+        if difficulty is not None:
+            queryset = queryset.filter(difficulty=difficulty)
+        if max_length:
+            queryset = queryset.filter(length__lte=max_length)
+        return queryset
+
+    def count(self, difficulty, max_length=None, limit=None):
+        """
+        Number of words of a difficulty no longer than max_length
+        With a limit the count stops after that many rows
+        """
+        queryset = self.candidates(difficulty, max_length)
+        return (queryset if limit is None else queryset[:limit]).count()
+
+    def sample(self, difficulty, count, max_length=None, rng=None):
+        """
+        Pick `count` random words of a difficulty, falling back to every
+        difficulty when there are not enough
+        Rows are found by jumping to random points in the id range, so no
+        query reads more than a handful of rows
+        """
+        rng = rng or random
+        queryset = self.candidates(difficulty, max_length)
+
+        # Counting a sliced queryset stops after `count` rows
+        if queryset[:count].count() < count:
+            # Try all difficulties if not enough words
+            queryset = self.candidates(max_length=max_length)
+            if queryset[:count].count() < count:
+                return list(queryset)
+
+        return sample_by_id_range(queryset, count, rng)
+
+    def get(self, word_id):
+        return Word.objects.filter(id=word_id).first()
+
+    def in_bulk(self, ids):
+        return Word.objects.in_bulk(ids)
+
+    def invalidate(self):
+        pass
+
+
+def sample_by_id_range(queryset, count, rng):
+    """
+    Random rows from a queryset known to hold at least `count` rows
+    Each pick takes the first row at or after a random id (wrapping round),
+    which is a single index range scan
+    """
+    bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+    low, high = bounds['low'], bounds['high']
+    ordered = queryset.order_by('id')
+
+    picked = {}
+    attempts = 0
+    while len(picked) < count and attempts < count * 10:
+        attempts += 1
+        pivot = rng.randint(low, high)
+        word = ordered.filter(id__gte=pivot).first() or ordered.first()
+        picked[word.id] = word
+
+    if len(picked) < count:
+        # Ids are too clustered for random jumps, step past what we have
+        for word in ordered.exclude(id__in=picked)[:count - len(picked)]:
+            picked[word.id] = word
+
+    words = list(picked.values())
+    rng.shuffle(words)
+    return words
+
+
+_lexicon = None
+
+
+def get_lexicon():
+    """
+    Process-wide word source: the memory-mapped lexicon file when
+    WORDORBIT_LEXICON_FILE points at one, otherwise the in-memory cache, or
+    the database when WORDORBIT_LEXICON_CACHE is off
+    """
+    global _lexicon
+    if _lexicon is None:
+        path = getattr(settings, 'WORDORBIT_LEXICON_FILE', None)
+        if path and os.path.exists(path):
+            from .lexicon_file import MmapLexicon
+
+            _lexicon = MmapLexicon(path)
+        elif getattr(settings, 'WORDORBIT_LEXICON_CACHE', True):
+            _lexicon = LexiconCache()
+        else:
+            _lexicon = DatabaseLexicon()
+    return _lexicon
@@ -0,0 +1,224 @@
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+
+from .models import Word
+
+# File layout (little-endian):
+#   header        MAGIC, format version, group count, word count,
+#                 string pool offset, build time
+#   groups        (difficulty code, length, first entry, entry count),
+#                 sorted by difficulty then length
+#   entries       (id, word offset, word bytes, difficulty code,
+#                 definition offset, definition bytes), in group order
+#   id index      (id, entry number), sorted by id for lookups
+#   string pool   UTF-8 words and definitions back to back
+MAGIC = b'WOLX'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHxxIIQd')
+GROUP = struct.Struct('<BxHII')
+ENTRY = struct.Struct('<qIHBxII')
+ID_INDEX = struct.Struct('<qI')
+
+DIFFICULTIES = [value for value, _ in Word.DIFFICULTY_CHOICES]
+
+# How often a reader checks whether the file was rebuilt (seconds)
+RELOAD_CHECK_INTERVAL = 5
+
+
+def write_lexicon_file(path, words):
+    """
+    Compile (id, word, definition, difficulty) rows into a lexicon file
+    The file is written next to `path` and swapped in atomically, so
+    processes that have the old one mapped keep reading a consistent copy
+    Returns the number of words written
+    """
+    rows = sorted(
+        (DIFFICULTIES.index(difficulty), len(word), word, word_id, definition)
+        for word_id, word, definition, difficulty in words
+        if difficulty in DIFFICULTIES
+    )
+
+    groups = []
+    entries = []
+    pool = bytearray()
+    for number, (code, length, word, word_id, definition) in enumerate(rows):
+        if not groups or groups[-1][:2] != [code, length]:
+            groups.append([code, length, number, 0])
+        groups[-1][3] += 1
+
+        word_bytes = word.encode('utf-8')
+        definition_bytes = definition.encode('utf-8')
+        entries.append((word_id, len(pool), len(word_bytes), code,
+                        len(pool) + len(word_bytes), len(definition_bytes)))
+        pool += word_bytes + definition_bytes
+
+    id_index = sorted((entry[0], number) for number, entry in enumerate(entries))
+    pool_offset = (HEADER.size + GROUP.size * len(groups)
+                   + (ENTRY.size + ID_INDEX.size) * len(entries))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as handle:
+        handle.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(groups),
+                                 len(entries), pool_offset, time.time()))
+        for group in groups:
+            handle.write(GROUP.pack(*group))
+        for entry in entries:
+            handle.write(ENTRY.pack(*entry))
+        for item in id_index:
+            handle.write(ID_INDEX.pack(*item))
+        handle.write(pool)
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+class LexiconFile:
+    """One memory-mapped lexicon file; every read goes straight to the mapping"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as handle:
+            self.mtime = os.fstat(handle.fileno()).st_mtime
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, version, group_count, word_count, pool_offset, built_at = \
+            HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} lexicon file")
+
+        self.word_count = word_count
+        self.built_at = built_at
+        self._pool_offset = pool_offset
+        self._entries_offset = HEADER.size + GROUP.size * group_count
+        self._ids_offset = self._entries_offset + ENTRY.size * word_count
+
+        # Only the small group table is unpacked up front
+        self.groups = {}
+        for number in range(group_count):
+            code, length, first, count = GROUP.unpack_from(
+                self._view, HEADER.size + GROUP.size * number)
+            self.groups.setdefault(DIFFICULTIES[code], []).append((length, first, count))
+
+    def _text(self, offset, size):
+        start = self._pool_offset + offset
+        return str(self._view[start:start + size], 'utf-8')
+
+    def entry(self, number):
+        """Word instance (not saved, read-only use) for an entry number"""
+        word_id, word_offset, word_size, code, definition_offset, definition_size = \
+            ENTRY.unpack_from(self._view, self._entries_offset + ENTRY.size * number)
+        word = self._text(word_offset, word_size)
+        return Word(id=word_id, word=word, length=len(word),
+                    definition=self._text(definition_offset, definition_size),
+                    difficulty=DIFFICULTIES[code])
+
+    def ranges(self, difficulty, max_length=None):
+        """(first entry, count) of every group matching the filters"""
+        return [
+            (first, count)
+            for length, first, count in self.groups.get(difficulty, [])
+            if not max_length or length <= max_length
+        ]
+
+    def find(self, word_id):
+        """Entry number for a word id (binary search of the id index), or None"""
+        view = self._view
+        offset = self._ids_offset
+        low, high = 0, self.word_count
+        while low < high:
+            middle = (low + high) // 2
+            found_id, number = ID_INDEX.unpack_from(view, offset + ID_INDEX.size * middle)
+            if found_id == word_id:
+                return number
+            if found_id < word_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+
+class MmapLexicon:
+    """
+    Word source backed by a lexicon file built with
+    `manage.py build_lexicon`. The file is mapped read-only, so every
+    worker on the host shares one page-cache copy of it
+    Rebuild the file after changing words; readers pick up the new file
+    within RELOAD_CHECK_INTERVAL seconds
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = LexiconFile(path)
+        self._checked_at = time.monotonic()
+
+    def _fresh(self):
+        now = time.monotonic()
+        if now - self._checked_at > RELOAD_CHECK_INTERVAL:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = self._file.mtime
+            if mtime != self._file.mtime:
+                with self._lock:
+                    if mtime != self._file.mtime:
+                        self._file = LexiconFile(self.path)
+        return self._file
+
+    def count(self, difficulty, max_length=None, limit=None):
+        """Number of words of a difficulty no longer than max_length"""
+        total = sum(size for _, size in self._fresh().ranges(difficulty, max_length))
+        return total if limit is None else min(total, limit)
+
+    def sample(self, difficulty, count, max_length=None, rng=None):
+        """
+        Pick `count` random words of a difficulty, falling back to every
+        difficulty when there are not enough
+        Only the chosen entries are read from the file
+        """
+        rng = rng or random
+        lexicon = self._fresh()
+        ranges = lexicon.ranges(difficulty, max_length)
+        total = sum(size for _, size in ranges)
+
+        if total < count:
+            # Try all difficulties if not enough words
+            ranges = [
+                item
+                for level in DIFFICULTIES
+                for item in lexicon.ranges(level, max_length)
+            ]
+            total = sum(size for _, size in ranges)
+
+        positions = range(total) if total < count else rng.sample(range(total), count)
+
+        words = []
+        for position in positions:
+            for first, size in ranges:
+                if position < size:
+                    words.append(lexicon.entry(first + position))
+                    break
+                position -= size
+        return words
+
+    def get(self, word_id):
+        lexicon = self._fresh()
+        number = lexicon.find(word_id)
+        return lexicon.entry(number) if number is not None else None
+
+    def in_bulk(self, ids):
+        lexicon = self._fresh()
+        words = {}
+        for word_id in ids:
+            number = lexicon.find(word_id)
+            if number is not None:
+                words[word_id] = lexicon.entry(number)
+        return words
+
+    def invalidate(self):
+        # The file only changes when build_lexicon runs again
+        pass
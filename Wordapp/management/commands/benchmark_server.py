@@ -0,0 +1,96 @@
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test a running server and report requests per second and '
+        'latency percentiles, e.g. to compare gunicorn WSGI workers with an '
+        'ASGI server running the async views'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Base URL of the running server (default: %(default)s)')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request, may be repeated (default: / and /leaderboard/)')
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Requests per path (default: %(default)s)')
+        parser.add_argument(
+            '--concurrency', type=int, default=20,
+            help='Simultaneous connections (default: %(default)s)')
+        parser.add_argument(
+            '--cookie', default='',
+            help='Cookie header to send, e.g. "sessionid=..." for logged-in pages')
+
+    def handle(self, *args, **options):
+        base = urlsplit(options['url'])
+        if base.scheme not in ('http', 'https') or not base.hostname:
+            raise CommandError(f"Not an http(s) URL: {options['url']}")
+
+        paths = options['paths'] or ['/', '/leaderboard/']
+        self.stdout.write(
+            f"{options['url']}: {options['requests']} requests per path, "
+            f"{options['concurrency']} connections")
+        self.stdout.write(
+            f"{'path':<24} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for path in paths:
+            rate, latencies, errors = self.run(
+                base, path, options['requests'], options['concurrency'], options['cookie'])
+            if not latencies:
+                self.stdout.write(f"{path:<24} {'-':>9} {'-':>9} {'-':>9} {errors:>7}")
+                continue
+            cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f"{path:<24} {rate:>9.1f} {cuts[49] * 1000:>9.1f} "
+                f"{cuts[98] * 1000:>9.1f} {errors:>7}")
+
+    def run(self, base, path, total, concurrency, cookie):
+        """Send `total` GETs over `concurrency` keep-alive connections"""
+        connection_class = (http.client.HTTPSConnection if base.scheme == 'https'
+                            else http.client.HTTPConnection)
+        headers = {'Host': base.netloc}
+        if cookie:
+            headers['Cookie'] = cookie
+
+        local = threading.local()
+        lock = threading.Lock()
+        latencies = []
+        errors = [0]
+
+        def fetch(_):
+            connection = getattr(local, 'connection', None)
+            if connection is None:
+                connection = local.connection = connection_class(
+                    base.hostname, base.port, timeout=30)
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                local.connection = None
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                if failed:
+                    errors[0] += 1
+                else:
+                    latencies.append(elapsed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(fetch, range(total)))
+        duration = time.perf_counter() - started
+        return len(latencies) / duration, latencies, errors[0]
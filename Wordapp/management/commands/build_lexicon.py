@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Wordapp.lexicon_file import write_lexicon_file
+from Wordapp.models import Word
+
+
+class Command(BaseCommand):
+    help = 'Compile the Word table into the read-only lexicon file shared by all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=getattr(settings, 'WORDORBIT_LEXICON_FILE', None)
+            or os.path.join(settings.BASE_DIR, 'lexicon.bin'),
+            help='Where to write the lexicon file (default: WORDORBIT_LEXICON_FILE)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output']
+        rows = Word.objects.values_list(
+            'id', 'word', 'definition', 'difficulty').iterator(chunk_size=2000)
+        count = write_lexicon_file(path, rows)
+        size = os.path.getsize(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {count} words to {path} ({size} bytes)'))
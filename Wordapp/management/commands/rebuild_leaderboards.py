@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Wordapp.leaderboard import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recompute the leaderboard tables from every game played'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=None,
+            help='Scores kept per board (default: WORDORBIT_LEADERBOARD_SIZE or 100)')
+
+    def handle(self, *args, **options):
+        if options['size'] is not None and options['size'] < 1:
+            raise CommandError('--size must be at least 1')
+        written = rebuild_leaderboards(size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} leaderboard entries'))
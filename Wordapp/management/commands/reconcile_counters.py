@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Wordapp.counters import counted_querysets, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the home page counters (players, games, words) from their tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--counter', action='append', dest='names',
+            help='Counter to recount, may be repeated (default: all)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help='Rows counted per query (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        names = options['names']
+        unknown = [name for name in names or () if name not in counted_querysets()]
+        if unknown:
+            raise CommandError(f"Unknown counter(s): {', '.join(unknown)}")
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        changes = reconcile_counters(names, chunk_size=options['chunk_size'])
+        for name, (old, new) in changes.items():
+            note = '' if old == new else f' (was {old})'
+            self.stdout.write(f'{name}: {new}{note}')
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(changes)} counter(s)'))
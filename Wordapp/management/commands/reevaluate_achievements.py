@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Wordapp.achievements import RULES, reevaluate_achievements
+
+
+class Command(BaseCommand):
+    help = 'Award profile-based achievements every player has already earned, e.g. after adding a rule'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rule', action='append', dest='rules',
+            help='Name of a rule to check, may be repeated (default: all)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Profiles read per batch (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        rules = RULES
+        if options['rules']:
+            by_name = {rule.name: rule for rule in RULES}
+            unknown = [name for name in options['rules'] if name not in by_name]
+            if unknown:
+                raise CommandError(f"Unknown rule(s): {', '.join(unknown)}")
+            rules = [by_name[name] for name in options['rules']]
+
+        skipped = [rule.name for rule in rules if rule.game_fields]
+        if skipped:
+            self.stdout.write(
+                f"Skipping rules that depend on a single game: {', '.join(skipped)}")
+
+        awarded = reevaluate_achievements(rules, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Awarded {awarded} achievement(s)'))
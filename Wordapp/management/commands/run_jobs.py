@@ -0,0 +1,72 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from Wordapp.jobs import STALE_AFTER, claim_jobs, requeue_stale_jobs, run_job
+
+
+def _run(pk):
+    close_old_connections()
+    try:
+        return run_job(pk)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (see Wordapp/jobs.py) on a pool of threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Jobs run at once (default: %(default)s)')
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait when no job is due (default: %(default)s)')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when no job is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        interval = options['poll_interval']
+        if threads < 1:
+            raise CommandError('--threads must be at least 1')
+
+        succeeded = failed = 0
+        running = set()
+        last_sweep = 0
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            try:
+                while True:
+                    if time.monotonic() - last_sweep > STALE_AFTER / 2:
+                        requeued = requeue_stale_jobs()
+                        if requeued:
+                            self.stdout.write(f'Recovered {requeued} stale job(s)')
+                        last_sweep = time.monotonic()
+
+                    free = threads - len(running)
+                    claimed = claim_jobs(free) if free else []
+                    running.update(executor.submit(_run, pk) for pk in claimed)
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(interval)
+                        continue
+
+                    # Wake when a thread frees up, or to look for new jobs
+                    done, running = wait(
+                        running, timeout=interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.result():
+                            succeeded += 1
+                        else:
+                            failed += 1
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping, waiting for running jobs to finish')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {succeeded + failed} job(s): {succeeded} succeeded, {failed} failed'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:37
+
+from django.db import migrations, models
+
+
+def fill_word_lengths(apps, schema_editor):
+    Word = apps.get_model('Wordapp', 'Word')
+    batch = []
+    for word in Word.objects.only('id', 'word').iterator(chunk_size=2000):
+        word.length = len(word.word)
+        batch.append(word)
+        if len(batch) >= 2000:
+            Word.objects.bulk_update(batch, ['length'])
+            batch = []
+    if batch:
+        Word.objects.bulk_update(batch, ['length'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Wordapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='length',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, help_text='Number of letters, kept in sync on save'),
+        ),
+        migrations.RunPython(fill_word_lengths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['difficulty', 'length'], name='word_difficulty_length_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:56
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+BOARD_SIZE = 100
+
+
+def fill_leaderboards(apps, schema_editor):
+    """Put the existing games on the all-time, weekly and daily boards"""
+    GameSession = apps.get_model('Wordapp', 'GameSession')
+    LeaderboardEntry = apps.get_model('Wordapp', 'LeaderboardEntry')
+    today = timezone.localdate()
+    periods = {
+        'all': datetime.date(1970, 1, 1),
+        'weekly': today - datetime.timedelta(days=today.weekday()),
+        'daily': today,
+    }
+    entries = []
+    for board in ('all', 'easy', 'medium', 'hard'):
+        for window, period in periods.items():
+            games = GameSession.objects.order_by('-score', 'id')
+            if board != 'all':
+                games = games.filter(difficulty=board)
+            if window != 'all':
+                games = games.filter(created_at__gte=timezone.make_aware(
+                    datetime.datetime.combine(period, datetime.time.min)))
+            entries.extend(
+                LeaderboardEntry(
+                    board=board, window=window, period=period,
+                    score=game['score'], difficulty=game['difficulty'],
+                    user_id=game['user_id'], username=game['user__username'],
+                    game_session_id=game['id'], played_at=game['created_at'])
+                for game in games.values(
+                    'id', 'score', 'difficulty', 'user_id', 'user__username',
+                    'created_at')[:BOARD_SIZE]
+            )
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Wordapp', '0003_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='highest_score',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(help_text="Difficulty the board ranks, or 'all'", max_length=10)),
+                ('window', models.CharField(choices=[('all', 'All Time'), ('weekly', 'This Week'), ('daily', 'Today')], max_length=10)),
+                ('period', models.DateField(help_text='First day of the window the score counts for')),
+                ('score', models.IntegerField()),
+                ('difficulty', models.CharField(max_length=10)),
+                ('username', models.CharField(max_length=150)),
+                ('played_at', models.DateTimeField()),
+                ('game_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='Wordapp.gamesession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Leaderboard entries',
+                'ordering': ['-score', 'id'],
+                'indexes': [models.Index(fields=['board', 'window', 'period', '-score', 'id'], name='leaderboard_board_score_idx')],
+            },
+        ),
+        migrations.RunPython(fill_leaderboards, migrations.RunPython.noop),
+    ]
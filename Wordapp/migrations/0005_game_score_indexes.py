@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Wordapp', '0004_leaderboardentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['-score', 'id'], name='game_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['difficulty', '-score', 'id'], name='game_difficulty_score_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    """Start each counter at the current row count of its table"""
+    GlobalCounter = apps.get_model('Wordapp', 'GlobalCounter')
+    counted = {
+        'users': apps.get_model('auth', 'User'),
+        'games': apps.get_model('Wordapp', 'GameSession'),
+        'words': apps.get_model('Wordapp', 'Word'),
+    }
+    GlobalCounter.objects.bulk_create([
+        GlobalCounter(name=name, shard=0, value=model.objects.count())
+        for name, model in counted.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Wordapp', '0005_game_score_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('name', 'shard')},
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Wordapp', '0006_globalcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='game_key',
+            field=models.CharField(blank=True, editable=False, help_text='Game store id of the game, so ending it twice records it once', max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -14,15 +14,27 @@ class Word(models.Model):
     word = models.CharField(max_length=50, unique=True)
     definition = models.TextField()
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='easy')
+    length = models.PositiveSmallIntegerField(default=0, db_index=True, editable=False,
+                                              help_text="Number of letters, kept in sync on save")
     usage_example = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['word']
+        indexes = [
+            models.Index(fields=['difficulty', 'length'], name='word_difficulty_length_idx'),
+        ]
     
     def __str__(self):
         return f"{self.word} ({self.difficulty})"
+    
+    def save(self, *args, **kwargs):
+        self.length = len(self.word)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'word' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'length'}
+        super().save(*args, **kwargs)
 
 class GameSession(models.Model):
     """Model for tracking individual game sessions"""
@@ -34,10 +46,17 @@ class GameSession(models.Model):
     score = models.IntegerField(default=0)
     time_taken = models.IntegerField(help_text="Time in seconds")
     completed = models.BooleanField(default=False)
+    game_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False,
+                                help_text="Game store id of the game, so ending it twice records it once")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pages and rank counts over every score (see leaderboard.py)
+            models.Index(fields=['-score', 'id'], name='game_score_idx'),
+            models.Index(fields=['difficulty', '-score', 'id'], name='game_difficulty_score_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.difficulty} - Score: {self.score}"
@@ -59,7 +78,7 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     total_games = models.IntegerField(default=0)
     total_score = models.IntegerField(default=0)
-    highest_score = models.IntegerField(default=0)
+    highest_score = models.IntegerField(default=0, db_index=True)
     words_discovered = models.IntegerField(default=0)
     achievements = models.TextField(blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
@@ -136,4 +155,87 @@ class WordHistory(models.Model):
         ordering = ['-found_at']
     
     def __str__(self):
-        return f"{self.user.username} found {self.word.word}"
\ No newline at end of file
+        return f"{self.user.username} found {self.word.word}"
+
+class Job(models.Model):
+    """Background job run by `manage.py run_jobs` (see Wordapp/jobs.py)"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True,
+                           help_text='Idempotency key: a job is only enqueued once per key')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+class LeaderboardEntry(models.Model):
+    """
+    One of the top game scores on a board, a difficulty (or 'all') over a
+    time window, kept up to date by end_game (see Wordapp/leaderboard.py)
+    """
+    WINDOW_CHOICES = [
+        ('all', 'All Time'),
+        ('weekly', 'This Week'),
+        ('daily', 'Today'),
+    ]
+
+    board = models.CharField(max_length=10, help_text="Difficulty the board ranks, or 'all'")
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES)
+    period = models.DateField(help_text='First day of the window the score counts for')
+    score = models.IntegerField()
+    difficulty = models.CharField(max_length=10)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    username = models.CharField(max_length=150)
+    game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    played_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score', 'id']
+        verbose_name_plural = 'Leaderboard entries'
+        indexes = [
+            models.Index(fields=['board', 'window', 'period', '-score', 'id'],
+                         name='leaderboard_board_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.username} - {self.board}/{self.window} - {self.score}"
+
+class GlobalCounter(models.Model):
+    """
+    One shard of a site-wide count (see Wordapp/counters.py). A count is
+    the sum of its shards; writers pick a shard at random so concurrent
+    increments rarely wait on the same row
+    """
+    name = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField(default=0)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['name', 'shard']
+
+    def __str__(self):
+        return f"{self.name}[{self.shard}] = {self.value}"
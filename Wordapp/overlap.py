@@ -0,0 +1,103 @@
+import random
+import threading
+from operator import mul
+from string import ascii_uppercase
+
+# Words sampled per word wanted; the overlap pick chooses among them
+CANDIDATE_FACTOR = 4
+
+_LETTER_INDEX = {char: index for index, char in enumerate(ascii_uppercase)}
+
+
+def letter_profile(word):
+    """
+    Letter counts of a word as 26 bytes, A to Z
+    The number of (position, position) pairs where two words share a letter,
+    i.e. how many ways they can cross, is the dot product of their profiles
+    """
+    counts = bytearray(26)
+    for char in word.upper():
+        index = _LETTER_INDEX.get(char)
+        if index is not None and counts[index] < 255:
+            counts[index] += 1
+    return bytes(counts)
+
+
+def crossings(profile_a, profile_b):
+    """How many ways two words with these profiles can intersect"""
+    return sum(map(mul, profile_a, profile_b))
+
+
+class OverlapIndex:
+    """
+    Letter profile of every lexicon word, keyed by word id
+    Pair scores come from two profiles in 26 multiplications, so the index
+    stays linear in the lexicon instead of holding every pair. Entries are
+    added, replaced and dropped one word at a time as words change
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = {}
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def profile(self, word):
+        """Profile of a Word, computed and stored on first use"""
+        profile = self._profiles.get(word.id)
+        if profile is None:
+            profile = letter_profile(word.word)
+            with self._lock:
+                self._profiles[word.id] = profile
+        return profile
+
+    def update(self, word):
+        """Refresh one word after it was saved"""
+        with self._lock:
+            self._profiles[word.id] = letter_profile(word.word)
+
+    def discard(self, word_id):
+        """Forget one word after it was deleted"""
+        with self._lock:
+            self._profiles.pop(word_id, None)
+
+    def overlap(self, word_a, word_b):
+        return crossings(self.profile(word_a), self.profile(word_b))
+
+    def select(self, candidates, count, rng=None):
+        """
+        Greedily pick `count` words that cross each other well
+        Starts from a random word, then keeps adding the candidate with the
+        most crossings against the letters chosen so far (ties broken at
+        random), so the grid generator gets a set that interlocks
+        """
+        rng = rng or random
+        candidates = list(candidates)
+        if len(candidates) <= count:
+            return candidates
+
+        profiles = [self.profile(word) for word in candidates]
+        first = rng.randrange(len(candidates))
+        chosen = [first]
+        remaining = set(range(len(candidates))) - {first}
+        totals = list(profiles[first])
+
+        while len(chosen) < count:
+            best = max(
+                sorted(remaining),
+                key=lambda index: (crossings(profiles[index], totals), rng.random()),
+            )
+            chosen.append(best)
+            remaining.discard(best)
+            totals = [a + b for a, b in zip(totals, profiles[best])]
+
+        return [candidates[index] for index in chosen]
+
+
+_overlap_index = OverlapIndex()
+
+
+def get_overlap_index():
+    """Process-wide overlap index"""
+    return _overlap_index
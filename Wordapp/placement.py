@@ -0,0 +1,305 @@
+import random
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+# Directions a word can be laid out in, as (row_step, col_step)
+DIRECTIONS = [
+    (0, 1),   # Horizontal
+    (1, 0),   # Vertical
+    (1, 1),   # Diagonal down-right
+    (1, -1),  # Diagonal down-left
+]
+
+# Every reading direction, including the reverse of the ones words are
+# laid out in (a filler letter can spell a word backwards)
+ALL_DIRECTIONS = DIRECTIONS + [(-row_step, -col_step) for row_step, col_step in DIRECTIONS]
+
+
+
+class Placement(NamedTuple):
+    """Where a word sits in the grid: its start cell and direction"""
+    word: str
+    row: int
+    col: int
+    row_step: int
+    col_step: int
+
+    @property
+    def start(self):
+        return (self.row, self.col)
+
+    @property
+    def direction(self):
+        return (self.row_step, self.col_step)
+
+    @property
+    def end(self):
+        steps = len(self.word) - 1
+        return (self.row + steps * self.row_step, self.col + steps * self.col_step)
+
+    def cells(self):
+        """The (row, col) path the word covers, first letter first"""
+        return tuple(
+            (self.row + i * self.row_step, self.col + i * self.col_step)
+            for i in range(len(self.word))
+        )
+
+
+class PlacementIndex:
+    """
+    Cell-path index over a placement manifest, keyed by word and by the
+    (start, end) cells of each placement, so a submitted path is checked
+    with one dict lookup and a comparison
+    """
+    __slots__ = ('by_word', 'by_ends')
+
+    def __init__(self, placements):
+        self.by_word = {}
+        self.by_ends = {}
+        for placement in placements:
+            self.by_word.setdefault(placement.word, placement)
+            self.by_ends[(placement.start, placement.end)] = placement
+
+    def __contains__(self, word):
+        return word in self.by_word
+
+    def path(self, word):
+        """Cell path of a word, or None if it is not in the manifest"""
+        placement = self.by_word.get(word)
+        return placement.cells() if placement else None
+
+    def match(self, word, path):
+        """
+        The placement the path traces if it spells `word`, otherwise None
+        """
+        if not path:
+            return None
+        placement = self.by_ends.get((path[0], path[-1]))
+        if placement is None or placement.word != word:
+            return None
+        if tuple(path) != placement.cells():
+            return None
+        return placement
+
+
+def parse_path(value):
+    """
+    Parse a cell path sent by the browser as "row,col;row,col;..."
+    Returns a tuple of (row, col) tuples, or None if it is malformed
+    """
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return tuple(
+            tuple(int(part) for part in cell.split(','))
+            for cell in value.split(';')
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def path_placement(word, path, size):
+    """
+    The placement a path traces if it is a straight line of len(word)
+    cells inside a size x size grid, in any of the eight directions,
+    otherwise None. Says nothing about which letters are on it
+    """
+    if not path or len(path) != len(word) or len(word) < 2:
+        return None
+    (row, col), (next_row, next_col) = path[0], path[1]
+    direction = (next_row - row, next_col - col)
+    if direction not in ALL_DIRECTIONS:
+        return None
+    placement = Placement(word, row, col, *direction)
+    end_row, end_col = placement.end
+    if not (0 <= row < size and 0 <= col < size
+            and 0 <= end_row < size and 0 <= end_col < size):
+        return None
+    if tuple(path) != placement.cells():
+        return None
+    return placement
+
+
+# Search limits - whichever runs out first ends the backtracking search
+PLACEMENT_TIME_BUDGET = 0.25  # seconds
+PLACEMENT_MAX_STEPS = 20000   # candidate placements tried
+
+
+@lru_cache(maxsize=None)
+def legal_starts(size, length, direction):
+    """
+    Every start cell from which a word of `length` fits in the grid
+    going in `direction`. Computed once per (size, length, direction)
+    """
+    row_step, col_step = direction
+    if length > size:
+        return ()
+
+    rows = range(size - length + 1) if row_step else range(size)
+    if col_step == 1:
+        cols = range(size - length + 1)
+    elif col_step == -1:
+        cols = range(length - 1, size)
+    else:
+        cols = range(size)
+
+    return tuple((row, col) for row in rows for col in cols)
+
+
+@lru_cache(maxsize=None)
+def candidate_paths(size, length):
+    """
+    All legal placements for a word of `length` as
+    (row, col, row_step, col_step, cell_bits) where cell_bits holds the
+    single-bit occupancy mask of each cell along the path
+    """
+    candidates = []
+    for row_step, col_step in DIRECTIONS:
+        for row, col in legal_starts(size, length, (row_step, col_step)):
+            cell_bits = tuple(
+                1 << ((row + i * row_step) * size + col + i * col_step)
+                for i in range(length)
+            )
+            candidates.append((row, col, row_step, col_step, cell_bits))
+    return tuple(candidates)
+
+
+def word_candidates(word, size):
+    """
+    Legal placements for a specific word as
+    (row, col, row_step, col_step, path_mask, letter_groups)
+    letter_groups pairs each distinct letter with the cells it would occupy
+    """
+    candidates = []
+    for row, col, row_step, col_step, cell_bits in candidate_paths(size, len(word)):
+        groups = {}
+        for char, bit in zip(word, cell_bits):
+            groups[char] = groups.get(char, 0) | bit
+        candidates.append((row, col, row_step, col_step,
+                           sum(cell_bits), tuple(groups.items())))
+    return candidates
+
+
+def place_words(words, size, rng=None, time_budget=PLACEMENT_TIME_BUDGET,
+                max_steps=PLACEMENT_MAX_STEPS):
+    """
+    Find placements for as many words as possible
+    Cell occupancy is tracked as bitmasks (one for all filled cells and one
+    per letter), candidates are ranked by intersection count and the search
+    backtracks until every word is placed or the budget runs out.
+    If the budget runs out, the deepest partial layout is completed
+    greedily and any word with no legal spot left is dropped.
+    Returns the placement manifest as a list of Placement tuples
+    """
+    rng = rng or random
+    # Words with no legal spot at all can never be placed, leave them out
+    # so they do not stop the search at their depth
+    sorted_words = []
+    options = []
+    for word in sorted(words, key=len, reverse=True):
+        candidates = word_candidates(word, size)
+        if candidates:
+            sorted_words.append(word)
+            options.append(candidates)
+
+    deadline = time.monotonic() + time_budget if time_budget else None
+    # Cells filled by words laid in each direction, to spot a word that
+    # would run along another one
+    state = {'occupied': 0, 'letters': {}, 'lines': {}, 'steps': 0}
+    current = []
+    best = []
+
+    def ranked(index):
+        """Candidates that fit the current grid, most intersections first"""
+        occupied = state['occupied']
+        letters = state['letters']
+        lines = state['lines']
+        fitting = []
+        for candidate in options[index]:
+            _, _, row_step, col_step, path_mask, groups = candidate
+            overlap = occupied & path_mask
+            if overlap:
+                # Laid over letters already on the board, or along a word
+                # going the same way: the word would share cells with
+                # another rather than cross it (CAT on top of CATALOG)
+                if overlap == path_mask:
+                    continue
+                if (overlap & lines.get((row_step, col_step), 0)).bit_count() > 1:
+                    continue
+                clash = False
+                for char, mask in groups:
+                    if overlap & mask & ~letters.get(char, 0):
+                        clash = True
+                        break
+                if clash:
+                    continue
+            fitting.append((overlap.bit_count(), rng.random(), candidate))
+        fitting.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [candidate for _, _, candidate in fitting]
+
+    def apply(candidate):
+        """Mark a candidate's cells as used, returning what it replaced"""
+        _, _, row_step, col_step, path_mask, groups = candidate
+        letters = state['letters']
+        lines = state['lines']
+        direction = (row_step, col_step)
+        saved = (state['occupied'], direction, lines.get(direction, 0),
+                 [(char, letters.get(char, 0)) for char, _ in groups])
+        state['occupied'] |= path_mask
+        lines[direction] = lines.get(direction, 0) | path_mask
+        for char, mask in groups:
+            letters[char] = letters.get(char, 0) | mask
+        return saved
+
+    def undo(saved):
+        occupied, direction, line, previous = saved
+        state['occupied'] = occupied
+        state['lines'][direction] = line
+        for char, mask in previous:
+            state['letters'][char] = mask
+
+    def out_of_budget():
+        if max_steps is not None and state['steps'] >= max_steps:
+            return True
+        return deadline is not None and time.monotonic() >= deadline
+
+    def search(index):
+        if index == len(sorted_words):
+            return True
+        for candidate in ranked(index):
+            if out_of_budget():
+                return False
+            state['steps'] += 1
+            saved = apply(candidate)
+            current.append((index, candidate))
+            if len(current) > len(best):
+                best[:] = current
+            if search(index + 1):
+                return True
+            current.pop()
+            undo(saved)
+        return False
+
+    if not search(0):
+        # Rebuild the deepest layout found and place the rest greedily
+        state['occupied'] = 0
+        state['letters'] = {}
+        state['lines'] = {}
+        current[:] = best
+        for _, candidate in current:
+            apply(candidate)
+        placed_indexes = {index for index, _ in current}
+        for index in range(len(sorted_words)):
+            if index in placed_indexes:
+                continue
+            fitting = ranked(index)
+            if fitting:
+                apply(fitting[0])
+                current.append((index, fitting[0]))
+        current.sort(key=lambda item: item[0])
+
+    return [
+        Placement(sorted_words[index], row, col, row_step, col_step)
+        for index, (row, col, row_step, col_step, _, _) in current
+    ]
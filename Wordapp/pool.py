@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .utils import GRID_SIZES, MIN_PUZZLE_WORDS, build_puzzle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SETTINGS = {
+    'ENABLED': True,
+    'SIZE': 20,         # puzzles kept ready per difficulty
+    'LOW_WATER': 5,     # refill starts when a pool drops below this
+    'MAX_AGE': 900,     # seconds before a ready puzzle is evicted
+    'INTERVAL': 30,     # seconds between refiller sweeps when idle
+}
+
+# Puzzles in a row with too few words before a fill stops trying
+MAX_SHORT_BUILDS = 5
+
+
+class PuzzlePool:
+    """
+    Per-difficulty pool of ready puzzles kept warm by a background thread
+    Each process has its own pool; the refiller starts on first use so
+    management commands and migrations never spawn it
+    """
+
+    def __init__(self, size, low_water, max_age, interval=30,
+                 difficulties=None, builder=build_puzzle):
+        self.size = size
+        self.low_water = low_water
+        self.max_age = max_age
+        self.interval = interval
+        self.builder = builder
+        self._queues = {difficulty: deque()
+                        for difficulty in (difficulties or GRID_SIZES)}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def pop(self, difficulty, exclude=0):
+        """
+        Take a fresh puzzle, or None if the pool is empty
+        With an `exclude` bitset of word ids, the oldest puzzle sharing the
+        fewest words with it is taken instead of simply the oldest
+        """
+        queue = self._queues.get(difficulty)
+        if queue is None:
+            return None
+
+        self._ensure_refiller()
+        puzzle = None
+        with self._lock:
+            self._evict_stale(queue)
+            if queue:
+                best = 0
+                if exclude:
+                    best = min(
+                        range(len(queue)),
+                        key=lambda index: (queue[index][1]['word_mask'] & exclude).bit_count(),
+                    )
+                _, puzzle = queue[best]
+                del queue[best]
+            if len(queue) < self.low_water:
+                self._wake.set()
+        return puzzle
+
+    def fill(self, difficulty, target=None):
+        """Build puzzles until the pool holds `target` (default: full size)"""
+        queue = self._queues[difficulty]
+        target = self.size if target is None else target
+        short = 0
+        while True:
+            with self._lock:
+                self._evict_stale(queue)
+                if len(queue) >= target:
+                    return
+            puzzle = self.builder(difficulty)
+            if puzzle is None:
+                # No words to build from, retrying will not help
+                return
+            if len(puzzle['words']) < MIN_PUZZLE_WORDS:
+                short += 1
+                if short >= MAX_SHORT_BUILDS:
+                    # Too few usable words; game_play builds its own
+                    logger.warning(
+                        "Puzzle pool gave up on %s after %d puzzles with too few words",
+                        difficulty, short)
+                    return
+                continue
+            short = 0
+            with self._lock:
+                queue.append((time.monotonic(), puzzle))
+
+    def clear(self):
+        """Drop every ready puzzle, e.g. after the word list changed"""
+        with self._lock:
+            for queue in self._queues.values():
+                queue.clear()
+        self._wake.set()
+
+    def levels(self):
+        with self._lock:
+            return {difficulty: len(queue) for difficulty, queue in self._queues.items()}
+
+    def _evict_stale(self, queue):
+        cutoff = time.monotonic() - self.max_age
+        while queue and queue[0][0] < cutoff:
+            queue.popleft()
+
+    def _ensure_refiller(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='puzzle-pool-refiller', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            for difficulty in self._queues:
+                try:
+                    with self._lock:
+                        self._evict_stale(self._queues[difficulty])
+                        below = len(self._queues[difficulty]) < self.low_water
+                    if below:
+                        self.fill(difficulty)
+                except Exception:
+                    logger.exception(
+                        "Puzzle pool refill failed for %s", difficulty)
+                finally:
+                    close_old_connections()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+class DisabledPuzzlePool:
+    """Stand-in used when the pool is switched off in settings"""
+
+    def pop(self, difficulty, exclude=0):
+        return None
+
+    def clear(self):
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_puzzle_pool():
+    """Process-wide puzzle pool configured by WORDORBIT_PUZZLE_POOL"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = {**DEFAULT_POOL_SETTINGS,
+                          **getattr(settings, 'WORDORBIT_PUZZLE_POOL', {})}
+                if config['ENABLED']:
+                    _pool = PuzzlePool(
+                        size=config['SIZE'],
+                        low_water=config['LOW_WATER'],
+                        max_age=config['MAX_AGE'],
+                        interval=config['INTERVAL'],
+                    )
+                else:
+                    _pool = DisabledPuzzlePool()
+    return _pool
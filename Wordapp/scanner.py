@@ -0,0 +1,111 @@
+from collections import deque
+
+from .placement import Placement
+
+
+class WordScanner:
+    """
+    Aho-Corasick automaton over a word list
+    Every word is added forwards and backwards, so one left-to-right pass
+    over each row, column and diagonal of a grid finds the words in all
+    eight reading directions at once
+    """
+    __slots__ = ('_goto', '_fail', '_out')
+
+    def __init__(self, words):
+        goto = [{}]
+        out = [[]]
+        for word in set(words):
+            for pattern, reverse in ((word, False), (word[::-1], True)):
+                node = 0
+                for char in pattern:
+                    child = goto[node].get(char)
+                    if child is None:
+                        child = len(goto)
+                        goto[node][char] = child
+                        goto.append({})
+                        out.append([])
+                    node = child
+                out[node].append((word, reverse))
+
+        # Failure links, breadth first so shallower nodes are done first
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                out[child] = out[child] + out[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    @classmethod
+    def from_lexicon(cls, queryset=None):
+        """Scanner over every word in the Word table (or a queryset of it)"""
+        from .models import Word
+
+        queryset = Word.objects.all() if queryset is None else queryset
+        return cls(word.upper() for word in queryset.values_list('word', flat=True))
+
+    def find(self, text):
+        """
+        Yield (start, word, reverse) for every match in text, where reverse
+        means the word reads right to left ending at `start`
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for word, reverse in out[node]:
+                yield index - len(word) + 1, word, reverse
+
+    def scan(self, grid):
+        """
+        Every occurrence of every word in the grid, in any of the eight
+        directions, as Placement tuples reading from the word's first letter
+        """
+        occurrences = []
+        for row, col, row_step, col_step in line_starts(grid.size):
+            text = grid.line(row, col, row_step, col_step)
+            for offset, word, reverse in self.find(text):
+                if reverse:
+                    # Walk back from the far end so the path spells the word
+                    offset += len(word) - 1
+                    occurrences.append(Placement(
+                        word, row + offset * row_step, col + offset * col_step,
+                        -row_step, -col_step))
+                else:
+                    occurrences.append(Placement(
+                        word, row + offset * row_step, col + offset * col_step,
+                        row_step, col_step))
+        return occurrences
+
+
+def line_starts(size):
+    """Start cell and direction of every row, column and diagonal"""
+    starts = []
+    for row in range(size):
+        starts.append((row, 0, 0, 1))
+    for col in range(size):
+        starts.append((0, col, 1, 0))
+    # Down-right diagonals start on the top row or the left column
+    for col in range(size):
+        starts.append((0, col, 1, 1))
+    for row in range(1, size):
+        starts.append((row, 0, 1, 1))
+    # Down-left diagonals start on the top row or the right column
+    for col in range(size):
+        starts.append((0, col, 1, -1))
+    for row in range(1, size):
+        starts.append((row, size - 1, 1, -1))
+    return starts
@@ -0,0 +1,69 @@
+import time
+
+from .lexicon import shared_cache
+
+# Words a player saw are avoided for between one and two windows (seconds)
+SEEN_WORDS_WINDOW = 7 * 24 * 60 * 60
+
+
+def word_mask(word_ids):
+    """Bitset (as an int) with one bit set per word id"""
+    mask = 0
+    for word_id in word_ids:
+        mask |= 1 << word_id
+    return mask
+
+
+def mask_to_bytes(mask):
+    return mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+
+
+def mask_from_bytes(value):
+    return int.from_bytes(value or b'', 'little')
+
+
+def _seen_key(user_id):
+    return f"wordorbit:seen:{user_id}"
+
+
+def _window(now=None):
+    return int((now if now is not None else time.time()) // SEEN_WORDS_WINDOW)
+
+
+def _load(user_id, window):
+    """(current, previous) bitsets as they stand in `window`"""
+    entry = shared_cache().get(_seen_key(user_id))
+    if not entry:
+        return 0, 0
+    stored_window, current, previous = entry
+    if stored_window == window:
+        return mask_from_bytes(current), mask_from_bytes(previous)
+    if stored_window == window - 1:
+        # The stored current window is now the previous one
+        return 0, mask_from_bytes(current)
+    return 0, 0
+
+
+def get_seen_words(user):
+    """
+    Bitset of the word ids a player saw in the current or previous window
+    One cache read, no queries; anonymous players have seen nothing
+    """
+    if not user.is_authenticated:
+        return 0
+    current, previous = _load(user.id, _window())
+    return current | previous
+
+
+def mark_seen_words(user, word_ids):
+    """Add the words of a finished game to the player's seen set"""
+    if not user.is_authenticated or not word_ids:
+        return
+    window = _window()
+    current, previous = _load(user.id, window)
+    current |= word_mask(word_ids)
+    shared_cache().set(
+        _seen_key(user.id),
+        (window, mask_to_bytes(current), mask_to_bytes(previous)),
+        2 * SEEN_WORDS_WINDOW,
+    )
@@ -0,0 +1,158 @@
+import struct
+
+from django.core.signing import JSONSerializer
+
+# Format versions, written as the first byte of every payload
+JSON_FORMAT = 0
+COMPACT_FORMAT = 1
+
+# Strings that show up in nearly every session, written as one byte each
+# in the compact format. Only ever append to this list: a stored session
+# refers to entries by position
+KNOWN_STRINGS = [
+    '_auth_user_id', '_auth_user_backend', '_auth_user_hash',
+    'django.contrib.auth.backends.ModelBackend',
+    'current_game_id', 'last_game_results',
+    'score', 'words_found', 'total_words', 'time_taken', 'formatted_time',
+    'difficulty', 'base_score', 'difficulty_bonus', 'time_bonus',
+    'completion_bonus', 'bonus_words', 'bonus_score',
+    'easy', 'medium', 'hard',
+    '_messages',
+]
+_KNOWN_INDEX = {value: index for index, value in enumerate(KNOWN_STRINGS)}
+
+# One-byte type tags
+NONE, TRUE, FALSE = b'N', b'T', b'F'
+INT, FLOAT, STR, KNOWN, LIST, DICT = b'i', b'f', b's', b'k', b'l', b'd'
+
+_DOUBLE = struct.Struct('<d')
+
+
+class CompactSessionSerializer:
+    """
+    Session serializer writing a tagged binary encoding: small ints as
+    varints, common keys and values as one byte, no quoting or escaping
+    Values it cannot represent (anything JSON can't either) fall back to
+    a JSON payload, and sessions written by JSONSerializer still load, so
+    it can be switched on without logging anyone out
+    """
+
+    def dumps(self, obj):
+        out = bytearray((COMPACT_FORMAT,))
+        try:
+            _encode(obj, out)
+        except TypeError:
+            return bytes((JSON_FORMAT,)) + JSONSerializer().dumps(obj)
+        return bytes(out)
+
+    def loads(self, data):
+        if not data:
+            raise ValueError("Empty session payload")
+        version = data[0]
+        if version == COMPACT_FORMAT:
+            obj, position = _decode(data, 1)
+            if position != len(data):
+                raise ValueError("Trailing bytes in session payload")
+            return obj
+        if version == JSON_FORMAT:
+            return JSONSerializer().loads(data[1:])
+        # Written by JSONSerializer before this one was configured
+        return JSONSerializer().loads(data)
+
+
+def _write_varint(value, out):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _encode(obj, out):
+    if obj is None:
+        out += NONE
+    elif obj is True:
+        out += TRUE
+    elif obj is False:
+        out += FALSE
+    elif isinstance(obj, int):
+        out += INT
+        # Zigzag so small negative numbers stay small
+        _write_varint(obj * 2 if obj >= 0 else -obj * 2 - 1, out)
+    elif isinstance(obj, float):
+        out += FLOAT
+        out += _DOUBLE.pack(obj)
+    elif isinstance(obj, str):
+        index = _KNOWN_INDEX.get(obj)
+        if index is not None:
+            out += KNOWN
+            out.append(index)
+        else:
+            encoded = obj.encode('utf-8')
+            out += STR
+            _write_varint(len(encoded), out)
+            out += encoded
+    elif isinstance(obj, (list, tuple)):
+        out += LIST
+        _write_varint(len(obj), out)
+        for item in obj:
+            _encode(item, out)
+    elif isinstance(obj, dict):
+        out += DICT
+        _write_varint(len(obj), out)
+        for key, value in obj.items():
+            if not isinstance(key, str):
+                # JSON would turn the key into a string; keep the behaviour
+                # identical by letting the JSON fallback handle it
+                raise TypeError(f"Session keys must be strings, not {type(key).__name__}")
+            _encode(key, out)
+            _encode(value, out)
+    else:
+        raise TypeError(f"Cannot serialize {type(obj).__name__} in the session")
+
+
+def _decode(data, position):
+    tag = data[position:position + 1]
+    position += 1
+    if tag == STR:
+        size, position = _read_varint(data, position)
+        end = position + size
+        return data[position:end].decode('utf-8'), end
+    if tag == KNOWN:
+        return KNOWN_STRINGS[data[position]], position + 1
+    if tag == INT:
+        value, position = _read_varint(data, position)
+        return (value >> 1) ^ -(value & 1), position
+    if tag == DICT:
+        size, position = _read_varint(data, position)
+        obj = {}
+        for _ in range(size):
+            key, position = _decode(data, position)
+            obj[key], position = _decode(data, position)
+        return obj, position
+    if tag == LIST:
+        size, position = _read_varint(data, position)
+        obj = []
+        for _ in range(size):
+            item, position = _decode(data, position)
+            obj.append(item)
+        return obj, position
+    if tag == NONE:
+        return None, position
+    if tag == TRUE:
+        return True, position
+    if tag == FALSE:
+        return False, position
+    if tag == FLOAT:
+        return _DOUBLE.unpack_from(data, position)[0], position + 8
+    raise ValueError(f"Unknown tag {tag!r} in session payload")
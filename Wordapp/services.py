@@ -0,0 +1,100 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .achievements import award_achievements
+from .counters import increment
+from .fragments import GAMES, bump_data_version
+from .jobs import enqueue, job
+from .leaderboard import forget_rank, record_score
+from .models import GameSession, UserProfile, WordHistory
+from .utils import GRID_SIZES
+
+
+def complete_game(user, state, results):
+    """
+    Record a finished game: the GameSession is written right away and put
+    on any leaderboard it makes. A WordHistory row per found word, the
+    profile totals and any new achievements are left to the 'record_game'
+    job (see jobs.py), so with the job queue on the player is redirected
+    without waiting for them
+    A game is recorded once per game store id: ending it again (a double
+    submit, a second tab) returns the game session already written
+    Returns the game session
+    """
+    words_found = results['words_found']
+    total_words = results['total_words']
+    game_key = state['game_id']
+
+    with transaction.atomic():
+        try:
+            # Savepoint, so a game that was already recorded keeps the
+            # transaction usable for reading it back
+            with transaction.atomic():
+                game_session = GameSession.objects.create(
+                    user=user,
+                    difficulty=results['difficulty'],
+                    grid_size=GRID_SIZES.get(results['difficulty'], 8),
+                    words_found=words_found,
+                    total_words=total_words,
+                    score=results['score'],
+                    time_taken=results['time_taken'],
+                    completed=(words_found == total_words),
+                    game_key=game_key,
+                )
+        except IntegrityError:
+            return GameSession.objects.get(game_key=game_key)
+
+        increment(GAMES)
+        record_score(game_session, user.username)
+        transaction.on_commit(lambda: forget_rank(user.id))
+        bump_data_version(GAMES)
+
+        enqueue('record_game', {
+            'user_id': user.id,
+            'game_session_id': game_session.id,
+            'word_ids': list(state['found_words']),
+            'results': results,
+        }, key=f"game:{game_key}")
+
+    return game_session
+
+
+@job('record_game')
+def record_game(user_id, game_session_id, word_ids, results):
+    """
+    Side effects of a finished game. Profile counters are updated in the
+    database with F() expressions, so two games ending at once both count
+    A fixed handful of queries however many words were found
+    """
+    WordHistory.objects.bulk_create([
+        WordHistory(user_id=user_id, word_id=word_id, game_session_id=game_session_id)
+        for word_id in word_ids
+    ])
+
+    profile = update_profile(user_id, results['score'], results['words_found'])
+
+    award_achievements(user_id, profile, results)
+
+    # Top players are ranked by profile, so with the queue on they change now
+    bump_data_version(GAMES)
+
+
+def update_profile(user_id, score, words_found):
+    """Add one game to a player's profile totals and return the profile"""
+    changes = {
+        'total_games': F('total_games') + 1,
+        'total_score': F('total_score') + score,
+        'words_discovered': F('words_discovered') + words_found,
+        'highest_score': Greatest('highest_score', Value(score)),
+    }
+    if not UserProfile.objects.filter(user_id=user_id).update(**changes):
+        try:
+            # Savepoint, so losing a creation race keeps the transaction usable
+            with transaction.atomic():
+                return UserProfile.objects.create(
+                    user_id=user_id, total_games=1, total_score=score,
+                    words_discovered=words_found, highest_score=score)
+        except IntegrityError:
+            UserProfile.objects.filter(user_id=user_id).update(**changes)
+    return UserProfile.objects.get(user_id=user_id)
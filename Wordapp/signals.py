@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .achievements import forget_earned
+from .counters import increment
+from .fragments import GAMES, USERS, WORDS, bump_data_version
+from .leaderboard import forget_thresholds
+from .lexicon import get_lexicon
+from .models import Achievement, GameSession, LeaderboardEntry, Word
+from .overlap import get_overlap_index
+from .pool import get_puzzle_pool
+
+
+@receiver(post_save, sender=Word)
+@receiver(post_delete, sender=Word)
+def word_changed(sender, **kwargs):
+    """Drop cached word data so the next game sees the change"""
+    get_lexicon().invalidate()
+    # Ready puzzles may use a word that was just edited or deleted
+    get_puzzle_pool().clear()
+    bump_data_version(WORDS)
+
+
+@receiver(post_save, sender=Word)
+def word_saved(sender, instance, created=False, **kwargs):
+    get_overlap_index().update(instance)
+    if created:
+        increment(WORDS)
+
+
+@receiver(post_delete, sender=Word)
+def word_deleted(sender, instance, **kwargs):
+    get_overlap_index().discard(instance.id)
+    increment(WORDS, -1)
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+def achievement_changed(sender, instance, **kwargs):
+    """Achievements edited outside the game (e.g. in the admin)"""
+    forget_earned([instance.user_id])
+
+
+@receiver(post_delete, sender=GameSession)
+def game_session_deleted(sender, instance, **kwargs):
+    """Its leaderboard entries went with it, so the boards may have room"""
+    forget_thresholds(instance.difficulty, instance.created_at)
+    bump_data_version(GAMES)
+    increment(GAMES, -1)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    """Keep the usernames copied into leaderboard entries current"""
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    # A registration, or an edit that may have renamed the player
+    bump_data_version(USERS)
+    if created:
+        increment(USERS)
+    else:
+        LeaderboardEntry.objects.filter(user=instance).exclude(
+            username=instance.username).update(username=instance.username)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # Their games and leaderboard entries went with them
+    bump_data_version(USERS, GAMES)
+    increment(USERS, -1)
@@ -1,3 +1,1375 @@
-from django.test import TestCase
+import importlib
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from datetime import timedelta
+from random import Random
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import signing
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.core.signing import JSONSerializer
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+
+from . import fragments, game_store, jobs, lexicon, pool
+from .achievements import RULES, award_achievements, earned_achievements, reevaluate_achievements
+from .batch import generate_word_grids, np
+from .counters import count_rows, counter_values, increment, reconcile_counters
+from .dawg import BonusDictionary, Dawg
+from .game_store import CacheGameStateStore, LocMemGameStateStore, SQLiteGameStateStore
+from .grid import Grid
+from .leaderboard import (OPEN, _ranked_games, _thresholds, game_boards, my_rank, parse_cursor,
+                          rebuild_leaderboards, record_score, scores_page, top_scores)
+from .lexicon import LEXICON_VERSION_KEY, DatabaseLexicon, LexiconCache, shared_cache
+from .lexicon_file import MmapLexicon, write_lexicon_file
+from .models import (Achievement, GameSession, GlobalCounter, Job, LeaderboardEntry, UserProfile,
+                     Word, WordHistory)
+from .overlap import OverlapIndex, crossings, letter_profile
+from .placement import (ALL_DIRECTIONS, Placement, PlacementIndex, parse_path, path_placement,
+                        place_words)
+from .pool import MAX_SHORT_BUILDS, PuzzlePool
+from .scanner import WordScanner
+from .seen import (SEEN_WORDS_WINDOW, get_seen_words, mark_seen_words, mask_from_bytes,
+                   mask_to_bytes, word_mask)
+from .services import complete_game
+from .serializers import COMPACT_FORMAT, JSON_FORMAT, CompactSessionSerializer
+from .tokens import (GAME_TOKEN_MAX_AGE, GAME_TOKEN_SALT, dump_game_token, find_digest,
+                     find_digests, game_placements, load_game_token, path_string)
+from .utils import (MIN_PUZZLE_WORDS, WORD_COUNTS, build_puzzle, generate_word_grid,
+                    get_random_words)
+from .views import load_game
+
+
+# Every cache in local memory, so tests never touch the shared cache files
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'wordorbit-test-{alias}'}
+    for alias in ('default', 'shared', 'fragments')
+}
+
+
+def file_shared_cache(directory):
+    """TEST_CACHES with 'shared' on disk, as it is in production"""
+    return {**TEST_CACHES, 'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': directory}}
+
+
+def clear_caches():
+    for alias in TEST_CACHES:
+        caches[alias].clear()
+
+
+GAME_WORDS = ['CAT', 'DOG', 'BIRD', 'FISH', 'LION', 'BEAR', 'WOLF', 'DEER']
+
+
+@override_settings(CACHES=TEST_CACHES, WORDORBIT_LEXICON_FILE=None)
+class GameTestCase(TestCase):
+    """Plays easy games through the views, with fresh process-wide stores"""
+
+    def setUp(self):
+        game_store._store = game_store.LocMemGameStateStore()
+        pool._pool = pool.DisabledPuzzlePool()
+        lexicon._lexicon = None
+        # Games leave ranks and seen words behind for user ids the next
+        # test will reuse
+        self.addCleanup(clear_caches)
+        for word in GAME_WORDS:
+            Word.objects.create(word=word, definition=f'A {word.lower()}', difficulty='easy')
+        self.user = User.objects.create_user('player', password='orbit-pass-123')
+        self.client.force_login(self.user)
+
+    def start_game(self):
+        response = self.client.get(reverse('game_play'), {'difficulty': 'easy'})
+        self.assertEqual(response.status_code, 200)
+        return load_game(self.client.session['current_game_id'])
+
+    def play_token(self, token):
+        """Make a fresh game with this token the one in progress"""
+        session = self.client.session
+        session['current_game_id'] = game_store.get_game_store().create(token)
+        session.save()
+
+    def placed_finds(self, state):
+        """A {'word', 'path'} find for every word placed in the game"""
+        words = Word.objects.in_bulk(state['word_ids'])
+        return [{'word': placement.word, 'path': path_string(placement.cells())}
+                for placement in game_placements(state, words)]
+
+
+def placement_cells(placement):
+    return [(placement.row + i * placement.row_step, placement.col + i * placement.col_step)
+            for i in range(len(placement.word))]
+
+
+class PlacementChecks:
+    """Assertions shared by the serial and batch placement tests"""
+
+    def assertLayoutValid(self, placements, size):
+        letters = {}
+        for placement in placements:
+            cells = placement_cells(placement)
+            for (row, col), char in zip(cells, placement.word):
+                self.assertTrue(0 <= row < size and 0 <= col < size)
+                self.assertEqual(letters.setdefault((row, col), char), char)
+
+        for placement in placements:
+            cells = set(placement_cells(placement))
+            others = [other for other in placements if other is not placement]
+            covered = set().union(*(placement_cells(other) for other in others))
+            self.assertFalse(cells <= covered, f'{placement.word} has no cell of its own')
+            for other in others:
+                if (other.row_step, other.col_step) == (placement.row_step, placement.col_step):
+                    self.assertLess(len(cells & set(placement_cells(other))), 2,
+                                    f'{placement.word} runs along {other.word}')
+
+
+class PlaceWordsTests(PlacementChecks, SimpleTestCase):
+    def test_places_every_word_that_fits(self):
+        words = ['CAT', 'DOG', 'BIRD', 'FISH', 'LION', 'BEAR']
+        placements = place_words(words, 8, rng=Random(1))
+        self.assertCountEqual([placement.word for placement in placements], words)
+        self.assertLayoutValid(placements, 8)
+
+    def test_drops_words_longer_than_the_grid(self):
+        placements = place_words(['CAT', 'ELEPHANT'], 5, rng=Random(1))
+        self.assertEqual([placement.word for placement in placements], ['CAT'])
+
+    def test_substring_word_gets_cells_of_its_own(self):
+        for seed in range(50):
+            with self.subTest(seed=seed):
+                placements = place_words(['CAT', 'CATALOG', 'DOG', 'LOG'], 8, rng=Random(seed))
+                self.assertEqual(len(placements), 4)
+                self.assertLayoutValid(placements, 8)
+
+    def test_step_budget_keeps_a_partial_layout(self):
+        words = ['ABCDE', 'FGHIJ', 'KLMNO', 'PQRST', 'UVWXY']
+        placements = place_words(words, 5, rng=Random(1), time_budget=None, max_steps=3)
+        self.assertTrue(placements)
+        self.assertLayoutValid(placements, 5)
+
+
+class GridTests(SimpleTestCase):
+    def setUp(self):
+        self.grid = Grid.from_string('ABCDEFGHI')
+
+    def test_cells_rows_and_columns(self):
+        self.assertEqual(self.grid[1, 2], 'F')
+        self.assertEqual(self.grid[2], 'GHI')
+        self.assertEqual(list(self.grid), ['ABC', 'DEF', 'GHI'])
+        self.assertEqual(self.grid.columns(), ['ADG', 'BEH', 'CFI'])
+        self.assertEqual(self.grid.to_list()[0], ['A', 'B', 'C'])
+
+    def test_lines_in_every_direction(self):
+        self.assertEqual(self.grid.line(0, 0, 1, 1), 'AEI')
+        self.assertEqual(self.grid.line(2, 2, -1, -1), 'IEA')
+        self.assertEqual(self.grid.line(2, 0, -1, 1), 'GEC')
+        self.assertEqual(self.grid.line(1, 2, 0, -1), 'FED')
+        self.assertEqual(self.grid.line(0, 1, 1, 0, length=2), 'BE')
+
+    def test_diagonals(self):
+        self.assertEqual(self.grid.diagonals(), ['G', 'DH', 'AEI', 'BF', 'C'])
+        self.assertEqual(self.grid.anti_diagonals(), ['I', 'FH', 'CEG', 'BD', 'A'])
+
+    def test_empty_cells_and_fill(self):
+        grid = Grid(2)
+        self.assertEqual(grid[0, 0], '')
+        grid[0, 0] = 'Q'
+        self.assertEqual(grid.to_string(), 'Q...')
+        grid.fill_empty(alphabet='Z', rng=Random(1))
+        self.assertEqual(grid, Grid.from_string('QZZZ'))
+
+    def test_copy_is_independent(self):
+        copy = self.grid.copy()
+        copy[0, 0] = 'Z'
+        self.assertEqual(self.grid[0, 0], 'A')
+
+    def test_rejects_bad_sizes_and_cells(self):
+        with self.assertRaises(ValueError):
+            Grid(3, b'ABCD')
+        with self.assertRaises(IndexError):
+            self.grid[3, 0]
+        with self.assertRaises(IndexError):
+            self.grid.row(-1)
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class BatchGridTests(SimpleTestCase):
+    def test_grids_are_full_and_spell_their_words(self):
+        word_lists = [['CAT', 'DOG', 'BIRD'], ['ELEPHANT', 'LION'], []]
+        for grid, placements in generate_word_grids(word_lists, 6, seed=3):
+            self.assertNotIn('.', grid.to_string())
+            for placement in placements:
+                self.assertEqual(grid.line(placement.row, placement.col, placement.row_step,
+                                           placement.col_step, len(placement.word)),
+                                 placement.word)
+
+    def test_drops_words_longer_than_the_grid(self):
+        [(_, placements)] = generate_word_grids([['ELEPHANT', 'LION']], 6, seed=3)
+        self.assertEqual([placement.word for placement in placements], ['LION'])
+
+    def test_same_seed_same_grids(self):
+        word_lists = [['CAT', 'DOG', 'BIRD']] * 5
+        self.assertEqual(generate_word_grids(word_lists, 6, seed=7),
+                         generate_word_grids(word_lists, 6, seed=7))
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class GenerateWordGridsTests(PlacementChecks, SimpleTestCase):
+    def test_substring_word_gets_cells_of_its_own(self):
+        results = generate_word_grids([['CAT', 'CATALOG', 'DOG', 'LOG']] * 50, 8, seed=1)
+        for grid, placements in results:
+            self.assertEqual(len(placements), 4)
+            self.assertLayoutValid(placements, 8)
+
+
+class PuzzlePoolTests(SimpleTestCase):
+    def pool(self, builder):
+        return PuzzlePool(size=3, low_water=1, max_age=60,
+                          difficulties=['easy'], builder=builder)
+
+    def test_fill_stops_on_short_puzzles(self):
+        calls = []
+
+        def builder(difficulty):
+            calls.append(difficulty)
+            return {'words': ['CAT'] * (MIN_PUZZLE_WORDS - 1), 'word_mask': 0}
+
+        pool = self.pool(builder)
+        pool.fill('easy')
+        self.assertEqual(len(calls), MAX_SHORT_BUILDS)
+        self.assertEqual(pool.levels(), {'easy': 0})
+
+    def test_fill_keeps_full_puzzles(self):
+        pool = self.pool(lambda difficulty: {
+            'words': ['CAT'] * MIN_PUZZLE_WORDS, 'word_mask': 0})
+        pool.fill('easy')
+        self.assertEqual(pool.levels(), {'easy': 3})
+        self.assertIsNotNone(pool.pop('easy'))
+
+
+@override_settings(CACHES=TEST_CACHES, WORDORBIT_LEXICON_FILE=None)
+class SeededPuzzleTests(TestCase):
+    def setUp(self):
+        self.addCleanup(clear_caches)
+        for word in GAME_WORDS:
+            Word.objects.create(word=word, definition=f'A {word.lower()}', difficulty='easy')
+
+    def test_same_seed_builds_the_same_puzzle(self):
+        first = build_puzzle('easy', seed=1234)
+        second = build_puzzle('easy', seed=1234)
+        self.assertEqual(first['grid'].to_string(), second['grid'].to_string())
+        self.assertEqual(first['word_ids'], second['word_ids'])
+
+    def test_game_tokens_refuse_tampering_and_age(self):
+        puzzle = build_puzzle('easy', seed=1234)
+        token = dump_game_token(puzzle)
+        self.assertEqual(load_game_token(token)['word_ids'], puzzle['word_ids'])
+        forged = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        other_salt = signing.dumps(signing.loads(token, salt=GAME_TOKEN_SALT), compress=True)
+        for value in (forged, other_salt, '', None):
+            with self.subTest(token=value):
+                self.assertIsNone(load_game_token(value))
+        with mock.patch('time.time', return_value=time.time() + GAME_TOKEN_MAX_AGE + 1):
+            self.assertIsNone(load_game_token(token))
+
+
+class PlacementIndexTests(SimpleTestCase):
+    def setUp(self):
+        # CAT left to right along the top row, DOG laid bottom to top
+        self.cat = Placement('CAT', 0, 0, 0, 1)
+        self.dog = Placement('DOG', 4, 4, -1, 0)
+        self.index = PlacementIndex([self.cat, self.dog])
+
+    def test_matches_the_cells_a_word_was_laid_on(self):
+        self.assertEqual(self.index.match('CAT', ((0, 0), (0, 1), (0, 2))), self.cat)
+        self.assertEqual(self.index.match('DOG', ((4, 4), (3, 4), (2, 4))), self.dog)
+        self.assertEqual(self.index.path('DOG'), ((4, 4), (3, 4), (2, 4)))
+
+    def test_rejects_other_paths(self):
+        for word, path in [
+            ('CAT', ((0, 2), (0, 1), (0, 0))),  # traced backwards, spelling TAC
+            ('CAT', ((0, 0), (1, 1), (0, 2))),  # not a straight line
+            ('CAT', ((0, 0), (0, 2))),          # skips a cell
+            ('DOG', ((0, 0), (0, 1), (0, 2))),  # another word's cells
+            ('CAT', ()),
+            ('CAT', None),
+        ]:
+            with self.subTest(word=word, path=path):
+                self.assertIsNone(self.index.match(word, path))
+
+
+class WordScannerTests(SimpleTestCase):
+    def test_find_reports_overlapping_matches(self):
+        scanner = WordScanner(['HE', 'SHE', 'HERS'])
+        found = {(start, word) for start, word, reverse in scanner.find('USHERS') if not reverse}
+        self.assertEqual(found, {(1, 'SHE'), (2, 'HE'), (2, 'HERS')})
+
+    def test_find_reports_reversed_words(self):
+        scanner = WordScanner(['CAT'])
+        self.assertEqual(list(scanner.find('XTACX')), [(1, 'CAT', True)])
+
+    def test_scan_matches_a_brute_force_search(self):
+        rng = Random(5)
+        words = ['AB', 'ABA', 'BAC', 'CAB', 'ACCA', 'BBB']
+        scanner = WordScanner(words)
+        for _ in range(20):
+            grid = Grid.from_string(''.join(rng.choice('ABC') for _ in range(36)))
+            expected = Counter(
+                Placement(word, row, col, row_step, col_step)
+                for row in range(6)
+                for col in range(6)
+                for row_step, col_step in ALL_DIRECTIONS
+                for word in words
+                if grid.line(row, col, row_step, col_step, len(word)) == word
+            )
+            self.assertEqual(Counter(scanner.scan(grid)), expected)
+
+    def test_scan_finds_every_placed_word(self):
+        words = ['CAT', 'DOG', 'BIRD', 'FISH', 'LION']
+        for seed in range(10):
+            grid, placements = generate_word_grid(words, 8, seed=seed)
+            occurrences = WordScanner(words).scan(grid)
+            for placement in placements:
+                self.assertIn(placement, occurrences)
+
+
+class LexiconVersionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches = override_settings(CACHES=file_shared_cache(directory.name))
+        caches.enable()
+        self.addCleanup(caches.disable)
+
+    def test_invalidate_reloads_other_copies(self):
+        create_words('hard', 3, 'H')
+        other = LexiconCache()
+        self.assertEqual(other.count('hard'), 3)
+        create_words('hard', 2, 'K')
+        LexiconCache().invalidate()
+        self.assertEqual(other.count('hard'), 5)
+
+    def test_version_never_expires(self):
+        LexiconCache().invalidate()
+        LexiconCache().invalidate()
+        version = shared_cache().get(LEXICON_VERSION_KEY)
+        with mock.patch('time.time', return_value=time.time() + 24 * 60 * 60):
+            self.assertEqual(shared_cache().get(LEXICON_VERSION_KEY), version)
+
+
+class DawgTests(SimpleTestCase):
+    def test_matches_a_set_of_the_words(self):
+        rng = Random(11)
+        words = {''.join(rng.choice('ABCD') for _ in range(rng.randint(1, 6)))
+                 for _ in range(300)}
+        dawg = Dawg(words)
+        self.assertEqual(len(dawg), len(words))
+        prefixes = {word[:end] for word in words for end in range(len(word) + 1)}
+        for length in range(1, 7):
+            for letters in itertools.product('ABCDE', repeat=length):
+                text = ''.join(letters)
+                self.assertEqual(text in dawg, text in words, text)
+                self.assertEqual(dawg.has_prefix(text), text in prefixes, text)
+
+    def test_shares_suffixes(self):
+        dawg = Dawg(['TAP', 'TAPS', 'TOP', 'TOPS'])
+        # Root, T, TA/TO, TAP/TOP, TAPS/TOPS
+        self.assertEqual(len(dawg._final), 5)
+        self.assertIn('TOPS', dawg)
+        self.assertNotIn('TO', dawg)
+
+    def test_ignores_duplicates_and_empty_words(self):
+        dawg = Dawg(['CAT', 'CAT', ''])
+        self.assertEqual(len(dawg), 1)
+        self.assertNotIn('', dawg)
+        self.assertFalse(Dawg([]).has_prefix(''))
+
+
+@override_settings(CACHES=TEST_CACHES, WORDORBIT_LEXICON_FILE=None, WORDORBIT_BONUS_WORDLIST=None)
+class BonusDictionaryTests(TestCase):
+    def setUp(self):
+        lexicon._lexicon = None
+        self.addCleanup(setattr, lexicon, '_lexicon', None)
+
+    def test_rebuilds_when_a_word_is_saved(self):
+        Word.objects.create(word='orbit', definition='A path', difficulty='easy')
+        dictionary = BonusDictionary()
+        self.assertIn('ORBIT', dictionary.get())
+        self.assertIs(dictionary.get(), dictionary.get())
+        Word.objects.create(word='comet', definition='An icy body', difficulty='easy')
+        self.assertIn('COMET', dictionary.get())
+
+
+class PathPlacementTests(SimpleTestCase):
+    def test_straight_lines_in_every_direction(self):
+        for row_step, col_step in ALL_DIRECTIONS:
+            placement = Placement('ORBS', 4, 4, row_step, col_step)
+            with self.subTest(direction=placement.direction):
+                self.assertEqual(path_placement('ORBS', placement.cells(), 9), placement)
+
+    def test_rejects_paths_that_are_not_a_line_in_the_grid(self):
+        for path in [
+            ((0, 0), (0, 1), (1, 2), (1, 3)),   # bends
+            ((0, 0), (0, 2), (0, 4), (0, 6)),   # skips cells
+            ((0, 0), (0, 1), (0, 2)),           # too short for the word
+            ((0, 6), (0, 7), (0, 8), (0, 9)),   # runs off the grid
+            ((0, 0), (0, 1), (0, 1), (0, 2)),   # repeats a cell
+        ]:
+            with self.subTest(path=path):
+                self.assertIsNone(path_placement('ORBS', path, 9))
+
+
+def create_words(difficulty, count, prefix):
+    """`count` distinct made-up words of a difficulty"""
+    letters = itertools.product('AEILNORST', repeat=3)
+    return Word.objects.bulk_create([
+        Word(word=prefix + ''.join(next(letters)), definition='Made up',
+             difficulty=difficulty, length=len(prefix) + 3)
+        for _ in range(count)
+    ])
+
+
+class OverlapIndexTests(SimpleTestCase):
+    def words(self, *texts):
+        return [Word(id=index, word=text) for index, text in enumerate(texts, start=1)]
+
+    def test_crossings_count_shared_letter_pairs(self):
+        self.assertEqual(crossings(letter_profile('CAT'), letter_profile('ACT')), 3)
+        self.assertEqual(crossings(letter_profile('LEVEL'), letter_profile('eel')), 6)
+        self.assertEqual(crossings(letter_profile('DOG'), letter_profile('CAT')), 0)
+
+    def test_select_picks_words_that_cross(self):
+        candidates = self.words('ABC', 'ABD', 'XYZ', 'XYW')
+        for seed in range(10):
+            picked = {word.word for word in OverlapIndex().select(candidates, 2, rng=Random(seed))}
+            self.assertIn(picked, [{'ABC', 'ABD'}, {'XYZ', 'XYW'}])
+
+    def test_select_keeps_small_candidate_lists(self):
+        candidates = self.words('CAT', 'DOG')
+        self.assertEqual(OverlapIndex().select(candidates, 5), candidates)
+
+    def test_updates_and_discards_profiles(self):
+        index = OverlapIndex()
+        [word] = self.words('CAT')
+        self.assertEqual(index.profile(word), letter_profile('CAT'))
+        word.word = 'DOG'
+        index.update(word)
+        self.assertEqual(index.profile(word), letter_profile('DOG'))
+        index.discard(word.id)
+        self.assertEqual(len(index), 0)
+
+
+@override_settings(CACHES=TEST_CACHES, WORDORBIT_LEXICON_FILE=None)
+class RandomWordsTests(TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, lexicon, '_lexicon', None)
+        create_words('easy', 200, 'E')
+        # Enough for a hard game, not for the larger overlap sample
+        create_words('hard', 31, 'H')
+
+    def lexicons(self):
+        yield LexiconCache()
+        yield DatabaseLexicon()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'lexicon.bin')
+        write_lexicon_file(path, Word.objects.values_list(
+            'id', 'word', 'definition', 'difficulty'))
+        yield MmapLexicon(path)
+
+    def test_small_difficulty_keeps_its_own_words(self):
+        for source in self.lexicons():
+            lexicon._lexicon = source
+            for seed in range(10):
+                with self.subTest(lexicon=type(source).__name__, seed=seed):
+                    words = get_random_words('hard', WORD_COUNTS['hard'], max_length=12, seed=seed)
+                    self.assertEqual(len(words), WORD_COUNTS['hard'])
+                    self.assertEqual({word.difficulty for word in words}, {'hard'})
+
+    def test_too_small_difficulty_borrows_words(self):
+        lexicon._lexicon = LexiconCache()
+        words = get_random_words('medium', WORD_COUNTS['medium'], max_length=10, seed=1)
+        self.assertEqual(len(words), WORD_COUNTS['medium'])
+
+    def test_count_stops_at_limit(self):
+        for source in self.lexicons():
+            with self.subTest(lexicon=type(source).__name__):
+                self.assertEqual(source.count('hard'), 31)
+                self.assertEqual(source.count('hard', limit=10), 10)
+                self.assertEqual(source.count('hard', max_length=3), 0)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SeenWordsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('seen')
+
+    def test_masks_round_trip(self):
+        mask = word_mask([0, 5, 700])
+        self.assertEqual(mask, 1 | 1 << 5 | 1 << 700)
+        self.assertEqual(mask_from_bytes(mask_to_bytes(mask)), mask)
+        self.assertEqual(mask_from_bytes(None), 0)
+
+    def test_words_are_remembered_for_one_to_two_windows(self):
+        start = (time.time() // SEEN_WORDS_WINDOW) * SEEN_WORDS_WINDOW
+        with mock.patch('time.time', return_value=start):
+            mark_seen_words(self.user, [3, 4])
+        with mock.patch('time.time', return_value=start + SEEN_WORDS_WINDOW):
+            self.assertEqual(get_seen_words(self.user), word_mask([3, 4]))
+            mark_seen_words(self.user, [9])
+            self.assertEqual(get_seen_words(self.user), word_mask([3, 4, 9]))
+        with mock.patch('time.time', return_value=start + 2 * SEEN_WORDS_WINDOW):
+            self.assertEqual(get_seen_words(self.user), word_mask([9]))
+
+    def test_anonymous_players_see_nothing(self):
+        mark_seen_words(AnonymousUser(), [1])
+        self.assertEqual(get_seen_words(AnonymousUser()), 0)
+
+    def test_seen_words_are_avoided(self):
+        words = create_words('easy', 12, 'E')
+        exclude = word_mask(word.id for word in words[:7])
+        with self.settings(WORDORBIT_LEXICON_FILE=None):
+            lexicon._lexicon = LexiconCache()
+            self.addCleanup(setattr, lexicon, '_lexicon', None)
+            picked = get_random_words('easy', 5, max_length=8, seed=1, exclude=exclude)
+        self.assertEqual({word.id for word in picked}, {word.id for word in words[7:]})
+
+
+class GameStoreChecks:
+    """Behaviour every game state store shares; subclasses set up self.store"""
+
+    def test_create_and_load(self):
+        game_id = self.store.create('signed-token')
+        self.assertEqual(self.store.load(game_id),
+                         {'token': 'signed-token', 'found_words': [], 'bonus_words': []})
+
+    def test_finds_are_recorded_once_in_order(self):
+        game_id = self.store.create('signed-token')
+        self.assertTrue(self.store.add_found_word(game_id, 7))
+        self.assertFalse(self.store.add_found_word(game_id, 7))
+        self.assertEqual(self.store.add_found_words(game_id, [3, 7, 5, 3]), [3, 5])
+        self.assertTrue(self.store.add_bonus_word(game_id, 'ORBIT'))
+        self.assertEqual(self.store.add_bonus_words(game_id, ['ORBIT', 'COMET']), ['COMET'])
+        game = self.store.load(game_id)
+        self.assertEqual(game['found_words'], [7, 3, 5])
+        self.assertEqual(game['bonus_words'], ['ORBIT', 'COMET'])
+
+    def test_unknown_and_deleted_games(self):
+        self.assertIsNone(self.store.load('missing'))
+        self.assertFalse(self.store.add_found_word('missing', 1))
+        self.assertEqual(self.store.add_bonus_words('missing', ['ORBIT']), [])
+        game_id = self.store.create('signed-token')
+        self.store.add_found_word(game_id, 1)
+        self.store.delete(game_id)
+        self.assertIsNone(self.store.load(game_id))
+
+    def test_games_expire_with_their_token(self):
+        game_id = self.store.create('signed-token')
+        with mock.patch('time.time', return_value=time.time() + GAME_TOKEN_MAX_AGE + 1):
+            self.assertIsNone(self.store.load(game_id))
+
+    def test_games_are_kept_apart(self):
+        first = self.store.create('first')
+        second = self.store.create('second')
+        self.store.add_found_word(first, 1)
+        self.assertEqual(self.store.load(second)['found_words'], [])
+        self.assertEqual(self.store.load(second)['token'], 'second')
+
+
+class LocMemGameStoreTests(GameStoreChecks, SimpleTestCase):
+    def setUp(self):
+        self.store = LocMemGameStateStore()
+
+    def test_least_recently_used_games_are_dropped(self):
+        store = LocMemGameStateStore(max_entries=2)
+        first = store.create('first')
+        second = store.create('second')
+        store.load(first)
+        store.create('third')
+        self.assertIsNotNone(store.load(first))
+        self.assertIsNone(store.load(second))
+
+
+class SQLiteGameStoreTests(GameStoreChecks, SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = SQLiteGameStateStore(os.path.join(directory.name, 'games.sqlite3'))
+        self.addCleanup(lambda: self.store._connection().close())
+
+    def test_stores_share_the_file(self):
+        game_id = self.store.create('signed-token')
+        self.store.add_found_word(game_id, 4)
+        other = SQLiteGameStateStore(self.store.path)
+        self.addCleanup(lambda: other._connection().close())
+        self.assertEqual(other.load(game_id)['found_words'], [4])
+
+    def test_prune_drops_expired_games(self):
+        old = self.store.create('old')
+        self.store.add_found_word(old, 1)
+        with mock.patch('time.time', return_value=time.time() + GAME_TOKEN_MAX_AGE + 1):
+            recent = self.store.create('recent')
+            self.store.prune()
+        connection = self.store._connection()
+        self.assertEqual([row[0] for row in connection.execute('SELECT id FROM game')], [recent])
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM find').fetchone()[0], 0)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CacheGameStoreTests(GameStoreChecks, SimpleTestCase):
+    def setUp(self):
+        self.store = CacheGameStateStore('shared')
+        self.addCleanup(self.store.cache.clear)
+
+    def test_concurrent_finds_are_all_kept(self):
+        game_id = self.store.create('signed-token')
+        # Two requests that both read before either writes
+        together = threading.Barrier(2, timeout=5)
+        get = self.store.cache.get
+
+        def get_together(*args, **kwargs):
+            value = get(*args, **kwargs)
+            together.wait()
+            return value
+
+        added = {}
+
+        def find(word_id):
+            added[word_id] = self.store.add_found_words(game_id, [5, word_id])
+
+        with mock.patch.object(self.store.cache, 'get', get_together):
+            threads = [threading.Thread(target=find, args=(word_id,)) for word_id in (1, 2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(added[1] + added[2]), [1, 2, 5])
+        self.assertEqual(sorted(self.store.load(game_id)['found_words']), [1, 2, 5])
+
+    def test_delete_drops_every_key(self):
+        game_id = self.store.create('signed-token')
+        self.store.add_found_words(game_id, [1, 2])
+        self.store.add_bonus_word(game_id, 'ORBIT')
+        self.store.delete(game_id)
+        self.assertEqual(self.store.cache._cache, {})
+
+
+class CompactSessionSerializerTests(SimpleTestCase):
+    serializer = CompactSessionSerializer()
+
+    def test_round_trips_session_values(self):
+        session = {
+            '_auth_user_id': '42',
+            '_auth_user_backend': 'django.contrib.auth.backends.ModelBackend',
+            'current_game_id': 'aBc-123_x',
+            'last_game_results': {
+                'score': 1250, 'words_found': 5, 'total_words': 5,
+                'time_taken': 93.5, 'difficulty': 'hard', 'bonus_words': ['ORBIT'],
+            },
+            'numbers': [0, 1, -1, 127, 128, -300, 2 ** 40, -2 ** 63],
+            'flags': [True, False, None],
+            'text': 'caf\u00e9 \U0001f600',
+            'nested': [[], {}, ['']],
+        }
+        data = self.serializer.dumps(session)
+        self.assertEqual(data[0], COMPACT_FORMAT)
+        self.assertEqual(self.serializer.loads(data), session)
+
+    def test_smaller_than_json(self):
+        session = {'_auth_user_id': '42', 'current_game_id': 'aBc-123_x',
+                   'last_game_results': {'score': 1250, 'difficulty': 'easy'}}
+        self.assertLess(len(self.serializer.dumps(session)),
+                        len(JSONSerializer().dumps(session)))
+
+    def test_falls_back_to_json(self):
+        session = {'scores': {1: 'first'}}
+        data = self.serializer.dumps(session)
+        self.assertEqual(data[0], JSON_FORMAT)
+        self.assertEqual(self.serializer.loads(data), {'scores': {'1': 'first'}})
+
+    def test_loads_sessions_written_by_the_json_serializer(self):
+        session = {'_auth_user_id': '42', 'score': [1, 2]}
+        self.assertEqual(self.serializer.loads(JSONSerializer().dumps(session)), session)
+
+    def test_rejects_corrupt_payloads(self):
+        data = self.serializer.dumps({'score': 1})
+        for payload in (b'', data + b'N', bytes((COMPACT_FORMAT,)) + b'?'):
+            with self.subTest(payload=payload), self.assertRaises(ValueError):
+                self.serializer.loads(payload)
+
+
+class FindDigestTests(SimpleTestCase):
+    def test_one_digest_per_placed_word(self):
+        placements = [Placement('CAT', 0, 0, 0, 1), Placement('DOG', 2, 2, -1, 0)]
+        digests = find_digests({'placements': placements}, 'salt')
+        self.assertEqual(digests, sorted([find_digest('salt', 'CAT', '0,0;0,1;0,2'),
+                                          find_digest('salt', 'DOG', '2,2;1,2;0,2')]))
+        self.assertNotIn(find_digest('pepper', 'CAT', '0,0;0,1;0,2'), digests)
+        self.assertNotIn(find_digest('salt', 'CAT', '0,2;0,1;0,0'), digests)
+
+
+class EndGameFindsTests(GameTestCase):
+    """Finds the page confirmed itself are checked again when the game ends"""
+
+    def end_game(self, finds):
+        return self.client.post(reverse('end_game'), {'finds': json.dumps(finds)})
+
+    def test_finds_are_scored(self):
+        finds = self.placed_finds(self.start_game())[:3]
+        response = self.end_game(finds)
+        self.assertRedirects(response, reverse('game_results'), fetch_redirect_response=False)
+        results = self.client.session['last_game_results']
+        self.assertEqual((results['words_found'], results['base_score']), (3, 300))
+        self.assertCountEqual(WordHistory.objects.values_list('word__word', flat=True),
+                              [find['word'] for find in finds])
+
+    def test_paths_off_the_placement_are_rejected(self):
+        finds = self.placed_finds(self.start_game())
+        backwards = {'word': finds[1]['word'],
+                     'path': ';'.join(reversed(finds[1]['path'].split(';')))}
+        other_word = {'word': finds[2]['word'], 'path': finds[3]['path']}
+        self.end_game([finds[0], backwards, other_word])
+        self.assertEqual(self.client.session['last_game_results']['words_found'], 1)
+
+    def test_a_find_reported_twice_counts_once(self):
+        find = self.placed_finds(self.start_game())[0]
+        self.client.post(reverse('check_word'), find)
+        self.end_game([find, find])
+        self.assertEqual(self.client.session['last_game_results']['words_found'], 1)
+        self.assertEqual(WordHistory.objects.count(), 1)
+
+    def test_tampered_and_expired_games_are_refused(self):
+        state = self.start_game()
+        finds = self.placed_finds(state)
+        token = game_store.get_game_store().load(state['game_id'])['token']
+        with mock.patch('time.time', return_value=time.time() - GAME_TOKEN_MAX_AGE - 1):
+            expired = signing.dumps(signing.loads(token, salt=GAME_TOKEN_SALT),
+                                    salt=GAME_TOKEN_SALT, compress=True)
+        for bad_token in (token[:-1] + ('A' if token[-1] != 'A' else 'B'), expired):
+            with self.subTest(token=bad_token):
+                self.play_token(bad_token)
+                response = self.end_game(finds)
+                self.assertRedirects(response, reverse('game_play'), fetch_redirect_response=False)
+        self.assertFalse(GameSession.objects.exists())
+
+
+class ParsePathTests(SimpleTestCase):
+    def test_parses_cells(self):
+        self.assertEqual(parse_path('0,1;0,2'), ((0, 1), (0, 2)))
+
+    def test_rejects_malformed_paths(self):
+        for value in (None, '', '0,x', 5, [1, 2], {}, ['0,1']):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_path(value))
+
+
+class CheckWordsTests(GameTestCase):
+    def test_non_string_paths_are_errors(self):
+        self.start_game()
+        finds = [{'word': 'CAT', 'path': path} for path in (5, [1, 2], {})]
+        response = self.client.post(
+            reverse('check_words'), json.dumps(finds), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.json()['results']],
+            ['error'] * len(finds))
+
+    def test_end_game_ignores_malformed_finds(self):
+        self.start_game()
+        response = self.client.post(
+            reverse('end_game'), {'finds': json.dumps([{'word': 'CAT', 'path': 5}])})
+        self.assertRedirects(response, reverse('game_play'), fetch_redirect_response=False)
+
+
+def reload_urls():
+    """Rebuild the URLconf, which picks its game views when imported"""
+    clear_url_caches()
+    importlib.reload(importlib.import_module('Wordapp.urls'))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+
+
+class AsyncViewTests(GameTestCase):
+    """The async entry points answer like the views they stand in for"""
+
+    def setUp(self):
+        super().setUp()
+        # One logged-in session for both clients
+        self.async_client.cookies = self.client.cookies
+
+    def use_async_views(self):
+        async_views = override_settings(WORDORBIT_ASYNC_VIEWS=True)
+        async_views.enable()
+        self.addCleanup(reload_urls)
+        self.addCleanup(async_views.disable)
+        reload_urls()
+
+    def sync_request(self, method, *args, **kwargs):
+        return getattr(self.client, method)(*args, **kwargs)
+
+    def async_request(self, method, *args, **kwargs):
+        return async_to_sync(getattr(self.async_client, method))(*args, **kwargs)
+
+    def both(self, scenario):
+        """
+        Play `scenario(request, state)` on a copy of one game with the sync
+        views, then on another copy with the async views; returns both results
+        """
+        state = self.start_game()
+        token = game_store.get_game_store().load(state['game_id'])['token']
+        self.play_token(token)
+        sync_result = scenario(self.sync_request, state)
+        self.use_async_views()
+        self.play_token(token)
+        return sync_result, scenario(self.async_request, state)
+
+    def test_check_word(self):
+        def scenario(request, state):
+            find = self.placed_finds(state)[0]
+            return [request('post', reverse('check_word'),
+                            {'word': find['word'], 'path': path}).json()
+                    for path in (find['path'], find['path'], '0,0')]
+
+        sync_result, async_result = self.both(scenario)
+        self.assertEqual([response['status'] for response in sync_result],
+                         ['success', 'duplicate', 'error'])
+        self.assertIn('found_words', sync_result[0])
+        self.assertEqual(async_result, sync_result)
+
+    def test_check_words(self):
+        def scenario(request, state):
+            finds = self.placed_finds(state)[:2]
+            finds.append({'word': finds[0]['word'], 'path': '0,0;0,1'})
+            return request('post', reverse('check_words'), json.dumps(finds),
+                           content_type='application/json').json()
+
+        sync_result, async_result = self.both(scenario)
+        self.assertEqual([result['status'] for result in sync_result['results']],
+                         ['success', 'success', 'error'])
+        self.assertEqual(async_result, sync_result)
+
+    def test_end_game(self):
+        def scenario(request, state):
+            response = request('post', reverse('end_game'),
+                               {'finds': json.dumps(self.placed_finds(state)[:2])})
+            results = self.client.session['last_game_results']
+            return (response.status_code, response['Location'], results['words_found'],
+                    results['base_score'], 'current_game_id' in self.client.session)
+
+        sync_result, async_result = self.both(scenario)
+        self.assertEqual(sync_result, (302, reverse('game_results'), 2, 200, False))
+        self.assertEqual(async_result, sync_result)
+        self.assertEqual(GameSession.objects.count(), 2)
+
+    def test_home_and_leaderboard(self):
+        def scenario(request, state):
+            pages = []
+            for name in ('home', 'leaderboard'):
+                response = request('get', reverse(name))
+                # The CSRF token is new on every render
+                pages.append((response.status_code, re.sub(
+                    r'name="csrfmiddlewaretoken" value="[^"]*"', '',
+                    response.content.decode())))
+            return pages
+
+        sync_result, async_result = self.both(scenario)
+        self.assertEqual([status for status, _ in sync_result], [200, 200])
+        self.assertEqual(async_result, sync_result)
+
+
+# One counter shard, so no game pays for creating a shard row
+@override_settings(CACHES=TEST_CACHES, WORDORBIT_COUNTER_SHARDS=1)
+class CompleteGameTests(TestCase):
+    def setUp(self):
+        self.addCleanup(clear_caches)
+        self.user = User.objects.create_user('player')
+        self.words = create_words('easy', 8, 'C')
+        self.games = 0
+
+    def complete(self, score, word_count):
+        self.games += 1
+        results = {'score': score, 'words_found': word_count, 'total_words': 10,
+                   'time_taken': 200, 'difficulty': 'easy'}
+        state = {'game_id': f'game-{self.games}',
+                 'found_words': [word.id for word in self.words[:word_count]]}
+        complete_game(self.user, state, results)
+
+    def test_a_lower_score_keeps_the_highest(self):
+        self.complete(300, 3)
+        self.complete(100, 1)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(
+            (profile.total_games, profile.total_score, profile.highest_score,
+             profile.words_discovered),
+            (2, 400, 300, 4))
+        self.assertEqual(WordHistory.objects.count(), 4)
+
+    def test_everything_is_written_or_nothing(self):
+        with mock.patch('Wordapp.services.update_profile', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.complete(300, 3)
+        self.assertFalse(GameSession.objects.exists())
+        self.assertFalse(WordHistory.objects.exists())
+
+    def test_queries_do_not_grow_with_the_words_found(self):
+        # The first game creates the profile; compare later ones
+        self.complete(100, 1)
+        with CaptureQueriesContext(connection) as one_word:
+            self.complete(100, 1)
+        with CaptureQueriesContext(connection) as many_words:
+            self.complete(100, 8)
+        self.assertEqual(len(many_words), len(one_word))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AchievementTests(TestCase):
+    GAME = {'score': 100, 'words_found': 1, 'total_words': 5, 'time_taken': 300}
+
+    def setUp(self):
+        self.addCleanup(clear_caches)
+        self.user = User.objects.create_user('player')
+
+    def award(self, game=GAME, **totals):
+        profile = UserProfile(user=self.user, **totals)
+        with self.captureOnCommitCallbacks(execute=True):
+            return award_achievements(self.user.id, profile, game)
+
+    def earned(self, user):
+        return set(Achievement.objects.filter(user=user).values_list('name', flat=True))
+
+    def test_rules_fire_at_their_thresholds(self):
+        base = {'total_games': 0, 'words_discovered': 0, 'score': 0,
+                'words_found': 1, 'total_words': 5, 'time_taken': 300}
+        thresholds = [
+            ('First Steps', {'total_games': 0}, {'total_games': 1}),
+            ('Dedicated Player', {'total_games': 9}, {'total_games': 10}),
+            ('Century Club', {'words_discovered': 99}, {'words_discovered': 100}),
+            ('High Scorer', {'score': 499}, {'score': 500}),
+            ('Word Master', {'words_found': 4}, {'words_found': 5}),
+            ('Speed Demon', {'words_found': 5, 'time_taken': 120},
+             {'words_found': 5, 'time_taken': 119}),
+        ]
+        rules = {rule.name: rule for rule in RULES}
+        self.assertCountEqual(rules, [name for name, _, _ in thresholds])
+        for name, below, at in thresholds:
+            with self.subTest(rule=name):
+                values = {**base, **below}
+                self.assertFalse(rules[name].earned(values, values))
+                values = {**base, **at}
+                self.assertTrue(rules[name].earned(values, values))
+        # Players who missed their first award still get it later
+        self.assertTrue(rules['First Steps'].earned({'total_games': 3}))
+
+    def test_achievements_are_awarded_once(self):
+        game = {**self.GAME, 'score': 600, 'words_found': 5}
+        self.assertCountEqual(self.award(game, total_games=1),
+                              ['First Steps', 'High Scorer', 'Word Master'])
+        self.assertEqual(self.award(game, total_games=2), [])
+        # A worker whose cached set is out of date inserts nothing twice
+        with mock.patch('Wordapp.achievements.earned_achievements', return_value=frozenset()):
+            self.award(game, total_games=3)
+        self.assertEqual(Achievement.objects.filter(user=self.user).count(), 3)
+
+    def test_nothing_new_is_cheap(self):
+        self.award(total_games=1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.award(total_games=2), [])
+        clear_caches()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.award(total_games=2), [])
+
+    def test_reevaluate_backfills_existing_profiles(self):
+        veteran = User.objects.create_user('veteran')
+        UserProfile.objects.create(user=veteran, total_games=12, words_discovered=150)
+        UserProfile.objects.create(user=self.user)
+        self.assertEqual(earned_achievements(veteran.id), frozenset())
+
+        self.assertEqual(reevaluate_achievements(chunk_size=1), 3)
+        expected = {'First Steps', 'Dedicated Player', 'Century Club'}
+        self.assertEqual(self.earned(veteran), expected)
+        self.assertEqual(self.earned(self.user), set())
+        self.assertEqual(earned_achievements(veteran.id), expected)
+        self.assertEqual(reevaluate_achievements(), 0)
+
+    def test_command_checks_named_rules(self):
+        veteran = User.objects.create_user('veteran')
+        UserProfile.objects.create(user=veteran, total_games=12, words_discovered=150)
+        call_command('reevaluate_achievements', '--rule', 'Century Club', stdout=io.StringIO())
+        self.assertEqual(self.earned(veteran), {'Century Club'})
+        with self.assertRaises(CommandError):
+            call_command('reevaluate_achievements', '--rule', 'Nope', stdout=io.StringIO())
+
+
+@override_settings(WORDORBIT_JOB_QUEUE=True)
+class JobTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        handlers = mock.patch.dict(jobs.HANDLERS, {
+            'note': lambda **payload: self.calls.append(payload),
+            'broken': self.broken,
+        })
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def broken(self, word):
+        Word.objects.create(word=word, definition='Never kept', difficulty='easy')
+        raise RuntimeError('handler failed')
+
+    def run_claimed(self):
+        return [jobs.run_job(pk) for pk in jobs.claim_jobs(10)]
+
+    def test_runs_inline_with_the_queue_off(self):
+        with self.settings(WORDORBIT_JOB_QUEUE=False):
+            self.assertIsNone(jobs.enqueue('note', {'value': 1}))
+        self.assertEqual(self.calls, [{'value': 1}])
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_jobs_are_refused(self):
+        with self.assertRaises(LookupError):
+            jobs.enqueue('missing')
+
+    def test_a_key_is_only_queued_once(self):
+        first = jobs.enqueue('note', {'value': 1}, key='game:1')
+        second = jobs.enqueue('note', {'value': 2}, key='game:1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(self.run_claimed(), [True])
+        self.assertEqual(self.calls, [{'value': 1}])
+
+    def test_claims_only_due_jobs_once(self):
+        due = jobs.enqueue('note', {'value': 1})
+        jobs.enqueue('note', {'value': 2}, delay=60)
+        self.assertEqual(jobs.claim_jobs(10), [due.pk])
+        self.assertEqual(jobs.claim_jobs(10), [])
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.attempts), (Job.RUNNING, 1))
+
+    def test_failures_roll_back_and_retry_with_backoff(self):
+        queued = jobs.enqueue('broken', {'word': 'GHOST'}, max_attempts=2)
+        with self.assertLogs('Wordapp.jobs', 'ERROR'):
+            self.assertEqual(self.run_claimed(), [False])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.PENDING)
+        self.assertGreater(queued.run_after, timezone.now())
+        self.assertIn('handler failed', queued.last_error)
+        self.assertFalse(Word.objects.filter(word='GHOST').exists())
+        # Not due again until the backoff has passed
+        self.assertEqual(jobs.claim_jobs(10), [])
+
+        Job.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        with self.assertLogs('Wordapp.jobs', 'ERROR'):
+            self.assertEqual(self.run_claimed(), [False])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.FAILED, 2))
+
+    def test_retry_delay_grows_and_is_capped(self):
+        for attempts in range(1, 20):
+            delay = jobs.retry_delay(attempts)
+            full = min(jobs.RETRY_MAX_DELAY, jobs.RETRY_BASE_DELAY * 2 ** (attempts - 1))
+            self.assertTrue(full / 2 <= delay <= full)
+
+    def test_stale_jobs_are_requeued_or_failed(self):
+        retried = jobs.enqueue('note', {'value': 1})
+        exhausted = jobs.enqueue('note', {'value': 2}, max_attempts=1)
+        jobs.claim_jobs(10)
+        Job.objects.update(
+            locked_at=timezone.now() - timedelta(seconds=jobs.STALE_AFTER + 1))
+        self.assertEqual(jobs.requeue_stale_jobs(), 2)
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retried.status, Job.PENDING)
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertEqual(self.run_claimed(), [True])
+
+
+@override_settings(CACHES=TEST_CACHES, WORDORBIT_JOB_QUEUE=True)
+class RecordGameJobTests(TestCase):
+    def test_finished_game_is_recorded_by_the_worker(self):
+        user = User.objects.create_user('player')
+        words = create_words('easy', 3, 'E')
+        results = {'score': 300, 'words_found': 3, 'total_words': 3,
+                   'time_taken': 60, 'difficulty': 'easy'}
+        state = {'game_id': 'stored-game', 'found_words': [word.id for word in words]}
+        game = complete_game(user, state, results)
+
+        queued = Job.objects.get()
+        self.assertEqual((queued.name, queued.key), ('record_game', 'game:stored-game'))
+        self.assertFalse(WordHistory.objects.exists())
+
+        self.assertEqual([jobs.run_job(pk) for pk in jobs.claim_jobs(10)], [True])
+        self.assertEqual(WordHistory.objects.filter(game_session=game).count(), 3)
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual((profile.total_games, profile.highest_score), (1, 300))
+
+    def test_a_game_ended_twice_is_recorded_once(self):
+        user = User.objects.create_user('player')
+        words = create_words('easy', 3, 'E')
+        results = {'score': 300, 'words_found': 3, 'total_words': 3,
+                   'time_taken': 60, 'difficulty': 'easy'}
+        state = {'game_id': 'stored-game', 'found_words': [word.id for word in words]}
+        first = complete_game(user, state, results)
+        second = complete_game(user, dict(state), results)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(GameSession.objects.count(), 1)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual([jobs.run_job(pk) for pk in jobs.claim_jobs(10)], [True])
+        self.assertEqual(WordHistory.objects.count(), 3)
+
+
+def create_games(user, scores, difficulty='easy'):
+    return GameSession.objects.bulk_create([
+        GameSession(user=user, difficulty=difficulty, grid_size=8, words_found=1,
+                    total_words=5, score=score, time_taken=60)
+        for score in scores
+    ])
+
+
+@override_settings(CACHES=TEST_CACHES, WORDORBIT_LEADERBOARD_SIZE=3)
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.player = User.objects.create_user('ranked')
+
+    def play(self, *scores, difficulty='easy'):
+        entered = []
+        for game in create_games(self.player, scores, difficulty):
+            with self.captureOnCommitCallbacks(execute=True):
+                entered.append(record_score(game, self.player.username))
+        return entered
+
+    def board_scores(self, board='all', window='all'):
+        return [entry.score for entry in top_scores(board, window)]
+
+    def test_boards_are_trimmed_to_size(self):
+        self.play(100, 300, 200, 400, 50)
+        for window in ('all', 'weekly', 'daily'):
+            self.assertEqual(self.board_scores('all', window), [400, 300, 200])
+            self.assertEqual(self.board_scores('easy', window), [400, 300, 200])
+        self.assertEqual(LeaderboardEntry.objects.count(), 6 * 3)
+
+    def test_a_score_below_every_board_costs_no_query(self):
+        self.play(300, 200, 100)
+        [game] = create_games(self.player, [10])
+        with self.assertNumQueries(0):
+            self.assertEqual(record_score(game, 'ranked'), [])
+
+    def test_ties_with_last_place_stay_out(self):
+        entered = self.play(300, 200, 100, 100)
+        self.assertEqual(entered[-1], [])
+        self.assertEqual(self.board_scores(), [300, 200, 100])
+
+    def test_difficulty_boards_are_separate(self):
+        self.play(100, difficulty='easy')
+        self.play(500, difficulty='hard')
+        self.assertEqual(self.board_scores('easy'), [100])
+        self.assertEqual(self.board_scores('hard'), [500])
+        self.assertEqual(self.board_scores(), [500, 100])
+
+    def test_boards_have_room_until_full(self):
+        self.play(300, 200)
+        boards = game_boards('easy')
+        self.assertEqual(set(_thresholds(boards, 3).values()), {OPEN})
+        self.play(100)
+        self.assertEqual(set(_thresholds(boards, 3).values()), {100})
+
+    def test_a_new_day_drops_the_old_daily_board(self):
+        [game] = create_games(self.player, [100])
+        LeaderboardEntry.objects.create(
+            board='all', window='daily', period=timezone.localdate() - timedelta(days=1),
+            score=900, difficulty='easy', user=self.player, username='ranked',
+            game_session=game, played_at=game.created_at)
+        self.play(200)
+        self.assertFalse(LeaderboardEntry.objects.filter(score=900).exists())
+        self.assertEqual(self.board_scores('all', 'daily'), [200])
+
+    def test_deleted_games_leave_the_boards(self):
+        self.play(300, 200, 100)
+        GameSession.objects.filter(score=300).delete()
+        self.assertEqual(self.board_scores(), [200, 100])
+        self.play(50)
+        self.assertEqual(self.board_scores(), [200, 100, 50])
+
+    def test_rebuild_matches_the_games(self):
+        create_games(self.player, [100, 300, 200, 400])
+        create_games(self.player, [250], difficulty='hard')
+        rebuild_leaderboards()
+        self.assertEqual(self.board_scores(), [400, 300, 250])
+        self.assertEqual(self.board_scores('easy', 'daily'), [400, 300, 200])
+        self.assertEqual(self.board_scores('hard', 'weekly'), [250])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ScoresPageTests(TestCase):
+    def setUp(self):
+        self.player = User.objects.create_user('ranked')
+        self.other = User.objects.create_user('other')
+        # Plenty of ties, so pages break in the middle of equal scores
+        create_games(self.other, [300, 200, 200, 200, 100, 100, 50])
+        create_games(self.player, [200, 75])
+        create_games(self.other, [200, 400], difficulty='hard')
+
+    def all_pages(self, difficulty, limit):
+        rows, cursor = scores_page(difficulty, limit=limit)
+        while cursor:
+            page, cursor = scores_page(difficulty, parse_cursor(cursor), limit)
+            rows += page
+        return rows
+
+    def test_pages_follow_the_full_ranking(self):
+        for difficulty in ('all', 'easy', 'hard'):
+            for limit in (1, 2, 3, 50):
+                with self.subTest(difficulty=difficulty, limit=limit):
+                    rows = self.all_pages(difficulty, limit)
+                    self.assertEqual(
+                        [row['id'] for row in rows],
+                        list(_ranked_games(difficulty).values_list('id', flat=True)))
+                    self.assertEqual([row['rank'] for row in rows],
+                                     list(range(1, len(rows) + 1)))
+
+    def test_last_page_has_no_cursor(self):
+        rows, cursor = scores_page('hard', limit=2)
+        self.assertEqual(len(rows), 2)
+        self.assertIsNone(cursor)
+
+    def test_parse_cursor_rejects_garbage(self):
+        for value in (None, '', 'abc', '1.2', '1.2.x', '1.2.3.4'):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_cursor(value))
+        self.assertEqual(parse_cursor('200.7.3'), (200, 7, 3))
+
+    def test_my_rank_is_the_best_game_position(self):
+        ranked = list(_ranked_games('all').values_list('user_id', flat=True))
+        self.assertEqual(my_rank(self.player.id),
+                         {'rank': ranked.index(self.player.id) + 1, 'score': 200})
+        self.assertIsNone(my_rank(self.player.id, 'hard'))
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'checks the SQLite query plan')
+    def test_deep_page_is_an_index_search(self):
+        _, cursor = scores_page('all', limit=3)
+        with CaptureQueriesContext(connection) as queries:
+            scores_page('all', parse_cursor(cursor), limit=3)
+        sql = queries[0]['sql']
+        # An OR of the two keyset conditions can be planned as a scan from
+        # the top on larger tables, even where this small one searches
+        self.assertNotIn(' OR ', sql)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('SEARCH Wordapp_gamesession USING INDEX game_score_idx', plan)
+
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches = override_settings(CACHES=file_shared_cache(directory.name))
+        caches.enable()
+        self.addCleanup(caches.disable)
+
+    def bump(self, *names):
+        with self.captureOnCommitCallbacks(execute=True):
+            fragments.bump_data_version(*names)
+
+    def test_bump_changes_only_the_named_versions(self):
+        before = fragments.data_version(fragments.USERS, fragments.GAMES)
+        self.bump(fragments.GAMES)
+        after = fragments.data_version(fragments.USERS, fragments.GAMES)
+        self.assertEqual(before.split('.')[0], after.split('.')[0])
+        self.assertNotEqual(before.split('.')[1], after.split('.')[1])
+
+    def test_versions_never_expire(self):
+        self.bump(fragments.GAMES)
+        self.bump(fragments.GAMES)
+        version = fragments.data_version(fragments.GAMES)
+        with mock.patch('time.time', return_value=time.time() + 24 * 60 * 60):
+            self.assertEqual(fragments.data_version(fragments.GAMES), version)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LeaderboardPageTests(TestCase):
+    def setUp(self):
+        self.addCleanup(clear_caches)
+        self.winner = User.objects.create_user('winner')
+        self.other = User.objects.create_user('other')
+        create_games(self.winner, [500])
+        UserProfile.objects.filter(user=self.winner).update(highest_score=500, total_games=1)
+        rebuild_leaderboards()
+
+    def test_boards_are_cached_once_for_every_visitor(self):
+        self.client.force_login(self.winner)
+        first = self.client.get(reverse('leaderboard'))
+        self.assertContains(first, 'Your best game ranks <strong>#1</strong>')
+
+        self.client.force_login(self.other)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(reverse('leaderboard'))
+        board_queries = [query['sql'] for query in queries.captured_queries
+                         if 'Wordapp_userprofile' in query['sql']
+                         or 'Wordapp_leaderboardentry' in query['sql']]
+        self.assertEqual(board_queries, [])
+        self.assertContains(second, 'winner')
+        self.assertNotContains(second, 'Your best game ranks')
+        self.assertContains(second, f'[data-user-id="{self.other.id}"]')
+
+        self.client.logout()
+        self.assertContains(self.client.get(reverse('leaderboard')), 'winner')
+
+
+@override_settings(CACHES=TEST_CACHES, WORDORBIT_COUNTER_SHARDS=4)
+class CounterTests(TestCase):
+    def test_increments_spread_over_shards(self):
+        for _ in range(40):
+            increment('clicks')
+        increment('clicks', -5)
+        self.assertEqual(counter_values('clicks'), {'clicks': 35})
+        shards = set(GlobalCounter.objects.filter(name='clicks').values_list('shard', flat=True))
+        self.assertTrue(1 < len(shards) <= 4)
+
+    def test_values_are_read_in_one_query(self):
+        increment('clicks', 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(counter_values('clicks', 'missing'), {'clicks': 3, 'missing': 0})
+
+    def test_signals_keep_counts(self):
+        user = User.objects.create_user('counted')
+        words = [Word.objects.create(word=word, definition='A word', difficulty='easy')
+                 for word in ('ORBIT', 'COMET')]
+        [game] = create_games(user, [100])
+        increment(fragments.GAMES)
+        self.assertEqual(counter_values(fragments.USERS, fragments.WORDS, fragments.GAMES),
+                         {fragments.USERS: 1, fragments.WORDS: 2, fragments.GAMES: 1})
+        words[0].delete()
+        game.delete()
+        self.assertEqual(counter_values(fragments.WORDS, fragments.GAMES),
+                         {fragments.WORDS: 1, fragments.GAMES: 0})
+
+    def test_count_rows_reads_in_chunks(self):
+        user = User.objects.create_user('counted')
+        create_games(user, range(25))
+        for chunk_size in (1, 7, 25, 100):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(count_rows(GameSession.objects.all(), chunk_size), 25)
+
+    def test_reconcile_fixes_drift(self):
+        user = User.objects.create_user('counted')
+        create_games(user, range(5))
+        increment(fragments.GAMES, 2)
+        self.assertEqual(reconcile_counters([fragments.GAMES], chunk_size=2),
+                         {fragments.GAMES: (2, 5)})
+        self.assertEqual(GlobalCounter.objects.filter(name=fragments.GAMES).count(), 1)
+        self.assertEqual(counter_values(fragments.GAMES), {fragments.GAMES: 5})
@@ -0,0 +1,119 @@
+import hashlib
+import hmac
+import time
+
+from django.core import signing
+from django.core.cache import cache
+
+from .grid import Grid
+from .placement import ALL_DIRECTIONS, Placement
+
+# Namespaces game tokens so no other signed value can be passed off as one
+GAME_TOKEN_SALT = 'Wordapp.game'
+
+# Tokens older than this are rejected (seconds)
+GAME_TOKEN_MAX_AGE = 24 * 60 * 60
+
+
+def dump_game_token(puzzle, start_time=None):
+    """
+    Sign the few values needed to rebuild a game: its seed, difficulty,
+    the ids of the words in play, every place a word occurs as
+    [word index, row, col, direction index], the grid letters and when it
+    started (epoch seconds)
+    """
+    word_index = {word: index for index, word in enumerate(puzzle['words'])}
+    occurrences = puzzle.get('occurrences', puzzle['placements'])
+    payload = {
+        's': puzzle['seed'],
+        'd': puzzle['difficulty'],
+        'w': puzzle['word_ids'],
+        'p': [
+            [word_index[placement.word], placement.row, placement.col,
+             ALL_DIRECTIONS.index(placement.direction)]
+            for placement in occurrences
+        ],
+        'g': puzzle['grid'].to_string(),
+        't': int(start_time if start_time is not None else time.time()),
+    }
+    return signing.dumps(payload, salt=GAME_TOKEN_SALT, compress=True)
+
+
+def load_game_token(token, max_age=GAME_TOKEN_MAX_AGE):
+    """Decode a game token, returning None if it is missing, forged or expired"""
+    if not token:
+        return None
+    try:
+        payload = signing.loads(token, salt=GAME_TOKEN_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return None
+    return {
+        'seed': payload['s'],
+        'difficulty': payload['d'],
+        'word_ids': payload['w'],
+        'placements': payload.get('p', []),
+        'grid': payload.get('g'),
+        'start_time': payload['t'],
+    }
+
+
+def path_string(cells):
+    """Cell path in the "row,col;row,col" form the browser sends"""
+    return ';'.join(f"{row},{col}" for row, col in cells)
+
+
+def find_digest(salt, word, path):
+    """HMAC-SHA256 of "WORD|path" under a game's salt, as hex"""
+    return hmac.new(salt.encode(), f"{word}|{path}".encode(), hashlib.sha256).hexdigest()
+
+
+def find_digests(puzzle, salt):
+    """
+    Digest of every valid find in a puzzle, so the page can recognise a
+    correct word and path without asking the server
+    The salt ships with the page, so this only hides the answers from a
+    casual look; every find is still checked by the server
+    """
+    occurrences = puzzle.get('occurrences', puzzle['placements'])
+    return sorted({
+        find_digest(salt, placement.word, path_string(placement.cells()))
+        for placement in occurrences
+    })
+
+
+def game_placements(state, words):
+    """
+    Rebuild the placements (every occurrence of every word) of a decoded game
+    `words` maps word id to Word, as returned by in_bulk()
+    """
+    placements = []
+    for index, row, col, direction in state['placements']:
+        word = words.get(state['word_ids'][index])
+        if word is not None:
+            row_step, col_step = ALL_DIRECTIONS[direction]
+            placements.append(Placement(
+                word.word.upper(), row, col, row_step, col_step))
+    return placements
+
+
+def game_grid(state):
+    """
+    Letter grid of a decoded game, or None if it cannot be rebuilt
+    Tokens carry the letters; older ones are rebuilt from their seed, which
+    is refused if the words have changed since
+    """
+    if state.get('grid'):
+        return Grid.from_string(state['grid'])
+
+    key = f"wordorbit:grid:{state['difficulty']}:{state['seed']}"
+    value = cache.get(key)
+    if value is not None:
+        return Grid.from_string(value)
+
+    from .utils import build_puzzle
+
+    puzzle = build_puzzle(state['difficulty'], seed=state['seed'])
+    if puzzle is None or puzzle['word_ids'] != state['word_ids']:
+        return None
+    cache.set(key, puzzle['grid'].to_string(), GAME_TOKEN_MAX_AGE)
+    return puzzle['grid']
@@ -1,11 +1,18 @@
 # ==================== Wordapp/urls.py ====================
 
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# The hot game views have async versions for ASGI deployments
+if getattr(settings, 'WORDORBIT_ASYNC_VIEWS', False):
+    from . import async_views as game_views
+else:
+    game_views = views
+
 urlpatterns = [
     # Home and main pages
-    path('', views.home, name='home'),
+    path('', game_views.home, name='home'),
     path('about/', views.about, name='about'),
 
     # Authentication
@@ -15,14 +22,17 @@ urlpatterns = [
 
     # Game pages
     path('play/', views.game_play, name='game_play'),
-    path('check-word/', views.check_word, name='check_word'),
-    path('end-game/', views.end_game, name='end_game'),
+    path('check-word/', game_views.check_word, name='check_word'),
+    path('check-words/', game_views.check_words, name='check_words'),
+    path('end-game/', game_views.end_game, name='end_game'),
     path('results/', views.game_results, name='game_results'),
 
     # User pages
     path('profile/', views.profile, name='profile'),
     path('profile/edit/', views.edit_profile, name='edit_profile'),
-    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('leaderboard/', game_views.leaderboard, name='leaderboard'),
+    path('leaderboard/all/', views.all_scores, name='all_scores'),
+    path('leaderboard/scores/', views.scores_api, name='scores_api'),
 
     # Contact and feedback
     path('contact/', views.contact, name='contact'),
@@ -1,42 +1,132 @@
 import random
-from .models import Word
-
-
-def get_random_words(difficulty, count=5, max_length=None):
+import secrets
+from django.conf import settings
+from .batch import generate_word_grids  # noqa: F401 - batch API
+from .grid import Grid
+from .lexicon import get_lexicon
+from .overlap import CANDIDATE_FACTOR, get_overlap_index
+from .placement import PLACEMENT_TIME_BUDGET, place_words
+from .scanner import WordScanner
+from .seen import word_mask
+
+# Grid size and number of words per difficulty level
+GRID_SIZES = {'easy': 8, 'medium': 10, 'hard': 12}
+WORD_COUNTS = {'easy': 5, 'medium': 7, 'hard': 10}
+
+# Fewest placed words a puzzle needs to be playable
+MIN_PUZZLE_WORDS = 3
+
+# Bonus word mode (WORDORBIT_BONUS_WORDS): points per extra dictionary word
+# traced in the grid, and the shortest word that counts
+BONUS_WORD_POINTS = 50
+MIN_BONUS_WORD_LENGTH = 3
+
+
+def get_random_words(difficulty, count=5, max_length=None, seed=None, exclude=0):
     """
     Get random words based on difficulty level
     Filters out words that are too long for the grid
+    The same seed picks the same words as long as the word table is unchanged
+    Words come from the in-process lexicon cache, so this runs no queries
+    With WORDORBIT_OVERLAP_SELECTION on, a few times more words are sampled
+    and the set that crosses best is kept, so they interlock in the grid
+    `exclude` is a bitset of word ids (see seen.py) to avoid where possible
+    """
+    rng = random.Random(seed) if seed is not None else random
+    lexicon = get_lexicon()
+    overlap = getattr(settings, 'WORDORBIT_OVERLAP_SELECTION', True)
+    if not overlap and not exclude:
+        return lexicon.sample(difficulty, count, max_length=max_length, rng=rng)
+
+    # A small difficulty can hold enough words for the game but not for the
+    # larger sample; sampling more than it holds would spill the sample into
+    # other difficulties, which is only wanted when it cannot fill a game
+    wanted = count * CANDIDATE_FACTOR
+    available = lexicon.count(difficulty, max_length=max_length, limit=wanted)
+    candidates = lexicon.sample(
+        difficulty, max(min(wanted, available), count), max_length=max_length, rng=rng)
+
+    if exclude:
+        unseen = [word for word in candidates if not exclude >> word.id & 1]
+        if len(unseen) < count:
+            # Not enough fresh words, let the fewest repeats back in
+            seen = [word for word in candidates if exclude >> word.id & 1]
+            unseen += seen[:count - len(unseen)]
+        candidates = unseen
+
+    if not overlap:
+        return candidates[:count]
+    return get_overlap_index().select(candidates, count, rng=rng)
+
+
+def build_puzzle(difficulty, seed=None, exclude=0):
+    """
+    Build a ready-to-play puzzle for a difficulty level
+    Returns a dict with the seed, the grid, its placement manifest, every
+    occurrence of the words in the grid, the words that were placed, their
+    ids and definitions, or None if there are no words to build from
+    Building again with the same seed (and exclude) gives the same puzzle
     """
-    words = Word.objects.filter(difficulty=difficulty)
+    if seed is None:
+        seed = secrets.randbits(32)
+    grid_size = GRID_SIZES.get(difficulty, 8)
+    word_count = WORD_COUNTS.get(difficulty, 5)
+
+    # IMPORTANT: Set max word length to grid size to ensure all words fit
+    max_word_length = grid_size
+
+    # Get words with length validation
+    words = get_random_words(
+        difficulty, count=word_count, max_length=max_word_length, seed=seed,
+        exclude=exclude)
+
+    if not words:
+        return None
 
-    # Get all words first, then filter by length in Python
-    words_list = list(words)
+    word_list = [word.word.upper() for word in words]
+    word_definitions = {word.word.upper(): word.definition for word in words}
+    word_ids = {word.word.upper(): word.id for word in words}
 
-    # Filter by max length if specified
-    if max_length:
-        words_list = [word for word in words_list if len(
-            word.word) <= max_length]
+    # Generate grid with validated words; the manifest lists exactly the
+    # words that made it into the grid and where
+    grid, placements = generate_word_grid(word_list, grid_size, seed=seed)
 
-    if len(words_list) < count:
-        # Try all difficulties if not enough words
-        words_list = list(Word.objects.all())
-        if max_length:
-            words_list = [word for word in words_list if len(
-                word.word) <= max_length]
+    final_word_list = [placement.word for placement in placements]
+    final_definitions = {word: word_definitions[word] for word in final_word_list}
 
-    if len(words_list) < count:
-        return words_list
+    # Audit the finished grid in one pass: every occurrence of every word,
+    # including copies the filler letters spelled by accident, is a valid find
+    occurrences = WordScanner(final_word_list).scan(grid)
+    if len(occurrences) > len(placements):
+        print(
+            f"Warning: Filler letters added {len(occurrences) - len(placements)} extra word occurrence(s)")
 
-    return random.sample(words_list, min(count, len(words_list)))
+    return {
+        'seed': seed,
+        'difficulty': difficulty,
+        'grid_size': grid_size,
+        'words': final_word_list,
+        'word_ids': [word_ids[word] for word in final_word_list],
+        'word_mask': word_mask(word_ids[word] for word in final_word_list),
+        'definitions': final_definitions,
+        'grid': grid,
+        'placements': placements,
+        'occurrences': occurrences,
+    }
 
 
-def generate_word_grid(words, size):
+def generate_word_grid(words, size, seed=None):
     """
     Generate a grid with hidden words
     Words can be placed horizontally, vertically, or diagonally
     ENCOURAGES letter reuse by prioritizing intersecting placements
     Only includes words that can actually be placed
+    The same words, size and seed always give the same grid
+    Returns (grid, placements) where placements is the manifest of
+    Placement tuples for every word that was placed
     """
+    rng = random.Random(seed) if seed is not None else random
+
     # Filter out words that are too long for the grid
     valid_words = [word for word in words if len(word) <= size]
 
@@ -44,129 +134,40 @@ def generate_word_grid(words, size):
         print(
             f"Warning: Filtered out {len(words) - len(valid_words)} words that were too long for {size}x{size} grid")
 
-    grid = [['' for _ in range(size)] for _ in range(size)]
-    placed_words = []
-    failed_words = []
-
-    # Directions
-    directions = [
-        (0, 1),   # Horizontal
-        (1, 0),   # Vertical
-        (1, 1),   # Diagonal down-right
-        (1, -1),  # Diagonal down-left
-    ]
-
-    # Sort words by length (longer first)
-    sorted_words = sorted(valid_words, key=len, reverse=True)
-
-    for word_index, word in enumerate(sorted_words):
-        placed = False
-        attempts = 0
-        max_attempts = 300  # Increased from 200
-
-        best_placement = None
-        best_intersections = 0
-
-        while attempts < max_attempts:
-            direction = random.choice(directions)
-            row_step, col_step = direction
-
-            # Calculate valid starting positions
-            if row_step == 0:  # Horizontal
-                if size - len(word) < 0:
-                    attempts += 1
-                    continue
-                start_row = random.randint(0, size - 1)
-                start_col = random.randint(0, size - len(word))
-            elif col_step == 0:  # Vertical
-                if size - len(word) < 0:
-                    attempts += 1
-                    continue
-                start_row = random.randint(0, size - len(word))
-                start_col = random.randint(0, size - 1)
-            elif col_step == 1:  # Diagonal down-right
-                if size - len(word) < 0:
-                    attempts += 1
-                    continue
-                start_row = random.randint(0, size - len(word))
-                start_col = random.randint(0, size - len(word))
-            else:  # Diagonal down-left
-                if size - len(word) < 0:
-                    attempts += 1
-                    continue
-                start_row = random.randint(0, size - len(word))
-                start_col = random.randint(len(word) - 1, size - 1)
-
-            # Check if word can be placed
-            can_place, intersections = can_place_word_with_intersections(
-                grid, word, start_row, start_col, row_step, col_step
-            )
-
-            if can_place:
-                # For first word or if no intersections yet, place immediately
-                if word_index == 0 or attempts > 200:
-                    place_word(grid, word, start_row,
-                               start_col, row_step, col_step)
-                    placed_words.append({
-                        'word': word,
-                        'start': (start_row, start_col),
-                        'direction': (row_step, col_step)
-                    })
-                    placed = True
-                    break
-
-                # For other words, try to find placement with most intersections
-                if intersections > best_intersections:
-                    best_intersections = intersections
-                    best_placement = (start_row, start_col, row_step, col_step)
-
-                # If we found a good intersection, use it
-                if intersections >= 2 or (intersections >= 1 and attempts > 50):
-                    place_word(grid, word, start_row,
-                               start_col, row_step, col_step)
-                    placed_words.append({
-                        'word': word,
-                        'start': (start_row, start_col),
-                        'direction': (row_step, col_step)
-                    })
-                    placed = True
-                    break
-
-            attempts += 1
-
-        # If no intersection found but we have a valid placement, use it
-        if not placed and best_placement:
-            start_row, start_col, row_step, col_step = best_placement
-            place_word(grid, word, start_row, start_col, row_step, col_step)
-            placed_words.append({
-                'word': word,
-                'start': (start_row, start_col),
-                'direction': (row_step, col_step)
-            })
-            placed = True
-
-        if not placed:
-            print(f"Warning: Could not place word '{word}' in grid")
-            failed_words.append(word)
+    grid = Grid(size)
+
+    # Enumerate every legal placement and backtrack over them, longest
+    # words first, preferring spots that share letters with placed words.
+    # A seeded grid must not depend on machine speed, so only the step
+    # budget bounds its search
+    time_budget = PLACEMENT_TIME_BUDGET if seed is None else None
+    placed_words = place_words(
+        valid_words, size, rng=rng, time_budget=time_budget)
+
+    for placement in placed_words:
+        place_word(grid, placement.word, placement.row,
+                   placement.col, placement.row_step, placement.col_step)
+
+    placed = {placement.word for placement in placed_words}
+    failed_words = [word for word in valid_words if word not in placed]
+    for word in failed_words:
+        print(f"Warning: Could not place word '{word}' in grid")
 
     # Fill empty cells with random letters
-    for i in range(size):
-        for j in range(size):
-            if grid[i][j] == '':
-                grid[i][j] = random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+    grid.fill_empty(rng=rng)
 
     # Log placement results
     if failed_words:
         print(f"Failed to place {len(failed_words)} words: {failed_words}")
     print(
-        f"Successfully placed {len(placed_words)} out of {len(sorted_words)} words")
+        f"Successfully placed {len(placed_words)} out of {len(valid_words)} words")
 
-    return grid
+    return grid, placed_words
 
 
 def can_place_word_with_intersections(grid, word, row, col, row_step, col_step):
     """
-    Check if word can be placed and count how many letters it shares
+    Check if word can be placed on a Grid and count how many letters it shares
     Returns: (can_place: bool, intersection_count: int)
     """
     size = len(grid)
@@ -181,9 +182,10 @@ def can_place_word_with_intersections(grid, word, row, col, row_step, col_step):
             return False, 0
 
         # If cell is occupied
-        if grid[r][c] != '':
+        cell = grid[r, c]
+        if cell != '':
             # If same letter, it's an intersection (good!)
-            if grid[r][c] == char:
+            if cell == char:
                 intersections += 1
             else:
                 # Different letter, can't place here
@@ -193,11 +195,11 @@ def can_place_word_with_intersections(grid, word, row, col, row_step, col_step):
 
 
 def place_word(grid, word, row, col, row_step, col_step):
-    """Place a word in the grid"""
+    """Place a word in the Grid"""
     for i, char in enumerate(word):
         r = row + i * row_step
         c = col + i * col_step
-        grid[r][c] = char
+        grid[r, c] = char
 
 
 def can_place_word(grid, word, row, col, row_step, col_step):
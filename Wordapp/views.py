@@ -3,24 +3,46 @@ from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Sum, Max, Count, Avg
-from django.contrib.auth.models import User
 from django.http import JsonResponse
-from .models import Word, GameSession, UserProfile, Achievement, Feedback, WordHistory
+from django.conf import settings
+from .models import GameSession, UserProfile, Achievement, Feedback, WordHistory
 from .forms import UserRegistrationForm, FeedbackForm, UserProfileForm
-from .utils import generate_word_grid, get_random_words
+from .counters import counter_values
+from .dawg import get_bonus_dawg
+from .game_store import get_game_store
+from .fragments import GAMES, USERS, WORDS, data_version
+from .leaderboard import (MAX_PAGE_SIZE, PAGE_SIZE, WINDOWS, my_rank, parse_cursor,
+                          period_start, scores_page, top_scores)
+from .lexicon import get_lexicon
+from .pool import get_puzzle_pool
+from .placement import PlacementIndex, parse_path, path_placement
+from .seen import get_seen_words, mark_seen_words
+from .services import complete_game
+from .tokens import (dump_game_token, find_digests, game_grid, game_placements,
+                     load_game_token)
+from .utils import (BONUS_WORD_POINTS, GRID_SIZES, MIN_BONUS_WORD_LENGTH,
+                    MIN_PUZZLE_WORDS, build_puzzle)
 import json
-from datetime import datetime
+import secrets
+import time
+from functools import partial
 
 
 def home(request):
     """Home page view with game statistics"""
-    context = {
-        'total_users': User.objects.count(),
-        'total_games': GameSession.objects.count(),
-        'total_words': Word.objects.count(),
-        'top_players': UserProfile.objects.order_by('-highest_score')[:3],
+    return render(request, 'Wordapp/home.html', home_context())
+
+
+def home_context():
+    """
+    The counters are passed uncalled, so they are only read when the cached
+    statistics fragment is missing or out of date
+    """
+    return {
+        'stats_version': data_version(USERS, GAMES, WORDS),
+        'totals': partial(counter_values, USERS, GAMES, WORDS),
+        'top_players': UserProfile.objects.select_related('user').order_by('-highest_score')[:3],
     }
-    return render(request, 'Wordapp/home.html', context)
 
 
 def register(request):
@@ -83,98 +105,37 @@ def game_play(request):
     else:
         difficulty = request.GET.get('difficulty', 'easy')
 
-    grid_sizes = {'easy': 8, 'medium': 10, 'hard': 12}
-    grid_size = grid_sizes.get(difficulty, 8)
-
-    word_counts = {'easy': 5, 'medium': 7, 'hard': 10}
-    word_count = word_counts.get(difficulty, 5)
-
-    # IMPORTANT: Set max word length to grid size to ensure all words fit
-    max_word_length = grid_size
-
-    # Get words with length validation
-    words = get_random_words(
-        difficulty, count=word_count, max_length=max_word_length)
+    # Take a ready-made puzzle from the warm pool, only building one
+    # inline when the pool is cold or disabled. Either way, words the
+    # player saw recently are avoided where possible
+    seen_words = get_seen_words(request.user)
+    puzzle = get_puzzle_pool().pop(difficulty, exclude=seen_words)
+    if puzzle is None:
+        puzzle = build_puzzle(difficulty, exclude=seen_words)
 
-    if not words:
+    if puzzle is None:
         messages.warning(
             request, 'Not enough words in the database. Please contact admin.')
         return redirect('home')
 
-    word_list = [word.word.upper() for word in words]
-    word_definitions = {word.word.upper(): word.definition for word in words}
-
-    # Generate grid with validated words
-    grid = generate_word_grid(word_list, grid_size)
-
-    # Double-check: Only include words that were successfully placed
-    # (This prevents the bug where words are in the list but not in the grid)
-    placed_words = []
-    for word in word_list:
-        word_found = False
-        # Quick check if word exists in grid
-        grid_str = ''.join([''.join(row) for row in grid])
-        if word in grid_str:
-            word_found = True
-        else:
-            # Check all directions
-            for row in range(grid_size):
-                for col in range(grid_size):
-                    # Check horizontal
-                    if col + len(word) <= grid_size:
-                        h_word = ''.join([grid[row][col + i]
-                                         for i in range(len(word))])
-                        if h_word == word:
-                            word_found = True
-                            break
-                    # Check vertical
-                    if row + len(word) <= grid_size:
-                        v_word = ''.join([grid[row + i][col]
-                                         for i in range(len(word))])
-                        if v_word == word:
-                            word_found = True
-                            break
-                    # Check diagonal down-right
-                    if row + len(word) <= grid_size and col + len(word) <= grid_size:
-                        d_word = ''.join([grid[row + i][col + i]
-                                         for i in range(len(word))])
-                        if d_word == word:
-                            word_found = True
-                            break
-                    # Check diagonal down-left
-                    if row + len(word) <= grid_size and col - len(word) >= -1:
-                        dl_word = ''.join([grid[row + i][col - i]
-                                          for i in range(len(word))])
-                        if dl_word == word:
-                            word_found = True
-                            break
-                if word_found:
-                    break
-
-        if word_found:
-            placed_words.append(word)
-        else:
-            print(
-                f"Warning: Word '{word}' was not placed in grid, removing from list")
-
-    # Only use words that were actually placed
-    final_word_list = placed_words
-    final_definitions = {word: word_definitions[word] for word in placed_words}
+    grid = puzzle['grid']
+    grid_size = puzzle['grid_size']
+    final_word_list = puzzle['words']
+    final_definitions = puzzle['definitions']
 
-    if len(final_word_list) < 3:
+    if len(final_word_list) < MIN_PUZZLE_WORDS:
         messages.warning(
             request, 'Could not generate enough words for this game. Please try again.')
         return redirect('home')
 
-    request.session['current_game'] = {
-        'difficulty': difficulty,
-        'grid_size': grid_size,
-        'words': final_word_list,
-        'definitions': final_definitions,
-        'grid': grid,
-        'start_time': datetime.now().isoformat(),
-        'found_words': []
-    }
+    # The session only keeps the game id; the game store holds a signed
+    # token the rest of the game is rebuilt from (word ids, placements,
+    # grid) and records finds as they come in
+    request.session['current_game_id'] = get_game_store().create(dump_game_token(puzzle))
+
+    # Salted digests of every word and path let the page confirm finds
+    # itself; they are reported in one batch when the game ends
+    find_salt = secrets.token_hex(16)
 
     context = {
         'grid': grid,
@@ -183,50 +144,163 @@ def game_play(request):
         'difficulty': difficulty,
         'grid_size': grid_size,
         'word_count': len(final_word_list),
+        'find_salt': find_salt,
+        'find_digests': json.dumps(find_digests(puzzle, find_salt)),
+        'bonus_words': bonus_words_enabled(),
     }
 
     return render(request, 'Wordapp/game_play.html', context)
 
 
+def load_current_game(request):
+    """
+    Load the game in progress from the game store
+    Returns the decoded token with its id, found word ids and bonus words,
+    or None if there is no valid game in progress
+    """
+    return load_game(request.session.get('current_game_id'))
+
+
+def load_game(game_id):
+    """Decoded game state for a game id from the game store, or None"""
+    game = get_game_store().load(game_id) if game_id else None
+    state = load_game_token(game['token']) if game else None
+    if state is None:
+        return None
+    state['game_id'] = game_id
+    state['found_words'] = game['found_words']
+    state['bonus_words'] = game['bonus_words']
+    return state
+
+
+def check_finds(state, finds):
+    """
+    Check a batch of finds, each {'word', 'path'}, against the game
+    A find counts if it traces one of the game's words where it is in the
+    grid or, in bonus mode, a dictionary word in a straight line. New finds
+    are recorded in the game store in one go and added to the state
+    Returns one result per find: {'word', 'status'} with status 'success',
+    'bonus', 'duplicate' or 'error', plus the Word for successes
+    """
+    words = get_lexicon().in_bulk(state['word_ids'])
+    words_by_name = {word.word.upper(): word for word in words.values()}
+    index = PlacementIndex(game_placements(state, words))
+    bonus_enabled = bonus_words_enabled()
+
+    results = []
+    new_ids = []
+    new_bonus = []
+    for find in finds:
+        if not isinstance(find, dict):
+            find = {}
+        found_word = str(find.get('word', '')).upper()
+        path = parse_path(find.get('path'))
+        result = {'word': found_word, 'status': 'error'}
+        results.append(result)
+
+        word = words_by_name.get(found_word)
+        if word is not None:
+            # The selected cells must trace the word exactly where it was placed
+            if index.match(found_word, path) is None:
+                continue
+            if word.id in state['found_words'] or word.id in new_ids:
+                result['status'] = 'duplicate'
+            else:
+                result.update(status='success', word_id=word.id, definition=word.definition)
+                new_ids.append(word.id)
+        elif bonus_enabled and check_bonus_word(state, found_word, path):
+            if found_word in state['bonus_words'] or found_word in new_bonus:
+                result['status'] = 'duplicate'
+            else:
+                result['status'] = 'bonus'
+                new_bonus.append(found_word)
+
+    # Recording tells us what is really new if the same game is being
+    # played from two tabs at once
+    store = get_game_store()
+    recorded_ids = store.add_found_words(state['game_id'], new_ids) if new_ids else []
+    recorded_bonus = store.add_bonus_words(state['game_id'], new_bonus) if new_bonus else []
+    state['found_words'].extend(recorded_ids)
+    state['bonus_words'].extend(recorded_bonus)
+    for result in results:
+        if (result['status'] == 'success' and result['word_id'] not in recorded_ids
+                or result['status'] == 'bonus' and result['word'] not in recorded_bonus):
+            result['status'] = 'duplicate'
+    return results
+
+
+# Most finds one request may report; a game never has more real ones
+MAX_BATCH_FINDS = 200
+
+
+def parse_finds(value):
+    """The JSON list of finds posted by the page, or [] if malformed"""
+    try:
+        finds = json.loads(value or '[]')
+    except ValueError:
+        return []
+    return finds if isinstance(finds, list) else []
+
+
+def bonus_words_enabled():
+    return getattr(settings, 'WORDORBIT_BONUS_WORDS', False)
+
+
+def check_bonus_word(state, found_word, path):
+    """
+    True if a word that is not one of the game's own is a dictionary word
+    the path traces in a straight line through the grid
+    """
+    if len(found_word) < MIN_BONUS_WORD_LENGTH:
+        return False
+    placement = path_placement(found_word, path, GRID_SIZES.get(state['difficulty'], 8))
+    if placement is None:
+        return False
+    # Cheapest test first: the DAWG answers in microseconds
+    if found_word not in get_bonus_dawg():
+        return False
+    grid = game_grid(state)
+    return grid is not None and grid.line(
+        placement.row, placement.col, placement.row_step, placement.col_step,
+        len(found_word)) == found_word
+
+
 @login_required
 def check_word(request):
     """AJAX view to check if found word is correct"""
     if request.method == 'POST':
         found_word = request.POST.get('word', '').upper()
-        game_data = request.session.get('current_game', {})
-
-        print(f"DEBUG check_word: received word = {found_word}")
-        print(
-            f"DEBUG check_word: game_data words = {game_data.get('words', [])}")
-        print(
-            f"DEBUG check_word: game_data found_words = {game_data.get('found_words', [])}")
-
-        if found_word in game_data.get('words', []):
-            if found_word not in game_data.get('found_words', []):
-                # Add to found words list
-                if 'found_words' not in game_data:
-                    game_data['found_words'] = []
-                game_data['found_words'].append(found_word)
-
-                # CRITICAL: Save back to session
-                request.session['current_game'] = game_data
-                request.session.modified = True
-
-                print(
-                    f"DEBUG check_word: Updated found_words = {game_data['found_words']}")
-
-                return JsonResponse({
-                    'status': 'success',
-                    'message': f'Excellent! You found "{found_word}"!',
-                    'definition': game_data.get('definitions', {}).get(found_word, ''),
-                    'found_words': game_data['found_words'],
-                    'total_found': len(game_data['found_words'])
-                })
-            else:
-                return JsonResponse({
-                    'status': 'duplicate',
-                    'message': 'You already found this word!'
-                })
+        state = load_current_game(request)
+
+        result = {'status': 'error'}
+        if state is not None:
+            result = check_finds(state, [{
+                'word': found_word,
+                'path': request.POST.get('path'),
+            }])[0]
+
+        if result['status'] == 'success':
+            words = get_lexicon().in_bulk(state['found_words'])
+            return JsonResponse({
+                'status': 'success',
+                'message': f'Excellent! You found "{found_word}"!',
+                'definition': result['definition'],
+                'found_words': [words[word_id].word.upper() for word_id in state['found_words']
+                                if word_id in words],
+                'total_found': len(state['found_words'])
+            })
+        if result['status'] == 'bonus':
+            return JsonResponse({
+                'status': 'bonus',
+                'message': f'Bonus word! "{found_word}" is worth {BONUS_WORD_POINTS} points',
+                'points': BONUS_WORD_POINTS,
+                'bonus_words': state['bonus_words'],
+            })
+        if result['status'] == 'duplicate':
+            return JsonResponse({
+                'status': 'duplicate',
+                'message': 'You already found this word!'
+            })
 
         return JsonResponse({
             'status': 'error',
@@ -234,31 +308,103 @@ def check_word(request):
         })
 
 
+@login_required
+def check_words(request):
+    """
+    AJAX view checking many finds at once, posted as a JSON list of
+    {"word": ..., "path": "row,col;..."} in the 'finds' field (or as the
+    request body), e.g. finds confirmed in the page or replayed after a
+    reconnect. The game is loaded once and new finds stored together
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+
+    if request.content_type == 'application/json':
+        finds = parse_finds(request.body.decode('utf-8', 'replace'))
+    else:
+        finds = parse_finds(request.POST.get('finds'))
+
+    state = load_current_game(request)
+    if state is None:
+        return JsonResponse({'status': 'error', 'message': 'No active game found.'}, status=400)
+
+    results = check_finds(state, finds[:MAX_BATCH_FINDS])
+    for result in results:
+        result.pop('word_id', None)
+        if result['status'] == 'bonus':
+            result['points'] = BONUS_WORD_POINTS
+    return JsonResponse({
+        'status': 'ok',
+        'results': results,
+        'total_found': len(state['found_words']),
+        'bonus_words': state['bonus_words'],
+    })
+
+
+def score_game(state):
+    """Score breakdown of a game ending now, as kept in last_game_results"""
+    time_taken = max(0, int(time.time() - state['start_time']))
+
+    # Format time as MM:SS
+    minutes = time_taken // 60
+    seconds = time_taken % 60
+    formatted_time = f"{minutes:02d}:{seconds:02d}"
+
+    words_found = len(state['found_words'])
+    total_words = len(state['word_ids'])
+
+    base_score = words_found * 100
+
+    difficulty_multipliers = {'easy': 1.0, 'medium': 1.5, 'hard': 2.0}
+    difficulty = state['difficulty']
+    difficulty_bonus = int(
+        base_score * difficulty_multipliers.get(difficulty, 1.0) - base_score)
+
+    time_bonus = max(0, (300 - time_taken)
+                     ) // 10 if time_taken < 300 else 0
+    completion_bonus = 200 if words_found == total_words else 0
+
+    bonus_words = state['bonus_words']
+    bonus_score = len(bonus_words) * BONUS_WORD_POINTS
+
+    score = base_score + difficulty_bonus + time_bonus + completion_bonus + bonus_score
+
+    return {
+        'score': score,
+        'words_found': words_found,
+        'total_words': total_words,
+        'time_taken': time_taken,
+        'formatted_time': formatted_time,
+        'difficulty': difficulty,
+        'base_score': base_score,
+        'difficulty_bonus': difficulty_bonus,
+        'time_bonus': time_bonus,
+        'completion_bonus': completion_bonus,
+        'bonus_words': bonus_words,
+        'bonus_score': bonus_score,
+    }
+
+
 @login_required
 def end_game(request):
     """End game and calculate score"""
     if request.method == 'POST':
-        game_data = request.session.get('current_game', {})
+        state = load_current_game(request)
 
-        if not game_data:
+        if state is None:
             messages.warning(request, 'No active game found.')
             return redirect('game_play')
 
-        start_time = datetime.fromisoformat(game_data['start_time'])
-        time_taken = int((datetime.now() - start_time).total_seconds())
-
-        # Format time as MM:SS
-        minutes = time_taken // 60
-        seconds = time_taken % 60
-        formatted_time = f"{minutes:02d}:{seconds:02d}"
+        # Finds the page confirmed locally since the last check
+        check_finds(state, parse_finds(request.POST.get('finds'))[:MAX_BATCH_FINDS])
 
-        # CRITICAL FIX: Ensure we get found_words correctly
-        found_words_list = game_data.get('found_words', [])
-        words_found = len(found_words_list)
-        total_words = len(game_data.get('words', []))
+        results = score_game(state)
+        words_found = results['words_found']
+        total_words = results['total_words']
+        score = results['score']
 
         # Debug logging
-        print(f"DEBUG: found_words_list = {found_words_list}")
+        print(f"DEBUG: found_words_list = {state['found_words']}")
         print(f"DEBUG: words_found = {words_found}")
         print(f"DEBUG: total_words = {total_words}")
 
@@ -268,305 +414,16 @@ def end_game(request):
                 request, 'You must find at least one word before ending the game!')
             return redirect('game_play')
 
-        base_score = words_found * 100
-
-        difficulty_multipliers = {'easy': 1.0, 'medium': 1.5, 'hard': 2.0}
-        difficulty = game_data.get('difficulty', 'easy')
-        difficulty_bonus = int(
-            base_score * difficulty_multipliers.get(difficulty, 1.0) - base_score)
-
-        time_bonus = max(0, (300 - time_taken)
-                         ) // 10 if time_taken < 300 else 0
-        completion_bonus = 200 if words_found == total_words else 0
-
-        score = base_score + difficulty_bonus + time_bonus + completion_bonus
-
-        # Save game session
-        game_session = GameSession.objects.create(
-            user=request.user,
-            difficulty=difficulty,
-            grid_size=game_data['grid_size'],
-            words_found=words_found,
-            total_words=total_words,
-            score=score,
-            time_taken=time_taken,
-            completed=(words_found == total_words)
-        )
-
-        # Update user profile - CRITICAL FIX
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        profile.total_games += 1
-        profile.total_score += score
-        profile.words_discovered += words_found  # This should work now
-        if score > profile.highest_score:
-            profile.highest_score = score
-        profile.save()
-
-        print(
-            f"DEBUG: Profile updated - words_discovered now: {profile.words_discovered}")
-
-        # Check achievements
-        check_achievements(request.user, profile, words_found,
-                           score, time_taken, total_words)
+        complete_game(request.user, state, results)
+
+        mark_seen_words(request.user, state['word_ids'])
 
         # Store results in session
-        request.session['last_game_results'] = {
-            'score': score,
-            'words_found': words_found,
-            'total_words': total_words,
-            'time_taken': time_taken,
-            'formatted_time': formatted_time,
-            'difficulty': difficulty,
-            'base_score': base_score,
-            'difficulty_bonus': difficulty_bonus,
-            'time_bonus': time_bonus,
-            'completion_bonus': completion_bonus,
-        }
+        request.session['last_game_results'] = results
 
         # Clear current game
-        request.session.pop('current_game', None)
-        request.session.modified = True
-
-        messages.success(
-            request, f'Game completed! Your score: {score} points!')
-        return redirect('game_results')
-
-    return redirect('game_play')
-    """End game and calculate score"""
-    if request.method == 'POST':
-        game_data = request.session.get('current_game', {})
-
-        if not game_data:
-            messages.warning(request, 'No active game found.')
-            return redirect('game_play')
-
-        start_time = datetime.fromisoformat(game_data['start_time'])
-        time_taken = int((datetime.now() - start_time).total_seconds())
-
-        # Format time as MM:SS
-        minutes = time_taken // 60
-        seconds = time_taken % 60
-        formatted_time = f"{minutes:02d}:{seconds:02d}"
-
-        words_found = len(game_data.get('found_words', []))
-        total_words = len(game_data.get('words', []))
-
-        # IMPORTANT FIX: Don't allow game completion with 0 words found
-        if words_found == 0:
-            messages.warning(
-                request, 'You must find at least one word before ending the game!')
-            # Don't clear session - let them continue playing
-            return redirect('game_play')
-
-        base_score = words_found * 100
-
-        difficulty_multipliers = {'easy': 1.0, 'medium': 1.5, 'hard': 2.0}
-        difficulty = game_data.get('difficulty', 'easy')
-        difficulty_bonus = int(
-            base_score * difficulty_multipliers.get(difficulty, 1.0) - base_score)
-
-        time_bonus = max(0, (300 - time_taken)
-                         ) // 10 if time_taken < 300 else 0
-        completion_bonus = 200 if words_found == total_words else 0
-
-        score = base_score + difficulty_bonus + time_bonus + completion_bonus
-
-        # Save game session to database
-        game_session = GameSession.objects.create(
-            user=request.user,
-            difficulty=difficulty,
-            grid_size=game_data['grid_size'],
-            words_found=words_found,
-            total_words=total_words,
-            score=score,
-            time_taken=time_taken,
-            completed=(words_found == total_words)
-        )
-
-        # Update user profile
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        profile.total_games += 1
-        profile.total_score += score
-        profile.words_discovered += words_found
-        if score > profile.highest_score:
-            profile.highest_score = score
-        profile.save()
-
-        # Check for achievements
-        check_achievements(request.user, profile, words_found,
-                           score, time_taken, total_words)
-
-        # Store results in session for display
-        request.session['last_game_results'] = {
-            'score': score,
-            'words_found': words_found,
-            'total_words': total_words,
-            'time_taken': time_taken,
-            'formatted_time': formatted_time,
-            'difficulty': difficulty,
-            'base_score': base_score,
-            'difficulty_bonus': difficulty_bonus,
-            'time_bonus': time_bonus,
-            'completion_bonus': completion_bonus,
-        }
-
-        # IMPORTANT: Clear current game session AFTER saving everything
-        request.session.pop('current_game', None)
-        request.session.modified = True
-
-        messages.success(
-            request, f'Game completed! Your score: {score} points!')
-        return redirect('game_results')
-
-    return redirect('game_play')
-    """End game and calculate score"""
-    if request.method == 'POST':
-        game_data = request.session.get('current_game', {})
-
-        if not game_data:
-            messages.warning(request, 'No active game found.')
-            return redirect('game_play')
-
-        start_time = datetime.fromisoformat(game_data['start_time'])
-        time_taken = int((datetime.now() - start_time).total_seconds())
-
-        # Format time as MM:SS
-        minutes = time_taken // 60
-        seconds = time_taken % 60
-        formatted_time = f"{minutes:02d}:{seconds:02d}"
-
-        words_found = len(game_data.get('found_words', []))
-        total_words = len(game_data.get('words', []))
-
-        # IMPORTANT FIX: Don't allow game completion with 0 words found
-        if words_found == 0:
-            messages.warning(
-                request, 'You must find at least one word before ending the game!')
-            return redirect('game_play')
-
-        base_score = words_found * 100
-
-        difficulty_multipliers = {'easy': 1.0, 'medium': 1.5, 'hard': 2.0}
-        difficulty = game_data.get('difficulty', 'easy')
-        difficulty_bonus = int(
-            base_score * difficulty_multipliers.get(difficulty, 1.0) - base_score)
-
-        time_bonus = max(0, (300 - time_taken)
-                         ) // 10 if time_taken < 300 else 0
-        completion_bonus = 200 if words_found == total_words else 0
-
-        score = base_score + difficulty_bonus + time_bonus + completion_bonus
-
-        game_session = GameSession.objects.create(
-            user=request.user,
-            difficulty=difficulty,
-            grid_size=game_data['grid_size'],
-            words_found=words_found,
-            total_words=total_words,
-            score=score,
-            time_taken=time_taken,
-            completed=(words_found == total_words)
-        )
-
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        profile.total_games += 1
-        profile.total_score += score
-        profile.words_discovered += words_found
-        if score > profile.highest_score:
-            profile.highest_score = score
-        profile.save()
-
-        check_achievements(request.user, profile, words_found,
-                           score, time_taken, total_words)
-
-        request.session['last_game_results'] = {
-            'score': score,
-            'words_found': words_found,
-            'total_words': total_words,
-            'time_taken': time_taken,
-            'formatted_time': formatted_time,
-            'difficulty': difficulty,
-            'base_score': base_score,
-            'difficulty_bonus': difficulty_bonus,
-            'time_bonus': time_bonus,
-            'completion_bonus': completion_bonus,
-        }
-
-        request.session.pop('current_game', None)
-
-        messages.success(
-            request, f'Game completed! Your score: {score} points!')
-        return redirect('game_results')
-
-    return redirect('game_play')
-    """End game and calculate score"""
-    if request.method == 'POST':
-        game_data = request.session.get('current_game', {})
-
-        if not game_data:
-            messages.warning(request, 'No active game found.')
-            return redirect('game_play')
-
-        start_time = datetime.fromisoformat(game_data['start_time'])
-        time_taken = int((datetime.now() - start_time).total_seconds())
-
-        # Format time as MM:SS
-        minutes = time_taken // 60
-        seconds = time_taken % 60
-        formatted_time = f"{minutes:02d}:{seconds:02d}"
-
-        words_found = len(game_data.get('found_words', []))
-        total_words = len(game_data.get('words', []))
-
-        base_score = words_found * 100
-
-        difficulty_multipliers = {'easy': 1.0, 'medium': 1.5, 'hard': 2.0}
-        difficulty = game_data.get('difficulty', 'easy')
-        difficulty_bonus = int(
-            base_score * difficulty_multipliers.get(difficulty, 1.0) - base_score)
-
-        time_bonus = max(0, (300 - time_taken)
-                         ) // 10 if time_taken < 300 else 0
-        completion_bonus = 200 if words_found == total_words else 0
-
-        score = base_score + difficulty_bonus + time_bonus + completion_bonus
-
-        game_session = GameSession.objects.create(
-            user=request.user,
-            difficulty=difficulty,
-            grid_size=game_data['grid_size'],
-            words_found=words_found,
-            total_words=total_words,
-            score=score,
-            time_taken=time_taken,
-            completed=(words_found == total_words)
-        )
-
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        profile.total_games += 1
-        profile.total_score += score
-        profile.words_discovered += words_found
-        if score > profile.highest_score:
-            profile.highest_score = score
-        profile.save()
-
-        check_achievements(request.user, profile, words_found,
-                           score, time_taken, total_words)
-
-        request.session['last_game_results'] = {
-            'score': score,
-            'words_found': words_found,
-            'total_words': total_words,
-            'time_taken': time_taken,
-            'formatted_time': formatted_time,  # ADDED THIS LINE
-            'difficulty': difficulty,
-            'base_score': base_score,
-            'difficulty_bonus': difficulty_bonus,
-            'time_bonus': time_bonus,
-            'completion_bonus': completion_bonus,
-        }
-
-        request.session.pop('current_game', None)
+        get_game_store().delete(state['game_id'])
+        request.session.pop('current_game_id', None)
 
         messages.success(
             request, f'Game completed! Your score: {score} points!')
@@ -575,63 +432,6 @@ def end_game(request):
     return redirect('game_play')
 
 
-def check_achievements(user, profile, words_found, score, time_taken, total_words):
-    """Check and award achievements"""
-    achievements = []
-
-    if profile.total_games == 1:
-        achievements.append({
-            'name': 'First Steps',
-            'description': 'Completed your first WordOrbit game!',
-            'type': 'first_game'
-        })
-
-    if words_found == total_words:
-        achievements.append({
-            'name': 'Word Master',
-            'description': 'Found all words in a game!',
-            'type': 'word_master'
-        })
-
-    if score >= 500:
-        achievements.append({
-            'name': 'High Scorer',
-            'description': 'Scored 500+ points in a single game!',
-            'type': 'high_scorer'
-        })
-
-    if time_taken < 120 and words_found == total_words:
-        achievements.append({
-            'name': 'Speed Demon',
-            'description': 'Completed a game in under 2 minutes!',
-            'type': 'speed_demon'
-        })
-
-    if profile.total_games >= 10:
-        achievements.append({
-            'name': 'Dedicated Player',
-            'description': 'Played 10 games!',
-            'type': 'dedicated_player'
-        })
-
-    if profile.words_discovered >= 100:
-        achievements.append({
-            'name': 'Century Club',
-            'description': 'Discovered 100 words!',
-            'type': 'streak_master'
-        })
-
-    for ach in achievements:
-        Achievement.objects.get_or_create(
-            user=user,
-            name=ach['name'],
-            defaults={
-                'description': ach['description'],
-                'achievement_type': ach['type']
-            }
-        )
-
-
 @login_required
 def game_results(request):
     """Display game results"""
@@ -695,28 +495,77 @@ def edit_profile(request):
 
 def leaderboard(request):
     """Leaderboard view"""
-    top_players = UserProfile.objects.order_by('-highest_score')[:20]
+    return render(request, 'Wordapp/leaderboard.html', leaderboard_context(request))
 
-    # Get difficulty filter FIRST, before slicing
+
+def leaderboard_context(request):
+    """
+    Querysets and lookups are left lazy, so a page served from the
+    fragment cache runs none of them
+    """
     difficulty = request.GET.get('difficulty', 'all')
+    if difficulty not in GRID_SIZES:
+        difficulty = 'all'
+    window = request.GET.get('window', 'all')
+    if window not in WINDOWS:
+        window = 'all'
+
+    return {
+        'board_version': data_version(USERS, GAMES),
+        'board_period': period_start(window).isoformat(),
+        'top_players': UserProfile.objects.select_related('user').order_by('-highest_score')[:20],
+        'recent_games': top_scores(difficulty, window),
+        'selected_difficulty': difficulty,
+        'selected_window': window,
+        'my_rank': (partial(my_rank, request.user.id, difficulty)
+                    if request.user.is_authenticated else None),
+    }
 
-    # Start with base queryset
-    recent_games = GameSession.objects.all().order_by('-score')
 
-    # Apply filter BEFORE slicing
-    if difficulty != 'all':
-        recent_games = recent_games.filter(difficulty=difficulty)
+def scores_request(request):
+    """Difficulty, cursor and page size of a request for a page of scores"""
+    difficulty = request.GET.get('difficulty', 'all')
+    if difficulty not in GRID_SIZES:
+        difficulty = 'all'
+    try:
+        limit = min(max(int(request.GET.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+    return difficulty, parse_cursor(request.GET.get('after')), limit
+
 
-    # Now slice to get top 20
-    recent_games = recent_games[:20]
+def all_scores(request):
+    """Every game's score, a page at a time"""
+    difficulty, after, limit = scores_request(request)
+    games, next_cursor = scores_page(difficulty, after, limit)
 
     context = {
-        'top_players': top_players,
-        'recent_games': recent_games,
+        'games': games,
+        'next_cursor': next_cursor,
         'selected_difficulty': difficulty,
+        'my_rank': my_rank(request.user.id, difficulty) if request.user.is_authenticated else None,
     }
+    return render(request, 'Wordapp/all_scores.html', context)
 
-    return render(request, 'Wordapp/leaderboard.html', context)
+
+def scores_api(request):
+    """JSON pages of every game's score; follow `next` for the next page"""
+    difficulty, after, limit = scores_request(request)
+    games, next_cursor = scores_page(difficulty, after, limit)
+
+    return JsonResponse({
+        'status': 'ok',
+        'difficulty': difficulty,
+        'results': [{
+            'rank': game['rank'],
+            'username': game['user__username'],
+            'score': game['score'],
+            'difficulty': game['difficulty'],
+            'played_at': game['created_at'].isoformat(),
+        } for game in games],
+        'next': next_cursor,
+        'my_rank': my_rank(request.user.id, difficulty) if request.user.is_authenticated else None,
+    })
 
 
 def contact(request):
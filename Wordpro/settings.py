@@ -150,3 +150,85 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
+
+
+# Caches
+# 'shared' holds small values every gunicorn worker must agree on, such as
+# the lexicon version counter. Point it at Redis/Memcached when running on
+# more than one machine.
+# 'fragments' holds rendered parts of the home and leaderboard pages, keyed
+# by data versions kept in 'shared' (see Wordapp/fragments.py). Each worker
+# keeps its own copy unless FRAGMENT_CACHE_DIR (or a Redis/Memcached
+# backend) lets them share one.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("SHARED_CACHE_DIR", os.path.join(BASE_DIR, '.cache')),
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'wordorbit-fragments',
+    },
+}
+if os.getenv("FRAGMENT_CACHE_DIR"):
+    CACHES['fragments'].update({
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("FRAGMENT_CACHE_DIR"),
+    })
+
+WORDORBIT_SHARED_CACHE = 'shared'
+
+# Keep a copy of the word table in each worker for query-free word picks.
+# Turn off for very large dictionaries to sample in SQL instead.
+WORDORBIT_LEXICON_CACHE = os.getenv("LEXICON_CACHE", "True").strip().lower() in ("true", "1", "t")
+
+# Read-only lexicon file built by `manage.py build_lexicon` and memory-mapped
+# by every worker. Takes priority over the settings above when it exists.
+WORDORBIT_LEXICON_FILE = os.getenv("LEXICON_FILE") or None
+
+# Pick each game's words from a larger random sample by how well their
+# letters cross, rather than uniformly at random.
+WORDORBIT_OVERLAP_SELECTION = os.getenv("OVERLAP_SELECTION", "True").strip().lower() in ("true", "1", "t")
+
+# Bonus words: any dictionary word traced in a straight line scores extra.
+# The dictionary is the Word table plus an optional plain text word list
+# (one word per line).
+WORDORBIT_BONUS_WORDS = os.getenv("BONUS_WORDS", "False").strip().lower() in ("true", "1", "t")
+WORDORBIT_BONUS_WORDLIST = os.getenv("BONUS_WORDLIST") or None
+
+# Binary session encoding with a JSON fallback (see Wordapp/serializers.py);
+# sessions written by the default JSONSerializer still load
+SESSION_SERIALIZER = 'Wordapp.serializers.CompactSessionSerializer'
+
+# Where games in progress are kept (see Wordapp/game_store.py). The SQLite
+# file is shared by every worker on one host; use CacheGameStateStore with a
+# shared cache across hosts, or LocMemGameStateStore for a single process.
+WORDORBIT_GAME_STATE_STORE = {
+    'BACKEND': os.getenv("GAME_STATE_BACKEND", 'Wordapp.game_store.SQLiteGameStateStore'),
+    'OPTIONS': {},
+}
+if WORDORBIT_GAME_STATE_STORE['BACKEND'].endswith('SQLiteGameStateStore'):
+    WORDORBIT_GAME_STATE_STORE['OPTIONS']['path'] = os.getenv(
+        "GAME_STATE_FILE", os.path.join(BASE_DIR, 'game_state.sqlite3'))
+
+# Route home, leaderboard, check_word(s) and end_game to their async
+# versions (Wordapp/async_views.py). Turn on when serving through
+# Wordpro/asgi.py, e.g. with uvicorn or gunicorn's uvicorn worker.
+WORDORBIT_ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False").strip().lower() in ("true", "1", "t")
+
+# Leave end_game's profile, word history and achievement writes to a
+# background worker (`manage.py run_jobs`, see Wordapp/jobs.py) instead of
+# doing them before the redirect. Only turn on with a worker running.
+WORDORBIT_JOB_QUEUE = os.getenv("JOB_QUEUE", "False").strip().lower() in ("true", "1", "t")
+
+
+# Warm puzzle pool used by game_play (see Wordapp/pool.py)
+WORDORBIT_PUZZLE_POOL = {
+    'ENABLED': os.getenv("PUZZLE_POOL_ENABLED", "True").strip().lower() in ("true", "1", "t"),
+    'SIZE': int(os.getenv("PUZZLE_POOL_SIZE", "20")),
+    'LOW_WATER': int(os.getenv("PUZZLE_POOL_LOW_WATER", "5")),
+    'MAX_AGE': int(os.getenv("PUZZLE_POOL_MAX_AGE", "900")),
+}